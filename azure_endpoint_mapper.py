@@ -1,239 +1,508 @@
-from azure.identity import ClientSecretCredential
-from azure.mgmt.web import WebSiteManagementClient
-from azure.mgmt.storage import StorageManagementClient
-from azure.mgmt.sql import SqlManagementClient
-from azure.mgmt.containerservice import ContainerServiceClient
-from azure.mgmt.resource import ResourceManagementClient
-from azure.mgmt.apimanagement import ApiManagementClient
-from azure.mgmt.containerinstance import ContainerInstanceManagementClient
-from azure.mgmt.containerregistry import ContainerRegistryManagementClient
-from azure.mgmt.cosmosdb import CosmosDBManagementClient
-from azure.mgmt.keyvault import KeyVaultManagementClient
-from azure.mgmt.network import NetworkManagementClient
-from azure.core.exceptions import HttpResponseError
-from typing import Dict, List, Optional
-import config
+import argparse
+import importlib
+import os
+from typing import Dict, Iterator, List, Optional
+
+from helpers.telemetry import telemetry
+from modules.endpoint_output import EndpointWriter, chunked
+from modules.endpoint_probe import DEFAULT_CONCURRENCY, DEFAULT_PER_HOST, DEFAULT_TIMEOUT, probe_endpoints
+
+# Management clients are imported and constructed on first use, so a scan of a
+# few services does not pay for the large azure.mgmt.* model packages it never touches.
+SERVICE_CLIENTS = {
+    'web_client': ('azure.mgmt.web', 'WebSiteManagementClient'),
+    'storage_client': ('azure.mgmt.storage', 'StorageManagementClient'),
+    'sql_client': ('azure.mgmt.sql', 'SqlManagementClient'),
+    'aks_client': ('azure.mgmt.containerservice', 'ContainerServiceClient'),
+    'resource_client': ('azure.mgmt.resource', 'ResourceManagementClient'),
+    'apim_client': ('azure.mgmt.apimanagement', 'ApiManagementClient'),
+    'aci_client': ('azure.mgmt.containerinstance', 'ContainerInstanceManagementClient'),
+    'acr_client': ('azure.mgmt.containerregistry', 'ContainerRegistryManagementClient'),
+    'cosmos_client': ('azure.mgmt.cosmosdb', 'CosmosDBManagementClient'),
+    'keyvault_client': ('azure.mgmt.keyvault', 'KeyVaultManagementClient'),
+    'network_client': ('azure.mgmt.network', 'NetworkManagementClient'),
+}
+
+# Service name accepted by --services -> scanner method yielding its endpoints
+SERVICES = {
+    'appservice': 'iter_app_services',
+    'functionapp': 'iter_function_apps',
+    'storage': 'iter_storage_accounts',
+    'apim': 'iter_api_management',
+    'aci': 'iter_container_instances',
+    'acr': 'iter_container_registries',
+    'cosmosdb': 'iter_cosmos_db',
+    'keyvault': 'iter_key_vaults',
+    'appgateway': 'iter_application_gateways',
+    'loadbalancer': 'iter_load_balancers',
+}
+
+ARM_ENDPOINT = 'https://management.azure.com'
+ARM_SCOPE = 'https://management.azure.com/.default'
+NETWORK_API_VERSION = '2024-01-01'
+
+
+def _resource_group(resource_id: str) -> str:
+    """Return the resource group segment of an ARM resource ID."""
+    return resource_id.split('/')[4]
+
+
+def raw_app_service_endpoints(site: Dict) -> List[Dict]:
+    """Endpoint records for an App Service from a raw Microsoft.Web/sites item."""
+    props = site.get('properties') or {}
+    if not props.get('enabled') or props.get('clientCertEnabled'):
+        return []
+    return [{
+        'service_type': 'App Service',
+        'name': site['name'],
+        'resource_group': props.get('resourceGroup'),
+        'url': f"https://{props.get('defaultHostName')}",
+        'kind': site.get('kind')
+    }]
+
+
+def raw_function_app_endpoints(site: Dict) -> List[Dict]:
+    """Endpoint records for a Function App from a raw Microsoft.Web/sites item."""
+    kind = site.get('kind')
+    if not kind or 'functionapp' not in kind.lower():
+        return []
+    props = site.get('properties') or {}
+    return [{
+        'service_type': 'Function App',
+        'name': site['name'],
+        'resource_group': props.get('resourceGroup'),
+        'url': f"https://{props.get('defaultHostName')}",
+        'kind': kind
+    }]
+
+
+def raw_storage_endpoints(account: Dict) -> List[Dict]:
+    """Endpoint records for a Storage Account from a raw Microsoft.Storage/storageAccounts item."""
+    props = account.get('properties') or {}
+    if not props.get('supportsHttpsTrafficOnly'):
+        return []
+    primary = props.get('primaryEndpoints') or {}
+    endpoints = []
+    for key, label in (('blob', 'Blob'), ('file', 'File'), ('table', 'Table')):
+        if primary.get(key):
+            endpoints.append({
+                'service_type': f'Storage Account ({label})',
+                'name': account['name'],
+                'resource_group': _resource_group(account['id']),
+                'url': primary[key],
+                'kind': account.get('kind')
+            })
+    return endpoints
+
+
+def raw_api_management_endpoints(service: Dict) -> List[Dict]:
+    """Endpoint records for an API Management service from a raw Microsoft.ApiManagement/service item."""
+    props = service.get('properties') or {}
+    if not props.get('publicIPAddresses'):
+        return []
+    return [{
+        'service_type': 'API Management',
+        'name': service['name'],
+        'resource_group': _resource_group(service['id']),
+        'url': f"https://{props.get('gatewayUrl')}",
+        'kind': (service.get('sku') or {}).get('name')
+    }]
+
+
+def raw_container_instance_endpoints(group: Dict) -> List[Dict]:
+    """Endpoint records for a Container Group from a raw Microsoft.ContainerInstance/containerGroups item."""
+    ip_address = (group.get('properties') or {}).get('ipAddress') or {}
+    if ip_address.get('type') != 'Public':
+        return []
+    return [{
+        'service_type': 'Container Instance',
+        'name': group['name'],
+        'resource_group': _resource_group(group['id']),
+        'url': f"{ip_address.get('ip')}",
+        'kind': 'container'
+    }]
+
+
+def raw_container_registry_endpoints(registry: Dict) -> List[Dict]:
+    """Endpoint records for a Container Registry from a raw Microsoft.ContainerRegistry/registries item."""
+    return [{
+        'service_type': 'Container Registry',
+        'name': registry['name'],
+        'resource_group': _resource_group(registry['id']),
+        'url': f"https://{(registry.get('properties') or {}).get('loginServer')}",
+        'kind': (registry.get('sku') or {}).get('name')
+    }]
+
+
+def raw_cosmos_db_endpoints(account: Dict) -> List[Dict]:
+    """Endpoint records for a Cosmos DB account from a raw Microsoft.DocumentDB/databaseAccounts item."""
+    props = account.get('properties') or {}
+    if props.get('publicNetworkAccess') != 'Enabled':
+        return []
+    return [{
+        'service_type': 'Cosmos DB',
+        'name': account['name'],
+        'resource_group': _resource_group(account['id']),
+        'url': f"https://{props.get('documentEndpoint')}",
+        'kind': account.get('kind')
+    }]
+
+
+def raw_key_vault_endpoints(vault: Dict) -> List[Dict]:
+    """Endpoint records for a Key Vault from a raw Microsoft.KeyVault/vaults item."""
+    props = vault.get('properties') or {}
+    network_acls = props.get('networkAcls')
+    if network_acls and (network_acls.get('defaultAction') or '').lower() != 'allow':
+        return []
+    return [{
+        'service_type': 'Key Vault',
+        'name': vault['name'],
+        'resource_group': _resource_group(vault['id']),
+        'url': props.get('vaultUri') or f"https://{vault['name']}.vault.azure.net/",
+        'kind': 'vault'
+    }]
+
+
+def raw_application_gateway_endpoints(gateway: Dict) -> List[Dict]:
+    """Endpoint records for an Application Gateway from a raw Microsoft.Network/applicationGateways item."""
+    props = gateway.get('properties') or {}
+    endpoints = []
+    for frontend_ip in props.get('frontendIPConfigurations') or []:
+        public_ip = (frontend_ip.get('properties') or {}).get('publicIPAddress')
+        if public_ip:
+            endpoints.append({
+                'service_type': 'Application Gateway',
+                'name': gateway['name'],
+                'resource_group': _resource_group(gateway['id']),
+                'url': public_ip['id'],
+                'kind': (props.get('sku') or {}).get('tier')
+            })
+    return endpoints
+
+
+def raw_load_balancer_endpoints(lb: Dict) -> List[Dict]:
+    """
+    Endpoint records for a Load Balancer from a raw Microsoft.Network/loadBalancers item.
+
+    `ip_address` is left unset here; AzureEndpointScanner.iter_endpoints_raw fills it
+    from a single public IP listing instead of one GET per frontend.
+    """
+    endpoints = []
+    for frontend_ip in (lb.get('properties') or {}).get('frontendIPConfigurations') or []:
+        public_ip = (frontend_ip.get('properties') or {}).get('publicIPAddress')
+        if public_ip:
+            endpoints.append({
+                'service_type': 'Load Balancer',
+                'name': lb['name'],
+                'resource_group': _resource_group(lb['id']),
+                'url': public_ip['id'],
+                'ip_address': None
+            })
+    return endpoints
+
+
+# Service name -> (subscription-level provider listing, api-version, raw extractor)
+RAW_LISTINGS = {
+    'appservice': ('Microsoft.Web/sites', '2023-12-01', raw_app_service_endpoints),
+    'functionapp': ('Microsoft.Web/sites', '2023-12-01', raw_function_app_endpoints),
+    'storage': ('Microsoft.Storage/storageAccounts', '2023-05-01', raw_storage_endpoints),
+    'apim': ('Microsoft.ApiManagement/service', '2022-08-01', raw_api_management_endpoints),
+    'aci': ('Microsoft.ContainerInstance/containerGroups', '2023-05-01', raw_container_instance_endpoints),
+    'acr': ('Microsoft.ContainerRegistry/registries', '2023-07-01', raw_container_registry_endpoints),
+    'cosmosdb': ('Microsoft.DocumentDB/databaseAccounts', '2024-05-15', raw_cosmos_db_endpoints),
+    'keyvault': ('Microsoft.KeyVault/vaults', '2023-07-01', raw_key_vault_endpoints),
+    'appgateway': ('Microsoft.Network/applicationGateways', NETWORK_API_VERSION, raw_application_gateway_endpoints),
+    'loadbalancer': ('Microsoft.Network/loadBalancers', NETWORK_API_VERSION, raw_load_balancer_endpoints),
+}
 
 class AzureEndpointScanner:
     """Scanner for Azure public endpoints across different services."""
     
-    def __init__(self, tenant_id: str, client_id: str, client_secret: str, subscription_id: str):
-        """Initialize with Azure credentials."""
-        self.credential = ClientSecretCredential(
-            tenant_id=tenant_id,
-            client_id=client_id,
-            client_secret=client_secret
-        )
+    def __init__(self, tenant_id: str, client_id: str, client_secret: str, subscription_id: str,
+                 base_url: str = ARM_ENDPOINT, credential=None, **client_kwargs):
+        """
+        Initialize with Azure credentials.
+
+        `base_url`, `credential` and any extra keyword arguments (for example
+        `authentication_policy`) are passed to every management client, which lets
+        the scanner run against a local stand-in for ARM.
+        """
+        if credential is None:
+            from azure.identity import ClientSecretCredential
+
+            credential = ClientSecretCredential(
+                tenant_id=tenant_id,
+                client_id=client_id,
+                client_secret=client_secret
+            )
+        self.credential = credential
         self.subscription_id = subscription_id
-        
-        # Initialize service clients
-        self.web_client = WebSiteManagementClient(self.credential, self.subscription_id)
-        self.storage_client = StorageManagementClient(self.credential, self.subscription_id)
-        self.sql_client = SqlManagementClient(self.credential, self.subscription_id)
-        self.aks_client = ContainerServiceClient(self.credential, self.subscription_id)
-        self.resource_client = ResourceManagementClient(self.credential, self.subscription_id)
-        self.apim_client = ApiManagementClient(self.credential, self.subscription_id)
-        self.aci_client = ContainerInstanceManagementClient(self.credential, self.subscription_id)
-        self.acr_client = ContainerRegistryManagementClient(self.credential, self.subscription_id)
-        self.cosmos_client = CosmosDBManagementClient(self.credential, self.subscription_id)
-        self.keyvault_client = KeyVaultManagementClient(self.credential, self.subscription_id)
-        self.network_client = NetworkManagementClient(self.credential, self.subscription_id)
+        self.base_url = base_url
+        self.client_kwargs = {**telemetry.sdk_client_kwargs(), **client_kwargs}
+        self._raw_client = None
 
-    def get_app_services(self) -> List[Dict]:
-        """Get all App Service public endpoints."""
-        endpoints = []
+    def __getattr__(self, name):
+        """Build a service client the first time it is accessed and keep it for reuse."""
+        if name not in SERVICE_CLIENTS:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+        module_name, class_name = SERVICE_CLIENTS[name]
+        client_class = getattr(importlib.import_module(module_name), class_name)
+        client = client_class(self.credential, self.subscription_id, base_url=self.base_url, **self.client_kwargs)
+        setattr(self, name, client)
+        return client
+
+    def _get_raw_client(self):
+        """Build the pooled pipeline used by the raw-JSON fast path."""
+        if self._raw_client is None:
+            from azure.core import PipelineClient
+            from azure.core.pipeline import policies
+            from azure.mgmt.core.policies import ARMChallengeAuthenticationPolicy
+
+            authentication_policy = self.client_kwargs.get('authentication_policy') or \
+                ARMChallengeAuthenticationPolicy(self.credential, ARM_SCOPE)
+            self._raw_client = PipelineClient(
+                base_url=self.base_url,
+                policies=[
+                    policies.HeadersPolicy(),
+                    policies.UserAgentPolicy(sdk_moniker='azure-endpoint-mapper'),
+                    policies.RetryPolicy(),
+                    authentication_policy,
+                    policies.CustomHookPolicy(
+                        raw_request_hook=self.client_kwargs.get('raw_request_hook'),
+                        raw_response_hook=self.client_kwargs.get('raw_response_hook')
+                    ),
+                    policies.NetworkTraceLoggingPolicy(),
+                ],
+            )
+        return self._raw_client
+
+    def list_raw(self, provider: str, api_version: str):
+        """
+        Yield raw JSON items of a subscription-level provider listing, following nextLink.
+
+        Args:
+            provider (str): Provider and resource type, e.g. 'Microsoft.Storage/storageAccounts'.
+            api_version (str): API version to request.
+
+        Yields:
+            Dict: One resource as returned by ARM, without SDK model deserialization.
+        """
+        from azure.core.rest import HttpRequest
+
+        client = self._get_raw_client()
+        url = f"{self.base_url}/subscriptions/{self.subscription_id}/providers/{provider}?api-version={api_version}"
+        while url:
+            response = client.send_request(HttpRequest('GET', url))
+            response.raise_for_status()
+            page = response.json()
+            yield from page.get('value', [])
+            url = page.get('nextLink')
+
+    def iter_endpoints_raw(self, service: str) -> Iterator[Dict]:
+        """
+        Fast path: yield a service's endpoints from raw JSON pages.
+
+        Produces the same records as the matching iter_* method while reading only
+        the fields the record needs instead of deserializing full SDK models.
+        """
+        provider, api_version, extract = RAW_LISTINGS[service]
+        try:
+            public_ips = None
+            if service == 'loadbalancer':
+                public_ips = {
+                    ip['id'].lower(): (ip.get('properties') or {}).get('ipAddress')
+                    for ip in self.list_raw('Microsoft.Network/publicIPAddresses', NETWORK_API_VERSION)
+                }
+            for item in self.list_raw(provider, api_version):
+                for endpoint in extract(item):
+                    if public_ips is not None:
+                        endpoint['ip_address'] = public_ips.get(endpoint['url'].lower())
+                    yield endpoint
+        except Exception as e:
+            print(f"Error fetching {service} endpoints: {str(e)}")
+
+    def get_endpoints_raw(self, service: str) -> List[Dict]:
+        """Fast path: collect a service's endpoints from raw JSON pages."""
+        return list(self.iter_endpoints_raw(service))
+
+    def iter_endpoints(self, service: str, fast: bool = False) -> Iterator[Dict]:
+        """Yield a service's endpoints as they are paged in, through the SDK or the raw fast path."""
+        if fast:
+            return self.iter_endpoints_raw(service)
+        return getattr(self, SERVICES[service])()
+
+    def iter_app_services(self) -> Iterator[Dict]:
+        """Yield all App Service public endpoints."""
         try:
             web_apps = self.web_client.web_apps.list()
             for app in web_apps:
                 if app.enabled and not app.client_cert_enabled:
-                    endpoints.append({
+                    yield {
                         'service_type': 'App Service',
                         'name': app.name,
                         'resource_group': app.resource_group,
                         'url': f"https://{app.default_host_name}",
                         'kind': app.kind
-                    })
+                    }
         except Exception as e:
             print(f"Error fetching App Services: {str(e)}")
-        return endpoints
 
-    def get_function_apps(self) -> List[Dict]:
-        """Get all Function App public endpoints."""
-        endpoints = []
+    def iter_function_apps(self) -> Iterator[Dict]:
+        """Yield all Function App public endpoints."""
         try:
             function_apps = self.web_client.web_apps.list()
             for app in function_apps:
                 if app.kind and 'functionapp' in app.kind.lower():
-                    endpoints.append({
+                    yield {
                         'service_type': 'Function App',
                         'name': app.name,
                         'resource_group': app.resource_group,
                         'url': f"https://{app.default_host_name}",
                         'kind': app.kind
-                    })
+                    }
         except Exception as e:
             print(f"Error fetching Function Apps: {str(e)}")
-        return endpoints
 
-    def get_storage_accounts(self) -> List[Dict]:
-        """Get all public Storage Account endpoints."""
-        endpoints = []
+    def iter_storage_accounts(self) -> Iterator[Dict]:
+        """Yield all public Storage Account endpoints."""
         try:
             storage_accounts = self.storage_client.storage_accounts.list()
             for account in storage_accounts:
                 if account.enable_https_traffic_only:
                     if account.primary_endpoints.blob:
-                        endpoints.append({
+                        yield {
                             'service_type': 'Storage Account (Blob)',
                             'name': account.name,
                             'resource_group': account.id.split('/')[4],
                             'url': account.primary_endpoints.blob,
                             'kind': account.kind
-                        })
+                        }
                     if account.primary_endpoints.file:
-                        endpoints.append({
+                        yield {
                             'service_type': 'Storage Account (File)',
                             'name': account.name,
                             'resource_group': account.id.split('/')[4],
                             'url': account.primary_endpoints.file,
                             'kind': account.kind
-                        })
+                        }
                     if account.primary_endpoints.table:
-                        endpoints.append({
+                        yield {
                             'service_type': 'Storage Account (Table)',
                             'name': account.name,
                             'resource_group': account.id.split('/')[4],
                             'url': account.primary_endpoints.table,
                             'kind': account.kind
-                        })
+                        }
         except Exception as e:
             print(f"Error fetching Storage Accounts: {str(e)}")
-        return endpoints
 
-    def get_api_management(self) -> List[Dict]:
-        """Get all API Management service endpoints."""
-        endpoints = []
+    def iter_api_management(self) -> Iterator[Dict]:
+        """Yield all API Management service endpoints."""
         try:
             apim_services = self.apim_client.api_management_service.list()
             for service in apim_services:
                 if service.public_ip_addresses:  # Check if public IP is enabled
-                    endpoints.append({
+                    yield {
                         'service_type': 'API Management',
                         'name': service.name,
                         'resource_group': service.id.split('/')[4],
                         'url': f"https://{service.gateway_url}",
                         'kind': service.sku.name
-                    })
+                    }
         except Exception as e:
             print(f"Error fetching API Management services: {str(e)}")
-        return endpoints
 
-    def get_container_instances(self) -> List[Dict]:
-        """Get all Container Instances with public IP."""
-        endpoints = []
+    def iter_container_instances(self) -> Iterator[Dict]:
+        """Yield all Container Instances with public IP."""
         try:
             for rg in self.resource_client.resource_groups.list():
                 containers = self.aci_client.container_groups.list_by_resource_group(rg.name)
                 for container in containers:
                     if container.ip_address and container.ip_address.type == 'Public':
-                        endpoints.append({
+                        yield {
                             'service_type': 'Container Instance',
                             'name': container.name,
                             'resource_group': rg.name,
                             'url': f"{container.ip_address.ip}",
                             'kind': 'container'
-                        })
+                        }
         except Exception as e:
             print(f"Error fetching Container Instances: {str(e)}")
-        return endpoints
 
-    def get_container_registries(self) -> List[Dict]:
-        """Get all Container Registry endpoints."""
-        endpoints = []
+    def iter_container_registries(self) -> Iterator[Dict]:
+        """Yield all Container Registry endpoints."""
         try:
             registries = self.acr_client.registries.list()
             for registry in registries:
-                endpoints.append({
+                yield {
                     'service_type': 'Container Registry',
                     'name': registry.name,
                     'resource_group': registry.id.split('/')[4],
                     'url': f"https://{registry.login_server}",
                     'kind': registry.sku.name
-                })
+                }
         except Exception as e:
             print(f"Error fetching Container Registries: {str(e)}")
-        return endpoints
 
-    def get_cosmos_db(self) -> List[Dict]:
-        """Get all Cosmos DB endpoints."""
-        endpoints = []
+    def iter_cosmos_db(self) -> Iterator[Dict]:
+        """Yield all Cosmos DB endpoints."""
         try:
             accounts = self.cosmos_client.database_accounts.list()
             for account in accounts:
-                if account.enable_public_network:
-                    endpoints.append({
+                if account.public_network_access == 'Enabled':
+                    yield {
                         'service_type': 'Cosmos DB',
                         'name': account.name,
                         'resource_group': account.id.split('/')[4],
                         'url': f"https://{account.document_endpoint}",
                         'kind': account.kind
-                    })
+                    }
         except Exception as e:
             print(f"Error fetching Cosmos DB accounts: {str(e)}")
-        return endpoints
 
-    def get_key_vaults(self) -> List[Dict]:
-            """Get all Key Vault endpoints."""
-            endpoints = []
+    def iter_key_vaults(self) -> Iterator[Dict]:
+            """Yield all Key Vault endpoints."""
             try:
-                vaults = self.keyvault_client.vaults.list()
+                # list() returns generic resources without properties, so the
+                # network ACLs could never be checked; list the vaults themselves
+                vaults = self.keyvault_client.vaults.list_by_subscription()
                 for vault in vaults:
-                    is_public = True
-                    if hasattr(vault, 'properties') and hasattr(vault.properties, 'network_acls'):
-                        is_public = vault.properties.network_acls.default_action.lower() == 'allow'            
-                    vault_uri = None
-                    if hasattr(vault, 'properties') and hasattr(vault.properties, 'vault_uri'):
-                        vault_uri = vault.properties.vault_uri
-                    elif hasattr(vault, 'vault_uri'):
-                        vault_uri = vault.vault_uri
-                    else:
-                        vault_uri = f"https://{vault.name}.vault.azure.net/"
+                    props = vault.properties
+                    network_acls = props.network_acls if props else None
+                    is_public = not network_acls or (network_acls.default_action or '').lower() == 'allow'
+                    vault_uri = (props.vault_uri if props else None) or f"https://{vault.name}.vault.azure.net/"
 
                     if is_public:
-                        endpoints.append({
+                        yield {
                             'service_type': 'Key Vault',
                             'name': vault.name,
                             'resource_group': vault.id.split('/')[4],
                             'url': vault_uri,
                             'kind': 'vault'
-                        })
+                        }
             except Exception as e:
                 print(f"Error fetching Key Vaults: {str(e)}")
                 print(f"Full error details: {str(vars(e))}")  # Add more detailed error info
-            return endpoints
 
-    def get_application_gateways(self) -> List[Dict]:
-        """Get all Application Gateway public endpoints."""
-        endpoints = []
+    def iter_application_gateways(self) -> Iterator[Dict]:
+        """Yield all Application Gateway public endpoints."""
         try:
             gateways = self.network_client.application_gateways.list_all()
             for gateway in gateways:
                 for frontend_ip in gateway.frontend_ip_configurations:
                     if hasattr(frontend_ip, 'public_ip_address') and frontend_ip.public_ip_address:
-                        endpoints.append({
+                        yield {
                             'service_type': 'Application Gateway',
                             'name': gateway.name,
                             'resource_group': gateway.id.split('/')[4],
                             'url': frontend_ip.public_ip_address.id,
                             'kind': gateway.sku.tier
-                        })
+                        }
         except Exception as e:
             print(f"Error fetching Application Gateways: {str(e)}")
-        return endpoints
 
-    def get_load_balancers(self) -> List[Dict]:
-            """Get all Load Balancer public endpoints."""
-            endpoints = []
+    def iter_load_balancers(self) -> Iterator[Dict]:
+            """Yield all Load Balancer public endpoints."""
             try:
                 load_balancers = self.network_client.load_balancers.list_all()
                 for lb in load_balancers:
@@ -247,19 +516,138 @@ class AzureEndpointScanner:
                                 resource_group_name=resource_group,
                                 public_ip_address_name=ip_name
                             )
-                            endpoints.append({
+                            yield {
                                 'service_type': 'Load Balancer',
                                 'name': lb.name,
                                 'resource_group': lb.id.split('/')[4],
                                 'url': ip_resource_id,  # Keep the resource ID for reference
                                 'ip_address': public_ip.ip_address
-                            })
+                            }
             except Exception as e:
                 print(f"Error fetching Load Balancers: {str(e)}")
-            return endpoints
 
-def main():
+    def get_app_services(self) -> List[Dict]:
+        """Get all App Service public endpoints."""
+        return list(self.iter_app_services())
+
+    def get_function_apps(self) -> List[Dict]:
+        """Get all Function App public endpoints."""
+        return list(self.iter_function_apps())
+
+    def get_storage_accounts(self) -> List[Dict]:
+        """Get all public Storage Account endpoints."""
+        return list(self.iter_storage_accounts())
+
+    def get_api_management(self) -> List[Dict]:
+        """Get all API Management service endpoints."""
+        return list(self.iter_api_management())
+
+    def get_container_instances(self) -> List[Dict]:
+        """Get all Container Instances with public IP."""
+        return list(self.iter_container_instances())
+
+    def get_container_registries(self) -> List[Dict]:
+        """Get all Container Registry endpoints."""
+        return list(self.iter_container_registries())
+
+    def get_cosmos_db(self) -> List[Dict]:
+        """Get all Cosmos DB endpoints."""
+        return list(self.iter_cosmos_db())
+
+    def get_key_vaults(self) -> List[Dict]:
+        """Get all Key Vault endpoints."""
+        return list(self.iter_key_vaults())
+
+    def get_application_gateways(self) -> List[Dict]:
+        """Get all Application Gateway public endpoints."""
+        return list(self.iter_application_gateways())
+
+    def get_load_balancers(self) -> List[Dict]:
+        """Get all Load Balancer public endpoints."""
+        return list(self.iter_load_balancers())
+
+def format_probe(probe: Dict) -> str:
+    """One-line summary of an endpoint probe result."""
+    if probe['http_status'] is not None:
+        status = f"HTTP {probe['http_status']}"
+        if probe['cert_valid'] is False:
+            status += " (invalid certificate)"
+        return status
+    stage = 'http' if probe['tcp'] else 'connect' if probe['dns'] else 'dns'
+    return f"unreachable at {stage}: {probe['error']}"
+
+def stream_endpoints(scanner: AzureEndpointScanner, args: argparse.Namespace, probe_options: Dict):
+    """
+    Write endpoints to --output-dir in batches as each collector pages through results.
+
+    Memory stays bounded by --chunk-size: every batch is probed (when requested),
+    written and flushed before the next one is read from the collector.
+    """
+    formats = ('jsonl', 'csv') if args.format == 'both' else (args.format,)
+    with EndpointWriter(args.output_dir, formats=formats) as writer:
+        for service in args.services:
+            for chunk in chunked(scanner.iter_endpoints(service, fast=args.fast), args.chunk_size):
+                if args.probe:
+                    probe_endpoints(chunk, **probe_options)
+                writer.write_many(chunk)
+    summary = writer.summary()
+    print(f"\nTotal public endpoints found: {summary['total_endpoints']}")
+    print("\nSummary by service type:")
+    for service_type, count in summary['by_service_type'].items():
+        print(f"{service_type}: {count} endpoint(s)")
+    if args.probe:
+        print(f"\nEndpoints answering HTTP: {summary['reachable']}/{summary['probed']}")
+    telemetry.export(
+        json_path=os.path.join(args.output_dir, 'telemetry.json'),
+        prometheus_path=os.path.join(args.output_dir, 'telemetry.prom')
+    )
+    print(f"\nResults written to {', '.join(summary['files'].values())} and {writer.summary_path}")
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments for the endpoint scanner."""
+    parser = argparse.ArgumentParser(description="Scan an Azure subscription for public endpoints.")
+    parser.add_argument(
+        '--services',
+        default=','.join(SERVICES),
+        help=f"Comma separated services to scan (default: all). Choices: {', '.join(SERVICES)}"
+    )
+    parser.add_argument(
+        '--fast',
+        action='store_true',
+        help="List resources as raw JSON instead of deserializing full SDK models"
+    )
+    parser.add_argument(
+        '--probe',
+        action='store_true',
+        help="Check DNS, TCP, TLS and HTTP reachability of every endpoint found"
+    )
+    parser.add_argument('--probe-concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Maximum probes in flight (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument('--probe-per-host', type=int, default=DEFAULT_PER_HOST,
+                        help=f"Maximum concurrent probes per host (default: {DEFAULT_PER_HOST})")
+    parser.add_argument('--probe-timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help=f"Per-stage probe timeout in seconds (default: {DEFAULT_TIMEOUT})")
+    parser.add_argument(
+        '--output-dir',
+        help="Stream endpoints to files in this directory instead of printing a report"
+    )
+    parser.add_argument('--format', default='jsonl', choices=['jsonl', 'csv', 'both'],
+                        help="Record format written to --output-dir (default: jsonl)")
+    parser.add_argument('--chunk-size', type=int, default=200,
+                        help="Endpoints probed and written per batch in streaming mode (default: 200)")
+    args = parser.parse_args(argv)
+    args.services = [s.strip() for s in args.services.split(',') if s.strip()]
+    unknown = [s for s in args.services if s not in SERVICES]
+    if unknown:
+        parser.error(f"unknown service(s): {', '.join(unknown)}")
+    return args
+
+def main(argv: Optional[List[str]] = None):
     """Main function to scan and display all public endpoints."""
+    import config
+
+    args = parse_args(argv)
+
     # Get credentials from config file
     tenant_id = config.TENANT_ID
     client_id = config.CLIENT_ID
@@ -268,18 +656,23 @@ def main():
 
     scanner = AzureEndpointScanner(tenant_id, client_id, client_secret, subscription_id)
     
-    # Collect all endpoints
+    probe_options = {
+        'concurrency': args.probe_concurrency,
+        'per_host': args.probe_per_host,
+        'timeout': args.probe_timeout,
+    }
+
+    if args.output_dir:
+        stream_endpoints(scanner, args, probe_options)
+        return
+
+    # Collect endpoints for the selected services only
     all_endpoints = []
-    all_endpoints.extend(scanner.get_app_services())
-    all_endpoints.extend(scanner.get_function_apps())
-    all_endpoints.extend(scanner.get_storage_accounts())
-    all_endpoints.extend(scanner.get_api_management())
-    all_endpoints.extend(scanner.get_container_instances())
-    all_endpoints.extend(scanner.get_container_registries())
-    all_endpoints.extend(scanner.get_cosmos_db())
-    all_endpoints.extend(scanner.get_key_vaults())
-    all_endpoints.extend(scanner.get_application_gateways())
-    all_endpoints.extend(scanner.get_load_balancers())
+    for service in args.services:
+        all_endpoints.extend(scanner.iter_endpoints(service, fast=args.fast))
+
+    if args.probe:
+        probe_endpoints(all_endpoints, **probe_options)
 
     # Group endpoints by service type
     endpoints_by_type = {}
@@ -300,6 +693,8 @@ def main():
             print(f"URL: {endpoint['url']}")
             if service_type == 'Load Balancer' and 'ip_address' in endpoint:
                 print(f"Public IP: {endpoint['ip_address']}")
+            if 'probe' in endpoint:
+                print(f"Reachability: {format_probe(endpoint['probe'])}")
             print("-" * 80)
 
     print(f"\nTotal public endpoints found: {len(all_endpoints)}")
@@ -307,5 +702,9 @@ def main():
     for service_type, endpoints in endpoints_by_type.items():
         print(f"{service_type}: {len(endpoints)} endpoint(s)")
 
+    if args.probe:
+        answered = sum(1 for e in all_endpoints if e['probe']['http_status'] is not None)
+        print(f"\nEndpoints answering HTTP: {answered}/{len(all_endpoints)}")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
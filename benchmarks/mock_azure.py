@@ -0,0 +1,568 @@
+"""
+Local stand-in for ARM, Microsoft Graph and the management endpoints used by the SDK clients.
+
+Serves a deterministic synthetic tenant (management groups, subscriptions, resource
+groups, resources, role assignments, classic administrators and Graph objects)
+with optional injected latency, paging and 429 throttling. Request counts per
+endpoint family are exposed on /_stats so benchmarks can report them.
+
+Usage:
+    python benchmarks/mock_azure.py --port 8080 --subscriptions 10 --latency-ms 20
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from synthetic import public_ip_item, synthetic_item
+from helpers.roles import azure_roles
+
+AUTHZ = "/providers/microsoft.authorization/"
+MG_PREFIX = "/providers/Microsoft.Management/managementGroups/"
+
+# Resource types spread over each resource group, in rotation
+RESOURCE_ROTATION = [
+    "appservice", "storage", "keyvault", "acr", "cosmosdb", "apim",
+    "aci", "appgateway", "loadbalancer", "logicapp",
+]
+
+
+def _guid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def scope_prefixes(scope):
+    """Subscription, resource group and resource prefixes of a lower-cased ARM scope."""
+    parts = scope.split("/")
+    prefixes = []
+    for depth in (3, 5):
+        if len(parts) > depth:
+            prefixes.append("/".join(parts[:depth]))
+    prefixes.append(scope)
+    return prefixes
+
+
+class SyntheticTenant:
+    """
+    Deterministic synthetic tenant with the indexes the mock server needs.
+    """
+
+    def __init__(self, subscriptions=5, management_groups=3, resource_groups=10, resources=20,
+                 assignments_per_scope=3, resource_assignment_ratio=0.2, service_principals=2000,
+                 users=1000, groups=200, seed=42):
+        """
+        Generate the tenant.
+
+        Args:
+            subscriptions (int): Number of subscriptions.
+            management_groups (int): Child management groups below the tenant root group.
+            resource_groups (int): Resource groups per subscription.
+            resources (int): Resources per resource group.
+            assignments_per_scope (int): Role assignments at each MG, subscription and resource group.
+            resource_assignment_ratio (float): Share of resources that also carry assignments.
+            service_principals (int): Graph service principals.
+            users (int): Graph users.
+            groups (int): Graph groups.
+            seed (int): Random seed.
+        """
+        rng = random.Random(seed)
+        self.tenant_id = _guid(rng)
+        self.role_ids = sorted(azure_roles)
+
+        self.service_principals = [self._service_principal(rng, i) for i in range(service_principals)]
+        self.users = [self._user(rng, i) for i in range(users)]
+        self.groups = [self._group(rng, i) for i in range(groups)]
+        self.principals = (
+            [(sp["id"], "ServicePrincipal") for sp in self.service_principals]
+            + [(u["id"], "User") for u in self.users]
+            + [(g["id"], "Group") for g in self.groups]
+        ) or [(_guid(rng), "User")]
+
+        root_id = f"{MG_PREFIX}{self.tenant_id}"
+        self.management_groups = [self._management_group(root_id, self.tenant_id, "Tenant Root Group", None)]
+        self.mg_parent = {root_id.lower(): None}
+        for i in range(management_groups):
+            mg_id = f"{MG_PREFIX}mg-{i}"
+            self.management_groups.append(self._management_group(mg_id, f"mg-{i}", f"Management group {i}", root_id))
+            self.mg_parent[mg_id.lower()] = root_id.lower()
+
+        self.subscriptions = []
+        self.sub_parent = {}
+        self.resource_groups = defaultdict(list)
+        self.resources = []
+        self.classic_admins = defaultdict(list)
+        self.role_assignments = []
+
+        for mg in self.management_groups:
+            self._add_assignments(rng, mg["id"], assignments_per_scope)
+
+        counter = 0
+        for s in range(subscriptions):
+            sub_guid = _guid(rng)
+            sub_id = f"/subscriptions/{sub_guid}"
+            parent = self.management_groups[1 + s % management_groups]["id"] if management_groups else root_id
+            self.sub_parent[sub_id.lower()] = parent.lower()
+            self.subscriptions.append({
+                "id": sub_id, "subscriptionId": sub_guid, "tenantId": self.tenant_id,
+                "displayName": f"Subscription {s}", "state": "Enabled",
+                "subscriptionPolicies": {"locationPlacementId": "Public_2014-09-01",
+                                         "quotaId": "PayAsYouGo_2014-09-01", "spendingLimit": "Off"},
+                "authorizationSource": "RoleBased",
+            })
+            self.classic_admins[sub_id.lower()] = [self._classic_admin(sub_id, rng, n) for n in range(2)]
+            self._add_assignments(rng, sub_id, assignments_per_scope)
+
+            for g in range(resource_groups):
+                rg_name = f"rg-{g}"
+                rg_id = f"{sub_id}/resourceGroups/{rg_name}"
+                self.resource_groups[sub_id.lower()].append({
+                    "id": rg_id, "name": rg_name, "type": "Microsoft.Resources/resourceGroups",
+                    "location": "westeurope", "properties": {"provisioningState": "Succeeded"},
+                })
+                self._add_assignments(rng, rg_id, assignments_per_scope)
+                for _ in range(resources):
+                    service = RESOURCE_ROTATION[counter % len(RESOURCE_ROTATION)]
+                    if service == "logicapp":
+                        resource = self._logic_app(counter, sub_guid, rg_name)
+                    else:
+                        resource = synthetic_item(service, counter, sub_guid, rg_name)
+                    self.resources.append(resource)
+                    if service in ("appgateway", "loadbalancer"):
+                        self.resources.append(public_ip_item(counter, sub_guid, rg_name))
+                    if rng.random() < resource_assignment_ratio:
+                        self._add_assignments(rng, resource["id"], 1)
+                    counter += 1
+
+        self._add_group_members(random.Random(seed + 1))
+        self._add_directory_objects(random.Random(seed + 2))
+        self._build_indexes()
+
+    def _add_group_members(self, rng):
+        # Direct members of each group; in every run of five groups each one nests the
+        # next and the last nests the first, forming a cycle
+        self.group_members = {}
+        for i, group in enumerate(self.groups):
+            members = [("#microsoft.graph.user", u) for u in rng.sample(self.users, min(len(self.users), 25))]
+            members += [("#microsoft.graph.servicePrincipal", sp)
+                        for sp in rng.sample(self.service_principals, min(len(self.service_principals), 5))]
+            nested = i + 1 if i % 5 < 4 else i - 4
+            if nested < len(self.groups) and nested != i:
+                members.append(("#microsoft.graph.group", self.groups[nested]))
+            self.group_members[group["id"].lower()] = members
+
+    def _add_directory_objects(self, rng):
+        # Applications behind the non-managed-identity service principals, a few directory
+        # roles and an admin-consented delegated grant for every tenth service principal
+        self.applications = [
+            {"id": _guid(rng), "appId": sp["appId"], "displayName": sp["displayName"],
+             "signInAudience": "AzureADMyOrg", "passwordCredentials": [], "keyCredentials": []}
+            for sp in self.service_principals if sp["servicePrincipalType"] == "Application"
+        ]
+        self.directory_roles = [
+            {"id": _guid(rng), "displayName": name, "roleTemplateId": _guid(rng)}
+            for name in ("Global Administrator", "Privileged Role Administrator", "Application Administrator")
+        ]
+        resource = self.service_principals[0]["id"] if self.service_principals else _guid(rng)
+        self.oauth2_permission_grants = [
+            {"id": _guid(rng), "clientId": sp["id"], "consentType": "AllPrincipals", "principalId": None,
+             "resourceId": resource, "scope": "User.Read Directory.Read.All"}
+            for sp in self.service_principals[::10]
+        ]
+
+    def transitive_members(self, group_id, select):
+        """The `transitiveMembers` listing of a group, as Graph resolves it, or None for an unknown group."""
+        if group_id not in self.group_members:
+            return None
+        fields = [field for field in select.split(",") if field] if select else None
+        members, seen, pending = [], set(), [group_id]
+        while pending:
+            for odata_type, member in self.group_members.get(pending.pop(), []):
+                key = member["id"].lower()
+                if key in seen:
+                    continue
+                seen.add(key)
+                if odata_type == "#microsoft.graph.group":
+                    pending.append(key)
+                item = {k: v for k, v in member.items() if fields is None or k in fields}
+                members.append({"@odata.type": odata_type, **item})
+        return members
+
+    def _management_group(self, mg_id, name, display_name, parent_id):
+        return {
+            "id": mg_id, "type": "Microsoft.Management/managementGroups", "name": name,
+            "properties": {"tenantId": self.tenant_id, "displayName": display_name,
+                           "details": {"parent": {"id": parent_id} if parent_id else None}},
+        }
+
+    def _service_principal(self, rng, i):
+        return {
+            "id": _guid(rng), "appId": _guid(rng), "displayName": f"sp-{i}",
+            "servicePrincipalType": "ManagedIdentity" if i % 4 == 0 else "Application",
+            "accountEnabled": True, "appOwnerOrganizationId": None,
+            "servicePrincipalNames": [f"https://sp-{i}.example.com"],
+            "tags": ["WindowsAzureActiveDirectoryIntegratedApp"],
+            "appRoles": [], "oauth2PermissionScopes": [], "keyCredentials": [], "passwordCredentials": [],
+        }
+
+    def _user(self, rng, i):
+        return {"id": _guid(rng), "displayName": f"User {i}", "userPrincipalName": f"user{i}@example.com",
+                "mail": f"user{i}@example.com", "accountEnabled": i % 20 != 0}
+
+    def _group(self, rng, i):
+        return {"id": _guid(rng), "displayName": f"Group {i}", "securityEnabled": True,
+                "mailEnabled": False, "groupTypes": []}
+
+    def _classic_admin(self, sub_id, rng, n):
+        name = _guid(rng)
+        return {
+            "id": f"{sub_id}/providers/Microsoft.Authorization/classicAdministrators/{name}",
+            "name": name, "type": "Microsoft.Authorization/classicAdministrators",
+            "properties": {"emailAddress": f"admin{n}@example.com",
+                           "role": "ServiceAdministrator" if n == 0 else "CoAdministrator"},
+        }
+
+    def _logic_app(self, i, sub_guid, rg_name):
+        name = f"res{i}"
+        actions = {f"action{n}": {"type": "Http", "inputs": {"method": "GET", "uri": f"https://api{n}.example.com/{i}"},
+                                  "runAfter": {}} for n in range(20)}
+        return {
+            "id": f"/subscriptions/{sub_guid}/resourceGroups/{rg_name}/providers/Microsoft.Logic/workflows/{name}",
+            "name": name, "type": "Microsoft.Logic/workflows", "location": "westeurope",
+            "properties": {
+                "state": "Enabled", "provisioningState": "Succeeded", "version": "08585",
+                "createdTime": "2024-01-01T00:00:00Z", "changedTime": "2024-05-01T00:00:00Z",
+                "definition": {
+                    "$schema": "https://schema.management.azure.com/providers/Microsoft.Logic/schemas/"
+                               "2016-06-01/workflowdefinition.json#",
+                    "contentVersion": "1.0.0.0",
+                    "triggers": {"recurrence": {"type": "Recurrence",
+                                                "recurrence": {"frequency": "Hour", "interval": 1}}},
+                    "actions": actions,
+                },
+                "parameters": {},
+            },
+        }
+
+    def _add_assignments(self, rng, scope, count):
+        for _ in range(count):
+            principal_id, principal_type = rng.choice(self.principals)
+            name = _guid(rng)
+            self.role_assignments.append({
+                "id": f"{scope}/providers/Microsoft.Authorization/roleAssignments/{name}",
+                "type": "Microsoft.Authorization/roleAssignments",
+                "name": name,
+                "properties": {
+                    "roleDefinitionId": f"/providers/Microsoft.Authorization/roleDefinitions/"
+                                        f"{rng.choice(self.role_ids)}",
+                    "principalId": principal_id,
+                    "principalType": principal_type,
+                    "scope": scope,
+                    "condition": None,
+                    "conditionVersion": None,
+                    "createdOn": "2024-01-01T00:00:00.0000000Z",
+                    "updatedOn": "2024-01-01T00:00:00.0000000Z",
+                    "createdBy": principal_id,
+                    "updatedBy": principal_id,
+                    "delegatedManagedIdentityResourceId": None,
+                    "description": None,
+                },
+            })
+
+    def _build_indexes(self):
+        self.resource_by_id = {r["id"].lower(): r for r in self.resources}
+        self.resources_by_rg = defaultdict(list)
+        self.resources_by_sub_type = defaultdict(list)
+        self.resources_by_rg_type = defaultdict(list)
+        for r in self.resources:
+            rid = r["id"].lower()
+            sub, rg = "/".join(rid.split("/")[:3]), "/".join(rid.split("/")[:5])
+            t = r["type"].lower()
+            self.resources_by_rg[rg].append(r)
+            self.resources_by_sub_type[(sub, t)].append(r)
+            self.resources_by_rg_type[(rg, t)].append(r)
+        self.assignments_at = defaultdict(list)
+        self.assignments_below = defaultdict(list)
+        for a in self.role_assignments:
+            scope = a["properties"]["scope"].lower()
+            self.assignments_at[scope].append(a)
+            if not scope.startswith("/providers/"):
+                for prefix in scope_prefixes(scope):
+                    self.assignments_below[prefix].append(a)
+        self.graph = {
+            "serviceprincipals": self.service_principals,
+            "users": self.users,
+            "groups": self.groups,
+            "applications": self.applications,
+            "directoryroles": self.directory_roles,
+            "oauth2permissiongrants": self.oauth2_permission_grants,
+        }
+
+    def management_group_chain(self, mg_id):
+        chain = []
+        while mg_id:
+            chain.append(mg_id)
+            mg_id = self.mg_parent.get(mg_id)
+        return chain
+
+    def management_group_tree(self, mg_id):
+        """The `$expand=children&$recurse=true` response for management group `mg_id` (lower-cased)."""
+        groups = {mg["id"].lower(): mg for mg in self.management_groups}
+        if mg_id not in groups:
+            return None
+
+        def children(parent):
+            nodes = [
+                {"id": mg["id"], "type": mg["type"], "name": mg["name"],
+                 "displayName": mg["properties"]["displayName"], "children": children(key)}
+                for key, mg in groups.items() if self.mg_parent.get(key) == parent
+            ]
+            nodes += [
+                {"id": sub["id"], "type": "/subscriptions", "name": sub["subscriptionId"],
+                 "displayName": sub["displayName"], "children": None}
+                for sub in self.subscriptions if self.sub_parent.get(sub["id"].lower()) == parent
+            ]
+            return nodes or None
+
+        group = groups[mg_id]
+        return dict(group, properties=dict(group["properties"], children=children(mg_id)))
+
+    def role_assignments_for(self, scope, at_scope):
+        """Role assignments ARM returns for a list at `scope` (lower-cased)."""
+        if scope.startswith("/providers/"):
+            ancestors = self.management_group_chain(scope)
+            return [a for mg in ancestors for a in self.assignments_at[mg]]
+        prefixes = scope_prefixes(scope)
+        ancestors = self.management_group_chain(self.sub_parent.get(prefixes[0]))
+        inherited = [a for mg in ancestors for a in self.assignments_at[mg]]
+        inherited += [a for p in prefixes[:-1] for a in self.assignments_at[p]]
+        own = self.assignments_at[scope] if at_scope else self.assignments_below[scope]
+        return inherited + own
+
+    def summary(self):
+        return {
+            "tenant_id": self.tenant_id,
+            "management_groups": len(self.management_groups),
+            "subscriptions": len(self.subscriptions),
+            "resource_groups": sum(len(v) for v in self.resource_groups.values()),
+            "resources": len(self.resources),
+            "role_assignments": len(self.role_assignments),
+            "service_principals": len(self.service_principals),
+            "users": len(self.users),
+            "groups": len(self.groups),
+        }
+
+
+class MockAzureServer(ThreadingHTTPServer):
+    """HTTP server serving a SyntheticTenant as ARM and Graph would."""
+
+    daemon_threads = True
+
+    def __init__(self, address, tenant, page_size=100, latency_ms=0.0, throttle_rate=0.0,
+                 retry_after=1, seed=42):
+        super().__init__(address, MockAzureHandler)
+        self.tenant = tenant
+        self.page_size = page_size
+        self.latency = latency_ms / 1000.0
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.stats = Counter()
+        self.response_bytes = Counter()
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+
+    def count(self, family, nbytes=0):
+        with self._lock:
+            self.stats[family] += 1
+            self.response_bytes[family] += nbytes
+
+    def should_throttle(self):
+        if not self.throttle_rate:
+            return False
+        with self._lock:
+            return self._rng.random() < self.throttle_rate
+
+
+class MockAzureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without TCP_NODELAY every
+    # keep-alive response stalls ~40 ms on delayed ACKs and swamps the measurements.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        path = re.sub(r"/{2,}", "/", parts.path).rstrip("/") or "/"
+        query = dict(parse_qsl(parts.query, keep_blank_values=True))
+        server = self.server
+
+        if path == "/_stats":
+            return self._send(200, {"requests": dict(server.stats), "bytes": dict(server.response_bytes)})
+        if path == "/_tenant":
+            return self._send(200, server.tenant.summary())
+
+        if server.latency:
+            time.sleep(server.latency)
+        if server.should_throttle():
+            server.count("throttled")
+            return self._send(429, {"error": {"code": "TooManyRequests", "message": "Throttled"}},
+                              headers={"Retry-After": str(server.retry_after)})
+
+        family, result = self._route(path.lower(), query)
+        if result is None:
+            server.count("not_found")
+            return self._send(404, {"error": {"code": "NotFound", "message": path}})
+        if isinstance(result, list):
+            result = self._page(result, family.startswith("graph"), query)
+        body = self._send(200, result)
+        server.count(family, body)
+
+    def _route(self, path, query):
+        tenant = self.server.tenant
+        at_scope = "atscope()" in query.get("$filter", "").lower()
+
+        if path.startswith("/v1.0/"):
+            collection = path[len("/v1.0/"):]
+            match = re.fullmatch(r"groups/([^/]+)/transitivemembers", collection)
+            if match:
+                return "graph:transitiveMembers", tenant.transitive_members(match.group(1), query.get("$select"))
+            return f"graph:{collection}", tenant.graph.get(collection)
+        if path == "/subscriptions":
+            return "arm:subscriptions", tenant.subscriptions
+        if path == "/providers/microsoft.management/managementgroups":
+            return "arm:managementGroups", tenant.management_groups
+        if path.startswith("/providers/microsoft.management/managementgroups/") and "$expand" in query:
+            return "arm:managementGroups", tenant.management_group_tree(path)
+        if path.endswith(f"{AUTHZ}roleassignments"):
+            return "arm:roleAssignments", tenant.role_assignments_for(path[:-len(f"{AUTHZ}roleassignments")], at_scope)
+        if path.endswith(f"{AUTHZ}classicadministrators"):
+            return "arm:classicAdministrators", tenant.classic_admins.get(path[:-len(f"{AUTHZ}classicadministrators")])
+
+        segments = path.split("/")[1:]
+        if len(segments) < 2 or segments[0] != "subscriptions":
+            return "unknown", None
+        sub = f"/subscriptions/{segments[1]}"
+        rest = segments[2:]
+        if rest == ["resourcegroups"]:
+            return "arm:resourceGroups", tenant.resource_groups.get(sub)
+        if rest == ["resources"]:
+            match = re.search(r"resourcetype eq '([^']+)'", query.get("$filter", "").lower())
+            if match:
+                return "arm:resources", tenant.resources_by_sub_type.get((sub, match.group(1)), [])
+            return "arm:resources", [r for r in tenant.resources if r["id"].lower().startswith(sub + "/")]
+        if len(rest) == 3 and rest[0] == "providers":
+            resource_type = f"{rest[1]}/{rest[2]}"
+            return f"arm:{resource_type}", tenant.resources_by_sub_type.get((sub, resource_type), [])
+        if len(rest) >= 2 and rest[0] == "resourcegroups":
+            rg = f"{sub}/resourcegroups/{rest[1]}"
+            tail = rest[2:]
+            if tail == ["resources"]:
+                return "arm:resources", tenant.resources_by_rg.get(rg, [])
+            if len(tail) == 3 and tail[0] == "providers":
+                resource_type = f"{tail[1]}/{tail[2]}"
+                return f"arm:{resource_type}", tenant.resources_by_rg_type.get((rg, resource_type), [])
+            if len(tail) == 4 and tail[0] == "providers":
+                return f"arm:{tail[1]}/{tail[2]}", tenant.resource_by_id.get(path)
+        return "unknown", None
+
+    def _page(self, items, graph, query):
+        offset = int(query.get("$skiptoken", 0) or 0)
+        page_size = self.server.page_size
+        page = {"value": items[offset:offset + page_size]}
+        if offset + page_size < len(items):
+            next_query = dict(query, **{"$skiptoken": str(offset + page_size)})
+            path = urlsplit(self.path).path
+            next_link = f"http://{self.headers.get('Host')}{path}?{urlencode(next_query)}"
+            page["@odata.nextLink" if graph else "nextLink"] = next_link
+        return page
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+        return len(body)
+
+
+def run_server(tenant_options, server_options, port_queue=None, host="127.0.0.1", port=0):
+    """
+    Build the tenant and serve it until the process is stopped.
+
+    Args:
+        tenant_options (Dict): Keyword arguments for SyntheticTenant.
+        server_options (Dict): Keyword arguments for MockAzureServer.
+        port_queue (multiprocessing.Queue): Receives the bound port once the server is ready.
+        host (str): Interface to bind.
+        port (int): Port to bind; 0 picks a free one.
+    """
+    tenant = SyntheticTenant(**tenant_options)
+    server = MockAzureServer((host, port), tenant, **server_options)
+    if port_queue is not None:
+        port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def add_tenant_arguments(parser):
+    """Command line options shared by the mock server and the benchmark suite."""
+    parser.add_argument("--subscriptions", type=int, default=5)
+    parser.add_argument("--management-groups", type=int, default=3)
+    parser.add_argument("--resource-groups", type=int, default=10, help="Per subscription")
+    parser.add_argument("--resources", type=int, default=20, help="Per resource group")
+    parser.add_argument("--assignments-per-scope", type=int, default=3)
+    parser.add_argument("--service-principals", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--groups", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added to every response")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds on 429 responses")
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def options_from_args(args):
+    """Split parsed arguments into SyntheticTenant and MockAzureServer options."""
+    tenant_options = {
+        "subscriptions": args.subscriptions,
+        "management_groups": args.management_groups,
+        "resource_groups": args.resource_groups,
+        "resources": args.resources,
+        "assignments_per_scope": args.assignments_per_scope,
+        "service_principals": args.service_principals,
+        "users": args.users,
+        "groups": args.groups,
+        "seed": args.seed,
+    }
+    server_options = {
+        "page_size": args.page_size,
+        "latency_ms": args.latency_ms,
+        "throttle_rate": args.throttle_rate,
+        "retry_after": args.retry_after,
+        "seed": args.seed,
+    }
+    return tenant_options, server_options
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a synthetic tenant as ARM and Graph.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    add_tenant_arguments(parser)
+    args = parser.parse_args()
+    tenant_options, server_options = options_from_args(args)
+    print(f"Serving synthetic tenant on http://{args.host}:{args.port}")
+    run_server(tenant_options, server_options, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
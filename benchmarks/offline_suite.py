@@ -0,0 +1,198 @@
+"""
+Offline benchmark suite: run the collectors against the local mock ARM/Graph server.
+
+Starts benchmarks/mock_azure.py in a separate process (so its CPU and memory do not
+count against the collectors), points modules.arm_data, modules.graph_data and
+AzureEndpointScanner at it, and runs each phase in turn. The collectors_scheduled
+phase then runs the same collectors through the dependency-aware scheduler. Every phase reports wall
+time, requests served, records returned, throughput and the peak RSS so far.
+
+Usage:
+    python benchmarks/offline_suite.py
+    python benchmarks/offline_suite.py --subscriptions 20 --latency-ms 30 --throttle-rate 0.01 \
+        --report bench_output.json
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_azure import add_tenant_arguments, options_from_args, run_server  # noqa: E402
+
+
+class StaticTokenAuthClient:
+    """Stand-in for helpers.auth clients; the mock server does not check tokens."""
+
+    def get_token(self):
+        return "mock-token"
+
+
+class StaticTokenCredential:
+    """Stand-in for azure.identity credentials handed to the SDK clients."""
+
+    def get_token(self, *scopes, **kwargs):
+        from azure.core.credentials import AccessToken
+
+        return AccessToken("mock-token", int(time.time()) + 3600)
+
+
+def peak_rss_mb():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return usage / (1024 * 1024) if platform.system() == "Darwin" else usage / 1024
+
+
+class MockServer:
+    """Runs the mock server in a child process for the duration of a `with` block."""
+
+    def __init__(self, tenant_options, server_options):
+        self.tenant_options = tenant_options
+        self.server_options = server_options
+        self.process = None
+        self.base_url = None
+
+    def __enter__(self):
+        port_queue = multiprocessing.Queue()
+        self.process = multiprocessing.Process(
+            target=run_server, args=(self.tenant_options, self.server_options),
+            kwargs={"port_queue": port_queue}, daemon=True,
+        )
+        self.process.start()
+        self.base_url = f"http://127.0.0.1:{port_queue.get(timeout=600)}"
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.process.terminate()
+        self.process.join()
+
+    def get(self, path):
+        with urllib.request.urlopen(f"{self.base_url}{path}") as response:
+            return json.load(response)
+
+    def request_count(self):
+        return sum(self.get("/_stats")["requests"].values())
+
+
+def run_phase(server, results, name, fn, *args):
+    """Run one phase and append its measurements to `results`."""
+    requests_before = server.request_count()
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    output = fn(*args)
+    wall = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    requests = server.request_count() - requests_before
+    records = len(output) if hasattr(output, "__len__") else 0
+    results.append({
+        "phase": name,
+        "wall_seconds": round(wall, 4),
+        "cpu_seconds": round(cpu, 4),
+        "requests": requests,
+        "records": records,
+        "records_per_second": round(records / wall, 1) if wall else None,
+        "requests_per_second": round(requests / wall, 1) if wall else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    })
+    return output
+
+
+def scan_all(base_url, subscriptions, fast):
+    from azure.core.pipeline.policies import SansIOHTTPPolicy
+
+    from azure_endpoint_mapper import SERVICES, AzureEndpointScanner
+
+    endpoints = []
+    for sub in subscriptions:
+        scanner = AzureEndpointScanner(
+            None, None, None, sub["subscriptionId"], base_url=base_url,
+            credential=StaticTokenCredential(), authentication_policy=SansIOHTTPPolicy(),
+        )
+        for service in SERVICES:
+            endpoints.extend(scanner.iter_endpoints(service, fast=fast))
+    return endpoints
+
+
+def run_scheduled(auth, workers):
+    """Run every output collector through the registry's scheduler; returns all collected records."""
+    from helpers.collector_registry import registry
+
+    results = registry.run(registry.outputs(), {"arm": auth, "graph": auth}, max_workers=workers)
+    return [record for name in registry.outputs() if isinstance(results.get(name), list) for record in results[name]]
+
+
+def translate_roles(role_assignments, workdir):
+    from helpers.role_translator import RoleTranslator
+
+    input_file = os.path.join(workdir, "role_assignments.json")
+    output_file = os.path.join(workdir, "role_assignments_processed.json")
+    with open(input_file, "w") as f:
+        json.dump(role_assignments, f)
+    RoleTranslator().process_role_assignments(input_file, output_file)
+    return role_assignments
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the collectors against a synthetic tenant.")
+    add_tenant_arguments(parser)
+    parser.add_argument("--skip-scanner", action="store_true", help="Skip the AzureEndpointScanner phases")
+    parser.add_argument("--workers", type=int, default=4, help="Scheduler workers for the collectors_scheduled phase")
+    parser.add_argument("--report", help="Write the measurements as JSON to this file")
+    args = parser.parse_args()
+    tenant_options, server_options = options_from_args(args)
+
+    import main as collector
+    from modules import arm_data, graph_data
+
+    logging.getLogger().setLevel(logging.WARNING)
+    auth = StaticTokenAuthClient()
+    results = []
+
+    with MockServer(tenant_options, server_options) as server, tempfile.TemporaryDirectory() as workdir:
+        arm_data.ARM_ENDPOINT = server.base_url
+        graph_data.GRAPH_ENDPOINT = server.base_url
+        tenant = server.get("/_tenant")
+
+        subs = run_phase(server, results, "subscriptions", collector.fetch_subscriptions, auth)
+        role_assignments = run_phase(server, results, "role_assignments",
+                                     collector.fetch_role_assignments, auth, subs)
+        run_phase(server, results, "resource_role_assignments",
+                  collector.fetch_all_resource_role_assignments, auth, subs)
+        run_phase(server, results, "classic_admins", collector.fetch_classic_admins, auth, subs)
+        run_phase(server, results, "service_principals", collector.get_service_principals, auth)
+        run_phase(server, results, "logic_apps", collector.fetch_logic_apps, auth, subs)
+        run_phase(server, results, "role_translator", translate_roles, role_assignments, workdir)
+        run_phase(server, results, "collectors_scheduled", run_scheduled, auth, args.workers)
+        if not args.skip_scanner:
+            run_phase(server, results, "scanner_sdk", scan_all, server.base_url, subs, False)
+            run_phase(server, results, "scanner_fast", scan_all, server.base_url, subs, True)
+        stats = server.get("/_stats")
+
+    print(f"\nSynthetic tenant: {json.dumps(tenant)}")
+    print(f"Server: page size {args.page_size}, latency {args.latency_ms} ms, throttle rate {args.throttle_rate}\n")
+    header = f"{'phase':<28} {'wall s':>8} {'cpu s':>8} {'requests':>9} {'records':>9} {'rec/s':>10} {'req/s':>8} {'RSS MB':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['phase']:<28} {r['wall_seconds']:>8.3f} {r['cpu_seconds']:>8.3f} {r['requests']:>9} "
+              f"{r['records']:>9} {r['records_per_second'] or 0:>10.1f} {r['requests_per_second'] or 0:>8.1f} "
+              f"{r['peak_rss_mb']:>8.1f}")
+    print(f"\nThrottled responses: {stats['requests'].get('throttled', 0)}")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"tenant": tenant, "server": server_options, "phases": results,
+                       "server_stats": stats}, f, indent=2)
+        print(f"Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
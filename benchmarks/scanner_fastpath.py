@@ -0,0 +1,162 @@
+"""
+Compare the SDK model path with the raw-JSON fast path of AzureEndpointScanner.
+
+Both paths start from the same recorded listing pages (JSON text, as received
+from ARM): the SDK path deserializes every item into its msrest model and runs
+the existing get_* method over it, the fast path parses the JSON and runs the
+raw extractor. The endpoint records of both paths are checked for equality.
+
+Fixtures are read from --fixtures (one <service>.json file per service, a list
+of ARM list pages). Missing fixtures are generated synthetically with
+--resources items; --record captures real pages from the subscription in config.py.
+
+Usage:
+    python benchmarks/scanner_fastpath.py --resources 20000
+    python benchmarks/scanner_fastpath.py --record --fixtures benchmarks/fixtures
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from azure_endpoint_mapper import AzureEndpointScanner, RAW_LISTINGS, SERVICES  # noqa: E402
+from synthetic import SUB, synthetic_item  # noqa: E402
+
+# Service -> (scanner client attribute, operations attribute, list method, model module, model class)
+SDK_LISTINGS = {
+    'appservice': ('web_client', 'web_apps', 'list', 'azure.mgmt.web.models', 'Site'),
+    'functionapp': ('web_client', 'web_apps', 'list', 'azure.mgmt.web.models', 'Site'),
+    'storage': ('storage_client', 'storage_accounts', 'list', 'azure.mgmt.storage.models', 'StorageAccount'),
+    'apim': ('apim_client', 'api_management_service', 'list',
+             'azure.mgmt.apimanagement.models', 'ApiManagementServiceResource'),
+    'acr': ('acr_client', 'registries', 'list', 'azure.mgmt.containerregistry.models', 'Registry'),
+    'cosmosdb': ('cosmos_client', 'database_accounts', 'list',
+                 'azure.mgmt.cosmosdb.models', 'DatabaseAccountGetResults'),
+    'appgateway': ('network_client', 'application_gateways', 'list_all',
+                   'azure.mgmt.network.models', 'ApplicationGateway'),
+    'keyvault': ('keyvault_client', 'vaults', 'list_by_subscription', 'azure.mgmt.keyvault.models', 'Vault'),
+    'aci': ('aci_client', 'container_groups', 'list_by_resource_group',
+            'azure.mgmt.containerinstance.models', 'ContainerGroup'),
+    'loadbalancer': ('network_client', 'load_balancers', 'list_all', 'azure.mgmt.network.models', 'LoadBalancer'),
+}
+
+
+def _resource_groups(pages):
+    names = dict.fromkeys(item['id'].split('/')[4] for text in pages for item in json.loads(text)['value'])
+    return [SimpleNamespace(name=name) for name in names]
+
+
+# Service -> function of the pages returning the other operations its get_* method calls, as
+# {client attribute: {operations attribute: {method: callable}}}. The container instance listing
+# walks the resource groups; the load balancer public IP lookup answers like the raw extractor,
+# which leaves ip_address unset.
+SDK_STUBS = {
+    'aci': lambda pages: {'resource_client': {'resource_groups': {'list': lambda: iter(_resource_groups(pages))}}},
+    'loadbalancer': lambda pages: {
+        'network_client': {'public_ip_addresses': {'get': lambda **kwargs: SimpleNamespace(ip_address=None)}},
+    },
+}
+
+def generate_pages(service, count, page_size):
+    items = [synthetic_item(service, i) for i in range(count)]
+    return [{'value': items[i:i + page_size]} for i in range(0, len(items), page_size)]
+
+
+def load_or_create_fixture(fixtures, service, count, page_size):
+    """Return the raw JSON text of each listing page for a service."""
+    path = os.path.join(fixtures, f"{service}.json")
+    if not os.path.exists(path):
+        os.makedirs(fixtures, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(generate_pages(service, count, page_size), f)
+    with open(path) as f:
+        return [json.dumps(page) for page in json.load(f)]
+
+
+def record_fixtures(fixtures, services, page_size):
+    """Capture real listing pages from the subscription configured in config.py."""
+    import config
+
+    scanner = AzureEndpointScanner(config.TENANT_ID, config.CLIENT_ID, config.CLIENT_SECRET, config.SUBSCRIPTION_ID)
+    os.makedirs(fixtures, exist_ok=True)
+    for service in services:
+        provider, api_version, _ = RAW_LISTINGS[service]
+        items = list(scanner.list_raw(provider, api_version))
+        with open(os.path.join(fixtures, f"{service}.json"), 'w') as f:
+            json.dump([{'value': items[i:i + page_size]} for i in range(0, len(items), page_size)] or [{'value': []}], f)
+        print(f"Recorded {len(items)} {service} items")
+
+
+def run_sdk_path(scanner, service, pages):
+    client_attr, ops_attr, method, models_module, model_name = SDK_LISTINGS[service]
+    model = getattr(importlib.import_module(models_module), model_name)
+
+    def pager(resource_group_name=None):
+        for text in pages:
+            for item in json.loads(text)['value']:
+                if resource_group_name is None or item['id'].split('/')[4] == resource_group_name:
+                    yield model.deserialize(item)
+
+    clients = SDK_STUBS[service](pages) if service in SDK_STUBS else {}
+    clients.setdefault(client_attr, {}).setdefault(ops_attr, {})[method] = pager
+    for attr, operations in clients.items():
+        setattr(scanner, attr, SimpleNamespace(**{
+            name: SimpleNamespace(**methods) for name, methods in operations.items()
+        }))
+    return list(getattr(scanner, SERVICES[service])())
+
+
+def _canonical(endpoints):
+    # Listings that walk resource groups yield in a different order than the subscription listing
+    return sorted(json.dumps(endpoint, sort_keys=True) for endpoint in endpoints)
+
+
+def run_raw_path(service, pages):
+    extract = RAW_LISTINGS[service][2]
+    endpoints = []
+    for text in pages:
+        for item in json.loads(text)['value']:
+            endpoints.extend(extract(item))
+    return endpoints
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SDK vs raw-JSON endpoint listing.")
+    parser.add_argument('--services', default=','.join(SDK_LISTINGS))
+    parser.add_argument('--fixtures', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures'))
+    parser.add_argument('--resources', type=int, default=10000, help="Items per synthetic fixture")
+    parser.add_argument('--page-size', type=int, default=1000)
+    parser.add_argument('--record', action='store_true', help="Record fixtures from the live subscription first")
+    args = parser.parse_args()
+
+    services = [s.strip() for s in args.services.split(',') if s.strip()]
+    if args.record:
+        record_fixtures(args.fixtures, services, args.page_size)
+
+    scanner = AzureEndpointScanner(SUB, 'client', 'secret', SUB)
+    print(f"{'service':<12} {'items':>8} {'endpoints':>10} {'sdk s':>9} {'raw s':>9} {'speedup':>8}  same")
+    print("-" * 68)
+    for service in services:
+        pages = load_or_create_fixture(args.fixtures, service, args.resources, args.page_size)
+        items = sum(len(json.loads(p)['value']) for p in pages)
+        sdk_endpoints, sdk_seconds = timed(run_sdk_path, scanner, service, pages)
+        raw_endpoints, raw_seconds = timed(run_raw_path, service, pages)
+        same = _canonical(sdk_endpoints) == _canonical(raw_endpoints)
+        speedup = sdk_seconds / raw_seconds if raw_seconds else float('inf')
+        print(f"{service:<12} {items:>8} {len(raw_endpoints):>10} {sdk_seconds:>9.3f} {raw_seconds:>9.3f} "
+              f"{speedup:>7.1f}x  {'yes' if same else 'NO'}")
+
+
+if __name__ == '__main__':
+    main()
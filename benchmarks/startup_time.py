@@ -0,0 +1,100 @@
+"""
+Measure scanner startup cost (imports plus client construction) per service selection.
+
+Each measurement runs in a fresh interpreter so module import caches do not leak
+between runs. No network calls are made: credentials are dummies and clients are
+only constructed, never used.
+
+Usage:
+    python benchmarks/startup_time.py
+    python benchmarks/startup_time.py --services storage,keyvault --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Clients each scanner method touches, mirroring azure_endpoint_mapper.AzureEndpointScanner
+SERVICE_CLIENTS = {
+    'appservice': ['web_client'],
+    'functionapp': ['web_client'],
+    'storage': ['storage_client'],
+    'apim': ['apim_client'],
+    'aci': ['resource_client', 'aci_client'],
+    'acr': ['acr_client'],
+    'cosmosdb': ['cosmos_client'],
+    'keyvault': ['keyvault_client'],
+    'appgateway': ['network_client'],
+    'loadbalancer': ['network_client'],
+}
+
+CHILD_SCRIPT = """
+import json, resource, sys, time
+start = time.perf_counter()
+from azure_endpoint_mapper import AzureEndpointScanner
+scanner = AzureEndpointScanner('00000000-0000-0000-0000-000000000000', 'client', 'secret', 'sub')
+for name in sys.argv[1:]:
+    getattr(scanner, name)
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    'seconds': elapsed,
+    'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'modules': len(sys.modules),
+}))
+"""
+
+
+def measure(clients, repeat):
+    """
+    Run the startup script `repeat` times for the given clients.
+
+    Args:
+        clients (List[str]): Scanner client attributes to construct.
+        repeat (int): Number of fresh interpreter runs.
+
+    Returns:
+        Dict: Median seconds, max RSS and loaded module count.
+    """
+    runs = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, '-c', CHILD_SCRIPT, *clients],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        )
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    return {
+        'seconds': statistics.median(r['seconds'] for r in runs),
+        'max_rss_kb': max(r['max_rss_kb'] for r in runs),
+        'modules': runs[-1]['modules'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare scanner startup for all vs selected services.")
+    parser.add_argument('--services', default='storage,keyvault',
+                        help="Comma separated services for the selective run (default: storage,keyvault)")
+    parser.add_argument('--repeat', type=int, default=3, help="Fresh interpreter runs per scenario")
+    args = parser.parse_args()
+
+    selected = [s.strip() for s in args.services.split(',') if s.strip()]
+    all_clients = sorted({c for clients in SERVICE_CLIENTS.values() for c in clients})
+    selected_clients = sorted({c for s in selected for c in SERVICE_CLIENTS[s]})
+
+    scenarios = [
+        ('import only', []),
+        (f"--services {','.join(selected)}", selected_clients),
+        ('all services', all_clients),
+    ]
+    print(f"{'scenario':<40} {'seconds':>10} {'max RSS MB':>12} {'modules':>8}")
+    print("-" * 74)
+    for label, clients in scenarios:
+        r = measure(clients, args.repeat)
+        print(f"{label:<40} {r['seconds']:>10.3f} {r['max_rss_kb'] / 1024:>12.1f} {r['modules']:>8}")
+
+
+if __name__ == '__main__':
+    main()
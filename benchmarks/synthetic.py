@@ -0,0 +1,172 @@
+"""
+Synthetic Azure data shared by the benchmarks.
+
+Everything is deterministic for a given set of arguments so runs are comparable.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from azure_endpoint_mapper import RAW_LISTINGS  # noqa: E402
+
+SUB = '00000000-0000-0000-0000-000000000000'
+
+
+def _id(subscription_id, provider, rg, name):
+    return f"/subscriptions/{subscription_id}/resourceGroups/{rg}/providers/{provider}/{name}"
+
+
+def _common(provider, i, subscription_id, rg):
+    name = f"res{i}"
+    return {
+        'id': _id(subscription_id, provider, rg, name),
+        'name': name,
+        'type': provider,
+        'location': 'westeurope',
+        'tags': {'env': 'prod' if i % 3 else 'dev', 'owner': f"team-{i % 7}", 'costCenter': str(1000 + i % 13)},
+    }, rg, name
+
+
+def synthetic_item(service, i, subscription_id=SUB, resource_group=None):
+    """
+    Build one realistic-looking ARM item for a scanner service.
+
+    Args:
+        service (str): Scanner service name (a key of azure_endpoint_mapper.RAW_LISTINGS).
+        i (int): Item number; drives names and the mix of public/private settings.
+        subscription_id (str): Subscription the resource ID is built under.
+        resource_group (str): Resource group name; spread over 50 groups when omitted.
+
+    Returns:
+        Dict: The resource as an ARM list operation would return it.
+    """
+    provider = RAW_LISTINGS[service][0]
+    rg = resource_group or f"rg-{i % 50}"
+    item, rg, name = _common(provider, i, subscription_id, rg)
+    if service in ('appservice', 'functionapp'):
+        item['kind'] = 'functionapp,linux' if i % 4 == 0 else 'app'
+        item['properties'] = {
+            'state': 'Running', 'enabled': i % 10 != 0, 'clientCertEnabled': i % 9 == 0,
+            'resourceGroup': rg, 'defaultHostName': f"{name}.azurewebsites.net",
+            'hostNames': [f"{name}.azurewebsites.net"],
+            'enabledHostNames': [f"{name}.azurewebsites.net", f"{name}.scm.azurewebsites.net"],
+            'hostNameSslStates': [
+                {'name': f"{name}.azurewebsites.net", 'sslState': 'Disabled', 'hostType': 'Standard'},
+                {'name': f"{name}.scm.azurewebsites.net", 'sslState': 'Disabled', 'hostType': 'Repository'},
+            ],
+            'serverFarmId': _id(subscription_id, 'Microsoft.Web/serverfarms', rg, f"plan{i % 20}"),
+            'siteConfig': {'numberOfWorkers': 1, 'linuxFxVersion': 'PYTHON|3.11', 'alwaysOn': False,
+                           'http20Enabled': True, 'minTlsVersion': '1.2', 'ftpsState': 'FtpsOnly'},
+            'outboundIpAddresses': ','.join(f"20.1.{i % 255}.{n}" for n in range(8)),
+            'possibleOutboundIpAddresses': ','.join(f"20.2.{i % 255}.{n}" for n in range(20)),
+            'httpsOnly': True, 'redundancyMode': 'None', 'publicNetworkAccess': 'Enabled',
+            'lastModifiedTimeUtc': '2024-05-01T10:00:00.000Z',
+        }
+    elif service == 'storage':
+        item['kind'] = 'StorageV2'
+        item['sku'] = {'name': 'Standard_LRS', 'tier': 'Standard'}
+        item['properties'] = {
+            'supportsHttpsTrafficOnly': i % 8 != 0, 'minimumTlsVersion': 'TLS1_2',
+            'allowBlobPublicAccess': False, 'accessTier': 'Hot', 'provisioningState': 'Succeeded',
+            'creationTime': '2023-02-01T10:00:00.0000000Z', 'primaryLocation': 'westeurope',
+            'statusOfPrimary': 'available',
+            'primaryEndpoints': {k: f"https://{name}.{k}.core.windows.net/"
+                                 for k in ('blob', 'queue', 'table', 'file', 'dfs', 'web')},
+            'networkAcls': {'bypass': 'AzureServices', 'virtualNetworkRules': [], 'ipRules': [],
+                            'defaultAction': 'Allow'},
+            'encryption': {'services': {k: {'keyType': 'Account', 'enabled': True,
+                                            'lastEnabledTime': '2023-02-01T10:00:00.0000000Z'}
+                                        for k in ('file', 'blob')},
+                           'keySource': 'Microsoft.Storage'},
+        }
+    elif service == 'apim':
+        item['sku'] = {'name': 'Developer', 'capacity': 1}
+        item['properties'] = {
+            'publisherEmail': 'ops@example.com', 'publisherName': 'ops',
+            'gatewayUrl': f"{name}.azure-api.net", 'portalUrl': f"https://{name}.portal.azure-api.net",
+            'publicIPAddresses': [f"52.1.{i % 255}.1"] if i % 5 else [],
+            'hostnameConfigurations': [{'type': 'Proxy', 'hostName': f"{name}.azure-api.net",
+                                        'negotiateClientCertificate': False, 'defaultSslBinding': True}],
+            'virtualNetworkType': 'None', 'provisioningState': 'Succeeded',
+        }
+    elif service == 'acr':
+        item['sku'] = {'name': 'Premium', 'tier': 'Premium'}
+        item['properties'] = {
+            'loginServer': f"{name}.azurecr.io", 'creationDate': '2023-02-01T10:00:00Z',
+            'provisioningState': 'Succeeded', 'adminUserEnabled': False, 'publicNetworkAccess': 'Enabled',
+            'policies': {'quarantinePolicy': {'status': 'disabled'},
+                         'trustPolicy': {'type': 'Notary', 'status': 'disabled'},
+                         'retentionPolicy': {'days': 7, 'status': 'disabled'}},
+        }
+    elif service == 'cosmosdb':
+        item['kind'] = 'GlobalDocumentDB'
+        item['properties'] = {
+            'provisioningState': 'Succeeded', 'documentEndpoint': f"https://{name}.documents.azure.com:443/",
+            'publicNetworkAccess': 'Enabled' if i % 6 else 'Disabled', 'databaseAccountOfferType': 'Standard',
+            'consistencyPolicy': {'defaultConsistencyLevel': 'Session', 'maxIntervalInSeconds': 5,
+                                  'maxStalenessPrefix': 100},
+            'locations': [{'id': f"{name}-westeurope", 'locationName': 'West Europe', 'failoverPriority': 0,
+                           'documentEndpoint': f"https://{name}-westeurope.documents.azure.com:443/"}],
+            'capabilities': [{'name': 'EnableServerless'}],
+        }
+    elif service == 'appgateway':
+        item['properties'] = {
+            'sku': {'name': 'WAF_v2', 'tier': 'WAF_v2', 'capacity': 2}, 'operationalState': 'Running',
+            'frontendIPConfigurations': [
+                {'id': f"{item['id']}/frontendIPConfigurations/public", 'name': 'public',
+                 'properties': {'publicIPAddress': {
+                     'id': _id(subscription_id, 'Microsoft.Network/publicIPAddresses', rg, f"{name}-pip")}}},
+                {'id': f"{item['id']}/frontendIPConfigurations/private", 'name': 'private',
+                 'properties': {'privateIPAddress': '10.0.0.4', 'privateIPAllocationMethod': 'Static'}},
+            ],
+            'frontendPorts': [{'name': f"port{p}", 'properties': {'port': p}} for p in (80, 443)],
+            'provisioningState': 'Succeeded',
+        }
+    elif service == 'loadbalancer':
+        item['sku'] = {'name': 'Standard', 'tier': 'Regional'}
+        item['properties'] = {
+            'frontendIPConfigurations': [
+                {'id': f"{item['id']}/frontendIPConfigurations/fe", 'name': 'fe',
+                 'properties': {'publicIPAddress': {
+                     'id': _id(subscription_id, 'Microsoft.Network/publicIPAddresses', rg, f"{name}-pip")}}},
+            ] if i % 3 else [
+                {'id': f"{item['id']}/frontendIPConfigurations/fe", 'name': 'fe',
+                 'properties': {'privateIPAddress': '10.0.1.4', 'privateIPAllocationMethod': 'Dynamic'}},
+            ],
+            'backendAddressPools': [{'name': 'pool', 'properties': {}}],
+            'provisioningState': 'Succeeded',
+        }
+    elif service == 'aci':
+        item['properties'] = {
+            'osType': 'Linux', 'restartPolicy': 'Always', 'provisioningState': 'Succeeded',
+            'containers': [{'name': 'app', 'properties': {
+                'image': 'mcr.microsoft.com/azuredocs/aci-helloworld',
+                'ports': [{'port': 80}], 'resources': {'requests': {'cpu': 1.0, 'memoryInGB': 1.5}}}}],
+            'ipAddress': ({'type': 'Public', 'ip': f"20.3.{i % 255}.{i % 250 + 1}", 'ports': [{'port': 80}]}
+                          if i % 2 else {'type': 'Private', 'ip': '10.0.2.4', 'ports': [{'port': 80}]}),
+        }
+    elif service == 'keyvault':
+        item['properties'] = {
+            'tenantId': subscription_id, 'sku': {'family': 'A', 'name': 'standard'},
+            'vaultUri': f"https://{name}.vault.azure.net/", 'enableRbacAuthorization': True,
+            'enableSoftDelete': True, 'provisioningState': 'Succeeded',
+            'networkAcls': {'bypass': 'AzureServices', 'defaultAction': 'Deny' if i % 4 == 0 else 'Allow',
+                            'ipRules': [], 'virtualNetworkRules': []},
+        }
+    return item
+
+
+def public_ip_item(i, subscription_id=SUB, resource_group=None):
+    """Public IP address matching the frontend of synthetic load balancer / application gateway `i`."""
+    rg = resource_group or f"rg-{i % 50}"
+    name = f"res{i}-pip"
+    return {
+        'id': _id(subscription_id, 'Microsoft.Network/publicIPAddresses', rg, name),
+        'name': name,
+        'type': 'Microsoft.Network/publicIPAddresses',
+        'location': 'westeurope',
+        'sku': {'name': 'Standard', 'tier': 'Regional'},
+        'properties': {'publicIPAllocationMethod': 'Static', 'publicIPAddressVersion': 'IPv4',
+                       'ipAddress': f"51.4.{i % 255}.{i % 250 + 1}", 'provisioningState': 'Succeeded'},
+    }
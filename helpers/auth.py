@@ -88,3 +88,19 @@ class AuthClientARM(AuthClientBase):
             tenant_id,
             "https://management.azure.com/.default",
         )
+
+
+class OfflineAuthClient:
+    """
+    Authentication client for runs that must not reach Azure AD, such as replaying
+    cached responses. It hands out a placeholder token without any network call.
+    """
+
+    def get_token(self):
+        """
+        Return the placeholder token.
+
+        Returns:
+            str: A token that is never sent to a real endpoint.
+        """
+        return "offline"
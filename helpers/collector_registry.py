@@ -0,0 +1,207 @@
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import ExitStack, nullcontext
+
+logger = logging.getLogger(__name__)
+
+
+class Collector:
+    """
+    A registered collector.
+
+    Attributes:
+        name (str): Unique collector name, also the key of its result.
+        fn (Callable): Called as fn(auth_client, *inputs, **options) with the results of `requires` in order.
+        requires (Tuple[str, ...]): Names of the collectors whose results this one consumes.
+        output (str): File name the result is written to, or None for intermediate data.
+        auth (str): Which authentication client to pass: 'arm' or 'graph'.
+        stream (bool): Whether fn yields batches (lists of records) instead of returning its result.
+        tenant_wide (bool): Whether it collects tenant-level data that is not partitioned by subscription,
+            so that a sharded crawl runs it on one shard only.
+    """
+
+    def __init__(self, name, fn, requires=(), output=None, auth="arm", stream=False, tenant_wide=False):
+        self.name = name
+        self.fn = fn
+        self.requires = tuple(requires)
+        self.output = output
+        self.auth = auth
+        self.stream = stream
+        self.tenant_wide = tenant_wide
+
+
+class CollectorRegistry:
+    """
+    Registry of collectors and a dependency-aware scheduler to run them.
+
+    Collectors declare the results they need; `run` starts every collector as soon
+    as its inputs are available, running independent collectors concurrently on a
+    thread pool. A collector that fails is logged and its dependants are skipped.
+
+    Streaming collectors yield their records in batches so they can be written
+    while the crawl continues; they produce output only and cannot be inputs.
+    """
+
+    def __init__(self):
+        self.collectors = {}
+
+    def register(self, name, requires=(), output=None, auth="arm", stream=False, tenant_wide=False):
+        """
+        Decorator registering a collector function under `name`.
+
+        Args:
+            name (str): Collector name.
+            requires (Iterable[str]): Collectors whose results are passed to the function.
+            output (str): Output file name, or None if the result is only an input for others.
+            auth (str): 'arm' or 'graph'.
+            stream (bool): The function is a generator yielding batches of records.
+            tenant_wide (bool): The collector is not partitioned by subscription.
+
+        Returns:
+            Callable: Decorator returning the function unchanged.
+        """
+        def decorator(fn):
+            if name in self.collectors:
+                raise ValueError(f"Collector {name!r} is already registered")
+            self.collectors[name] = Collector(name, fn, requires, output, auth, stream, tenant_wide)
+            return fn
+        return decorator
+
+    def outputs(self):
+        """
+        Returns:
+            List[str]: Names of collectors that write an output file, in registration order.
+        """
+        return [name for name, c in self.collectors.items() if c.output]
+
+    def resolve(self, names):
+        """
+        Expand `names` with everything they depend on, in dependency order.
+
+        Args:
+            names (Iterable[str]): Requested collectors.
+
+        Returns:
+            List[str]: Collectors to run; every collector comes after its inputs.
+
+        Raises:
+            KeyError: If a collector or dependency is not registered.
+            ValueError: If the dependencies form a cycle or require a streaming collector.
+        """
+        order = []
+        state = {}
+
+        def visit(name, path):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Collector dependency cycle: {' -> '.join(path + [name])}")
+            if name not in self.collectors:
+                raise KeyError(f"Unknown collector {name!r}" + (f" (required by {path[-1]!r})" if path else ""))
+            if path and self.collectors[name].stream:
+                raise ValueError(f"Streaming collector {name!r} cannot be an input of {path[-1]!r}")
+            state[name] = "visiting"
+            for dependency in self.collectors[name].requires:
+                visit(dependency, path + [name])
+            state[name] = "done"
+            order.append(name)
+
+        for name in names:
+            visit(name, [])
+        return order
+
+    def run(self, names, auth_clients, max_workers=4, on_result=None, phase=None, filters=None, options=None,
+            results=None, worker_limits=None):
+        """
+        Run the requested collectors and their dependencies.
+
+        Args:
+            names (Iterable[str]): Requested collectors.
+            auth_clients (Dict[str, object]): Authentication client per `auth` kind.
+            max_workers (int): Collectors running at the same time.
+            on_result (Callable[[Collector, object], object]): Called from the worker thread as
+                soon as a collector finishes, e.g. to write its output. For a streaming
+                collector it receives the batch iterator and consumes it while the collector
+                runs; its return value becomes the collector's result.
+            phase (Callable[[str], ContextManager]): Optional wrapper around each collector,
+                such as PhaseProfiler.phase.
+            filters (Dict[str, Callable]): Functions applied to a collector's result before it
+                is written or handed to dependants, e.g. to drop scopes so that nothing
+                below them is ever requested.
+            options (Dict[str, Dict]): Extra keyword arguments per collector name.
+            results (Dict[str, object]): Results known up front, such as empty stand-ins for
+                collectors another shard runs. These collectors are not run and write nothing.
+            worker_limits (Dict[str, int]): Collectors running at the same time per `auth` kind, each
+                kind on its own pool, so that e.g. Graph collectors run alongside the ARM crawl
+                instead of taking its workers. Kinds not listed share a pool of `max_workers`.
+
+        Returns:
+            Dict[str, object]: Result of every collector that completed, and the given `results`.
+            Without `on_result`, the batches of a streaming collector are joined into one list.
+        """
+        results = dict(results or {})
+        order = [name for name in self.resolve(names) if name not in results]
+        pending = {name: set(self.collectors[name].requires) - results.keys() for name in order}
+        failed = set()
+
+        def execute(collector):
+            start = time.perf_counter()
+            with phase(collector.name) if phase else nullcontext():
+                inputs = [results[dependency] for dependency in collector.requires]
+                kwargs = options.get(collector.name, {}) if options else {}
+                result = collector.fn(auth_clients[collector.auth], *inputs, **kwargs)
+                if filters and collector.name in filters:
+                    result = filters[collector.name](result)
+                if on_result:
+                    handled = on_result(collector, result)
+                    if collector.stream:
+                        result = handled
+                elif collector.stream:
+                    result = [record for batch in result for record in batch]
+            logger.info(f"Collector {collector.name} finished in {time.perf_counter() - start:.2f}s")
+            return result
+
+        worker_limits = worker_limits or {}
+        with ExitStack() as stack:
+            pools = {}
+
+            def pool_for(collector):
+                kind = collector.auth if collector.auth in worker_limits else None
+                if kind not in pools:
+                    pools[kind] = stack.enter_context(ThreadPoolExecutor(
+                        max_workers=worker_limits.get(kind, max_workers),
+                        thread_name_prefix=f"collector-{kind}" if kind else "collector",
+                    ))
+                return pools[kind]
+
+            running = {}
+            while pending or running:
+                for name in [n for n, deps in pending.items() if not deps]:
+                    del pending[name]
+                    logger.info(f"Starting collector {name}")
+                    collector = self.collectors[name]
+                    running[pool_for(collector).submit(execute, collector)] = name
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        logger.error(f"Collector {name} failed: {str(e)}")
+                        failed.add(name)
+                        continue
+                    for deps in pending.values():
+                        deps.discard(name)
+                for name in [n for n, deps in pending.items() if deps & failed]:
+                    logger.error(f"Skipping collector {name}: input {', '.join(sorted(pending[name] & failed))} failed")
+                    failed.add(name)
+                    del pending[name]
+        return results
+
+
+# Process-wide registry; modules register their collectors on import
+registry = CollectorRegistry()
+collector = registry.register
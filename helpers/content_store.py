@@ -0,0 +1,79 @@
+import hashlib
+import json
+import os
+import threading
+
+
+class ContentStore:
+    """
+    Content-addressed store for JSON documents.
+
+    Each document is serialized canonically (sorted keys, no whitespace) and
+    written once to `<directory>/<hh>/<sha256>.json`; storing an identical
+    document again only returns its digest.
+    """
+
+    def __init__(self, directory):
+        """
+        Args:
+            directory (str): Root directory of the store; created if missing.
+        """
+        self.directory = directory
+        self.written = 0
+        self.deduplicated = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def encode(document):
+        """
+        Returns:
+            Tuple[str, bytes]: The SHA-256 hex digest and the canonical serialization of `document`.
+        """
+        body = json.dumps(document, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        return hashlib.sha256(body).hexdigest(), body
+
+    def path(self, digest):
+        """
+        Returns:
+            str: File holding the document with this digest.
+        """
+        return os.path.join(self.directory, digest[:2], f"{digest}.json")
+
+    def put(self, document):
+        """
+        Store a document unless an identical one is already stored.
+
+        Args:
+            document: Any JSON-serializable value.
+
+        Returns:
+            str: The document's SHA-256 hex digest.
+        """
+        digest, body = self.encode(document)
+        path = self.path(digest)
+        if os.path.exists(path):
+            with self._lock:
+                self.deduplicated += 1
+            return digest
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.written += 1
+        return digest
+
+    def get(self, digest):
+        """
+        Load a stored document.
+
+        Args:
+            digest (str): Digest returned by `put`.
+
+        Returns:
+            The document.
+        """
+        with open(self.path(digest), "rb") as f:
+            return json.load(f)
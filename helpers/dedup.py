@@ -0,0 +1,194 @@
+import hashlib
+import heapq
+import mmap
+import os
+import shutil
+import tempfile
+from array import array
+from bisect import bisect_left
+
+# Keys held in memory before they are spilled to disk; a Python set costs
+# about 70 bytes per key, a spilled run 8 bytes
+DEFAULT_MAX_ENTRIES = 500_000
+# Spilled runs are merged into one once there are more than this many
+MAX_RUNS = 8
+# Hashes buffered per write while a run is written
+RUN_WRITE_CHUNK = 65536
+
+
+def key_hash(key):
+    """
+    Returns:
+        int: 64-bit hash of a case-insensitive key. Collisions are unlikely below
+        about 10^8 keys, where the chance of any collision reaches 1 in 3000.
+    """
+    return int.from_bytes(hashlib.blake2b(key.lower().encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class _Run:
+    """
+    A sorted run of hashes on disk, searched through a read-only memory map.
+
+    `hashes` may be any sorted iterable, such as a merge of other runs; it is
+    written in chunks of RUN_WRITE_CHUNK, so writing a run never holds it whole.
+    """
+
+    def __init__(self, path, hashes):
+        self.path = path
+        self.length = 0
+        chunk = array("Q")
+        with open(path, "wb") as f:
+            for value in hashes:
+                chunk.append(value)
+                if len(chunk) >= RUN_WRITE_CHUNK:
+                    chunk.tofile(f)
+                    self.length += len(chunk)
+                    chunk = array("Q")
+            chunk.tofile(f)
+            self.length += len(chunk)
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.length else None
+        self._view = memoryview(self._map).cast("Q") if self._map else ()
+
+    def __contains__(self, value):
+        i = bisect_left(self._view, value)
+        return i < self.length and self._view[i] == value
+
+    def __iter__(self):
+        return iter(self._view)
+
+    def close(self):
+        if self._map is not None:
+            self._view.release()
+            self._map.close()
+        self._file.close()
+        os.remove(self.path)
+
+
+class SpillingKeySet:
+    """
+    Set of string keys (e.g. resource ids) held as 64-bit hashes.
+
+    Up to `max_entries` hashes are kept in a Python set; beyond that they are
+    sorted and written to disk as runs of 8-byte integers that lookups search by
+    bisection, so memory stays bounded however many keys are added.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, spill_dir=None):
+        """
+        Args:
+            max_entries (int): Hashes kept in memory before spilling.
+            spill_dir (str): Parent directory of the spill files; the system temporary directory by default.
+        """
+        self.max_entries = max_entries
+        self.spill_dir = spill_dir
+        self._memory = set()
+        self._runs = []
+        self._directory = None
+        self._spills = 0
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def __contains__(self, key):
+        value = key_hash(key)
+        return value in self._memory or any(value in run for run in self._runs)
+
+    def add(self, key):
+        """
+        Add a key.
+
+        Returns:
+            bool: True if the key was not in the set yet.
+        """
+        value = key_hash(key)
+        if value in self._memory or any(value in run for run in self._runs):
+            return False
+        self._memory.add(value)
+        self._length += 1
+        if len(self._memory) >= self.max_entries:
+            self._spill()
+        return True
+
+    def _spill(self):
+        if self._directory is None:
+            self._directory = tempfile.mkdtemp(prefix="keyset-", dir=self.spill_dir)
+        self._spills += 1
+        self._runs.append(_Run(os.path.join(self._directory, f"run-{self._spills}.bin"), sorted(self._memory)))
+        self._memory = set()
+        if len(self._runs) > MAX_RUNS:
+            self._spills += 1
+            # Streamed from the memory-mapped runs straight into the merged file
+            merged = _Run(os.path.join(self._directory, f"run-{self._spills}.bin"), heapq.merge(*self._runs))
+            for run in self._runs:
+                run.close()
+            self._runs = [merged]
+
+    def stats(self):
+        """
+        Returns:
+            Dict: Keys held, how many are in memory and the number of runs on disk.
+        """
+        return {"keys": self._length, "in_memory": len(self._memory), "spilled_runs": len(self._runs)}
+
+    def close(self):
+        """Remove the spill files."""
+        for run in self._runs:
+            run.close()
+        self._runs = []
+        self._memory = set()
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class Deduplicator:
+    """
+    Streaming de-duplication of records listed at several scopes.
+
+    `filter` passes on the records whose `id` has not been seen before and, when
+    a sightings writer is given, records which ids each listed scope returned, so
+    the scopes every record was seen from are kept without holding the records.
+    """
+
+    def __init__(self, seen=None, sightings=None):
+        """
+        Args:
+            seen (SpillingKeySet): Ids seen so far; a new in-memory set spilling to the temporary directory by default.
+            sightings (JsonArrayWriter): Receives one {"scope": ..., "ids": [...]} record per listed scope.
+        """
+        self.seen = seen if seen is not None else SpillingKeySet()
+        self.sightings = sightings
+        self.listed = 0
+        self.duplicates = 0
+
+    def filter(self, records, scope=None):
+        """
+        Args:
+            records (List[Dict]): Records listed at `scope`.
+            scope (str): Scope the records were listed at.
+
+        Returns:
+            List[Dict]: The records not seen before, in their original order.
+        """
+        # Records without an id cannot be matched and are always passed on
+        unique = [record for record in records if not record.get("id") or self.seen.add(record["id"])]
+        self.listed += len(records)
+        self.duplicates += len(records) - len(unique)
+        if self.sightings is not None and records:
+            self.sightings.write([{"scope": scope, "ids": [record.get("id") for record in records]}])
+        return unique
+
+    def stats(self):
+        """
+        Returns:
+            Dict: Records listed, duplicates dropped and the state of the key set.
+        """
+        return {"listed": self.listed, "duplicates": self.duplicates, **self.seen.stats()}
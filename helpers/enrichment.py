@@ -0,0 +1,202 @@
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from helpers.offset_index import INDEX_FIELDS, index_keys
+from helpers.pipeline import JsonArrayWriter, JsonLinesWriter, iter_json_records
+from helpers.role_translator import RoleTranslator
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# Set in each worker process by _init_worker
+_enricher = None
+
+
+def parse_scope(scope):
+    """
+    Split an ARM scope into its parts.
+
+    Args:
+        scope (str): A management group, subscription, resource group or resource id.
+
+    Returns:
+        Dict: `level` (root, managementGroup, subscription, resourceGroup or resource) and
+        whichever of managementGroup, subscriptionId, resourceGroup, resourceType and
+        resourceName the scope has. Child resources get the full type and name, such as
+        Microsoft.Sql/servers/databases and server1/db1.
+    """
+    parts = [part for part in (scope or "").split("/") if part]
+    lowered = [part.lower() for part in parts]
+    details = {}
+    if len(parts) >= 4 and lowered[:3] == ["providers", "microsoft.management", "managementgroups"]:
+        details["managementGroup"] = parts[3]
+        details["level"] = "managementGroup"
+        return details
+    if len(parts) < 2 or lowered[0] != "subscriptions":
+        details["level"] = "root"
+        return details
+    details["subscriptionId"] = parts[1]
+    details["level"] = "subscription"
+    rest = parts[2:]
+    if len(rest) >= 2 and rest[0].lower() == "resourcegroups":
+        details["resourceGroup"] = rest[1]
+        details["level"] = "resourceGroup"
+        rest = rest[2:]
+    if len(rest) >= 4 and rest[0].lower() == "providers":
+        # providers/{namespace}/{type}/{name}[/{child type}/{child name}...]
+        types, names = rest[2::2], rest[3::2]
+        details["resourceType"] = "/".join([rest[1]] + types[:len(names)])
+        details["resourceName"] = "/".join(names)
+        details["level"] = "resource"
+    return details
+
+
+class AssignmentEnricher:
+    """
+    Adds role names, principal names and the parsed scope to role assignments.
+
+    Sets properties.roleName (as RoleTranslator does), properties.principalName when
+    the principal is known and properties.scopeDetails from parse_scope.
+    """
+
+    def __init__(self, principal_names=None, translator=None):
+        """
+        Args:
+            principal_names (Dict[str, str]): Display name per principal object id.
+            translator (RoleTranslator): Resolves role definition ids; a new one by default.
+        """
+        self.principal_names = principal_names or {}
+        self.translator = translator or RoleTranslator()
+
+    def enrich(self, assignment):
+        """
+        Args:
+            assignment (Dict): Role assignment as returned by ARM; updated in place.
+
+        Returns:
+            Dict: The same role assignment.
+        """
+        self.translator.translate_assignment(assignment)
+        properties = assignment.get("properties")
+        if isinstance(properties, dict):
+            name = self.principal_names.get(properties.get("principalId"))
+            if name is not None:
+                properties["principalName"] = name
+            properties["scopeDetails"] = parse_scope(properties.get("scope"))
+        return assignment
+
+
+def load_principal_names(paths):
+    """
+    Read the display names of Graph objects from collected outputs.
+
+    Args:
+        paths (Iterable[str]): JSON array or JSON lines files of service principals, users or groups;
+            missing files are skipped.
+
+    Returns:
+        Dict[str, str]: Display name per object id.
+    """
+    names = {}
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        for record in iter_json_records(path):
+            if isinstance(record, dict) and record.get("id") and record.get("displayName") is not None:
+                names[record["id"]] = record["displayName"]
+    return names
+
+
+def _init_worker(principal_names):
+    global _enricher
+    _enricher = AssignmentEnricher(principal_names)
+
+
+def _enrich_chunk(lines, with_keys):
+    # The index keys are taken here, from the parsed records, so the writer in the
+    # main process never parses a line
+    records = [_enricher.enrich(json.loads(line)) for line in lines]
+    keys = [index_keys(record) for record in records] if with_keys else None
+    return [json.dumps(record) for record in records], keys
+
+
+def _chunks(path, chunk_size):
+    # Raw record text is handed to the workers, which do the parsing and serialization
+    chunk = []
+    if _is_json_lines(path):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    chunk.append(line)
+                    if len(chunk) >= chunk_size:
+                        yield chunk
+                        chunk = []
+    else:
+        for record in iter_json_records(path):
+            chunk.append(json.dumps(record))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def _is_json_lines(path):
+    with open(path) as f:
+        for line in f:
+            stripped = line.lstrip()
+            if stripped:
+                return not stripped.startswith("[")
+    return True
+
+
+def enriched_path(path):
+    """
+    Returns:
+        str: Output path for an enriched file: `name_enriched` with the input's extension.
+    """
+    root, extension = os.path.splitext(path)
+    return f"{root}_enriched{extension or '.json'}"
+
+
+def enrich_file(path, output=None, principal_names=None, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Enrich a file of role assignments on a process pool, keeping the record order.
+
+    The input is cut into chunks of `chunk_size` records; each worker parses,
+    enriches and serializes a chunk, and the results are written in input order.
+    At most two chunks per worker are in flight, so memory stays bounded.
+
+    Args:
+        path (str): JSON array or JSON lines file of role assignments.
+        output (str): Output file, in the same format as the input; enriched_path(path) by default.
+            JSON lines output gets an offset index.
+        principal_names (Dict[str, str]): Display name per principal object id.
+        workers (int): Worker processes; one per CPU by default.
+        chunk_size (int): Records per chunk.
+
+    Returns:
+        int: Number of records written.
+    """
+    output = output or enriched_path(path)
+    workers = workers or os.cpu_count() or 1
+    json_lines = _is_json_lines(path)
+    if json_lines:
+        writer = JsonLinesWriter(output, index_fields=INDEX_FIELDS)
+    else:
+        writer = JsonArrayWriter(output)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(principal_names or {},)) as pool:
+            in_flight = deque()
+            for chunk in _chunks(path, chunk_size):
+                in_flight.append(pool.submit(_enrich_chunk, chunk, json_lines))
+                if len(in_flight) >= 2 * workers:
+                    writer.write_lines(*in_flight.popleft().result())
+            while in_flight:
+                writer.write_lines(*in_flight.popleft().result())
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.close()
@@ -0,0 +1,51 @@
+import time
+
+import requests
+
+from helpers.telemetry import telemetry
+
+# One pooled session for every ARM and Graph call, so connections are reused
+# and each response passes through the telemetry hook.
+session = requests.Session()
+session.hooks["response"].append(telemetry.requests_hook)
+
+# Optional helpers.response_cache.ResponseCache consulted before the network
+_cache = None
+
+
+def configure_cache(cache):
+    """
+    Route GET requests through a response cache, or disable caching with None.
+
+    Args:
+        cache (helpers.response_cache.ResponseCache): The cache to use.
+    """
+    global _cache
+    _cache = cache
+
+
+def get(url, headers=None, **kwargs):
+    """
+    Send a GET request through the shared session (and the response cache, if configured).
+
+    Args:
+        url (str): The URL to fetch.
+        headers (Dict): Request headers, typically the bearer token.
+        **kwargs: Passed through to requests.Session.get.
+
+    Returns:
+        requests.Response: The response.
+    """
+    if _cache is not None:
+        return _cache.get("GET", url, lambda: _send(url, headers, **kwargs))
+    return _send(url, headers, **kwargs)
+
+
+def _send(url, headers, **kwargs):
+    start = time.perf_counter()
+    try:
+        return session.get(url, headers=headers, **kwargs)
+    except requests.RequestException:
+        # No response to hook into; count the attempt as a failed request
+        telemetry.record(url, 0, time.perf_counter() - start)
+        raise
@@ -0,0 +1,245 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from helpers.pipeline import iter_json_records, resolve_output
+from helpers.records import PrincipalRecord, RoleAssignmentRecord
+
+logger = logging.getLogger(__name__)
+
+# Role assignment outputs, each preferring its copy with role names
+ASSIGNMENT_FILES = (
+    ("role_assignments_processed.json", "role_assignments.json"),
+    ("all_resource_role_assignments_processed.json", "all_resource_role_assignments.json"),
+)
+PRINCIPAL_FILES = ("service_principals.json", "users.json", "groups.json")
+GROUP_MEMBERS = "group_members.json"
+ENDPOINTS = "endpoints.jsonl"
+
+
+def _truthy(value):
+    return (value or "").lower() in ("1", "true", "yes")
+
+
+class InventoryIndex:
+    """
+    In-memory indexes over the outputs of one crawl.
+
+    Role assignments are held once, as RoleAssignmentRecord, and indexed by
+    principal and by scope; principals by object id; group memberships (from
+    --expand-groups) by member, so the assignments a principal holds through its
+    groups are found without Graph calls; endpoints (from azure_endpoint_mapper.py)
+    by service type. An index is never modified once loaded: a refresh loads a new
+    one and swaps it in.
+    """
+
+    def __init__(self):
+        self.assignments = []
+        self.by_principal = defaultdict(list)
+        self.by_scope = defaultdict(list)
+        self.principals = {}
+        self.groups_of = defaultdict(list)
+        self.endpoints_by_service = defaultdict(list)
+        self.loaded = time.time()
+        self.load_seconds = 0.0
+
+    @classmethod
+    def load(cls, output_dir, endpoints_dir=None):
+        """
+        Args:
+            output_dir (str): Crawl output directory; missing files leave their index empty.
+            endpoints_dir (str): Output directory of azure_endpoint_mapper.py, if endpoints are served.
+
+        Returns:
+            InventoryIndex: The loaded index.
+        """
+        start = time.perf_counter()
+        index = cls()
+        seen = set()
+        for names in ASSIGNMENT_FILES:
+            path = next((resolve_output(output_dir, name) for name in names
+                         if os.path.exists(resolve_output(output_dir, name))), None)
+            if path is None:
+                continue
+            for assignment in iter_json_records(path):
+                key = (assignment.get("id") or "").lower()
+                if key in seen:
+                    continue
+                seen.add(key)
+                index._add_assignment(RoleAssignmentRecord.from_dict(assignment))
+        for name in PRINCIPAL_FILES:
+            path = resolve_output(output_dir, name)
+            if os.path.exists(path):
+                for principal in iter_json_records(path):
+                    index.principals[principal["id"].lower()] = PrincipalRecord.from_dict(principal)
+        path = resolve_output(output_dir, GROUP_MEMBERS)
+        if os.path.exists(path):
+            for group in iter_json_records(path):
+                for member in group["members"]:
+                    index.groups_of[member["id"].lower()].append(group["id"].lower())
+        if endpoints_dir and os.path.exists(os.path.join(endpoints_dir, ENDPOINTS)):
+            for endpoint in iter_json_records(os.path.join(endpoints_dir, ENDPOINTS)):
+                index.endpoints_by_service[endpoint.get("service_type")].append(endpoint)
+        index.load_seconds = time.perf_counter() - start
+        return index
+
+    def _add_assignment(self, record):
+        self.assignments.append(record)
+        if record.principal_id:
+            self.by_principal[record.principal_id.lower()].append(record)
+        if record.scope:
+            self.by_scope[record.scope.lower()].append(record)
+
+    def assignments_of(self, principal_id, transitive=False):
+        """
+        Args:
+            principal_id (str): Object id of a user, group or service principal.
+            transitive (bool): Include the assignments of the groups the principal is a (nested) member of.
+
+        Returns:
+            List[RoleAssignmentRecord]: The assignments.
+        """
+        key = principal_id.lower()
+        records = list(self.by_principal.get(key, ()))
+        if transitive:
+            for group_id in self.groups_of.get(key, ()):
+                records.extend(self.by_principal.get(group_id, ()))
+        return records
+
+    def assignments_at(self, scope, below=False):
+        """
+        Args:
+            scope (str): Management group, subscription, resource group or resource id.
+            below (bool): Include the assignments at every scope under `scope`.
+
+        Returns:
+            List[RoleAssignmentRecord]: The assignments.
+        """
+        key = scope.rstrip("/").lower()
+        if not below:
+            return list(self.by_scope.get(key, ()))
+        prefix = key + "/"
+        return [record for scope_key, records in self.by_scope.items()
+                if scope_key == key or scope_key.startswith(prefix) for record in records]
+
+    def principal(self, principal_id):
+        """
+        Returns:
+            Dict: The principal with the ids of the groups it is a member of under `memberOf`,
+            or None if it is unknown.
+        """
+        key = principal_id.lower()
+        record = self.principals.get(key)
+        if record is None and key not in self.groups_of:
+            return None
+        principal = record.to_dict() if record is not None else {"id": principal_id}
+        principal["memberOf"] = self.groups_of.get(key, [])
+        return principal
+
+    def endpoints(self, service=None):
+        """
+        Args:
+            service (str): Service type such as "Key Vault"; every service when omitted.
+
+        Returns:
+            List[Dict]: The public endpoints.
+        """
+        if service is None:
+            return [endpoint for endpoints in self.endpoints_by_service.values() for endpoint in endpoints]
+        return list(self.endpoints_by_service.get(service, ()))
+
+    def stats(self):
+        """
+        Returns:
+            Dict: Records held per index, and when and how fast the index was loaded.
+        """
+        return {
+            "assignments": len(self.assignments),
+            "principals": len(self.principals),
+            "principals_with_groups": len(self.groups_of),
+            "endpoints": sum(len(endpoints) for endpoints in self.endpoints_by_service.values()),
+            "loaded": self.loaded,
+            "load_seconds": round(self.load_seconds, 3),
+        }
+
+
+class _QueryHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        path = parts.path.rstrip("/")
+        query = dict(parse_qsl(parts.query))
+        index = self.server.index
+        start = time.perf_counter()
+        if path == "/status":
+            return self._send(200, {"index": index.stats(), **self.server.status})
+        if path == "/assignments":
+            if "principal" in query:
+                records = index.assignments_of(query["principal"], _truthy(query.get("transitive")))
+            elif "scope" in query:
+                records = index.assignments_at(query["scope"], _truthy(query.get("below")))
+            else:
+                return self._send(400, {"error": "Pass principal=<object id> or scope=<scope id>"})
+            return self._send(200, self._values([record.to_dict() for record in records], start))
+        if path.startswith("/principals/"):
+            principal = index.principal(unquote(path[len("/principals/"):]))
+            if principal is None:
+                return self._send(404, {"error": "Unknown principal"})
+            return self._send(200, principal)
+        if path == "/endpoints":
+            return self._send(200, self._values(index.endpoints(query.get("service")), start))
+        return self._send(404, {"error": f"Unknown path {path}; see /status, /assignments, /principals/<id>, /endpoints"})
+
+    @staticmethod
+    def _values(values, start):
+        return {"count": len(values), "milliseconds": round((time.perf_counter() - start) * 1000, 3), "value": values}
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class InventoryServer(ThreadingHTTPServer):
+    """
+    Local HTTP query API over an InventoryIndex, served from a background thread.
+
+    GET /status, /assignments?principal=ID[&transitive=1], /assignments?scope=ID[&below=1],
+    /principals/ID and /endpoints[?service=TYPE]; lists come back as {"count", "value"}.
+    Assign `index` to serve a newly loaded index; requests in flight finish on the old one.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, index=None):
+        """
+        Args:
+            address (Tuple[str, int]): Host and port to listen on; port 0 picks a free port.
+            index (InventoryIndex): Index to serve; an empty one by default.
+        """
+        super().__init__(address, _QueryHandler)
+        self.index = index or InventoryIndex()
+        self.status = {}
+        self._thread = threading.Thread(target=self.serve_forever, name="inventory-api", daemon=True)
+
+    def start(self):
+        """Start serving in the background."""
+        self._thread.start()
+        logger.info(f"Inventory API listening on http://{self.server_address[0]}:{self.server_address[1]}")
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        self.shutdown()
+        self.server_close()
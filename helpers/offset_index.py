@@ -0,0 +1,244 @@
+import json
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+
+from helpers.dedup import key_hash
+
+# Indexed keys and where they sit in a record: the record's own id, and the
+# principal and scope of role assignments
+INDEX_FIELDS = {
+    "id": ("id",),
+    "principalId": ("properties", "principalId"),
+    "scope": ("properties", "scope"),
+}
+INDEX_SUFFIX = ".idx"
+MAGIC = b"AZIDX001"
+
+
+def index_path(path):
+    """
+    Returns:
+        str: Path of the sidecar index of the JSON lines file `path`.
+    """
+    return path + INDEX_SUFFIX
+
+
+def field_value(record, field):
+    """
+    Returns:
+        The value of an INDEX_FIELDS key in a record (a dict or a helpers.records.CompactRecord),
+        or None if the record does not have it.
+    """
+    value = record
+    for key in INDEX_FIELDS[field]:
+        if not hasattr(value, "get"):
+            return None
+        value = value.get(key)
+    return value if isinstance(value, str) else None
+
+
+def index_keys(record):
+    """
+    Take the indexed keys of a record that is already parsed, so writing it indexed
+    costs no second parse of its serialized line.
+
+    Returns:
+        Tuple[Optional[str], ...]: field_value of every INDEX_FIELDS key, in INDEX_FIELDS order.
+    """
+    return tuple(field_value(record, field) for field in INDEX_FIELDS)
+
+
+class OffsetIndexBuilder:
+    """
+    Collects (key hash, byte offset) pairs while a JSON lines file is written.
+
+    Each key costs 16 bytes until `write` sorts the pairs and stores them beside
+    the file.
+    """
+
+    def __init__(self, fields=tuple(INDEX_FIELDS)):
+        """
+        Args:
+            fields (Iterable[str]): INDEX_FIELDS keys to index.
+        """
+        self._pairs = {field: (array("Q"), array("Q")) for field in fields}
+        # Position of each indexed field in the tuples of index_keys
+        self._slots = [(list(INDEX_FIELDS).index(field), pairs) for field, pairs in self._pairs.items()]
+
+    def add(self, offset, record):
+        """
+        Args:
+            offset (int): Byte offset of the record's line.
+            record (Dict): The record.
+        """
+        self.add_keys(offset, index_keys(record))
+
+    def add_keys(self, offset, keys):
+        """
+        Args:
+            offset (int): Byte offset of the record's line.
+            keys (Tuple[Optional[str], ...]): The record's index_keys.
+        """
+        for slot, (hashes, offsets) in self._slots:
+            value = keys[slot]
+            if value:
+                hashes.append(key_hash(value))
+                offsets.append(offset)
+
+    def write(self, path, size):
+        """
+        Write the index for the JSON lines file `path`, via a temporary file and a rename.
+
+        Layout: MAGIC, the length of a JSON header padded to 8 bytes, the header
+        ({"size": data file size, "fields": {field: [first word, count]}}), then per
+        field the sorted hashes followed by the matching offsets, as 64-bit words.
+
+        Args:
+            path (str): The JSON lines file.
+            size (int): Its size in bytes, recorded so a reader can tell the index is current.
+        """
+        sections = {}
+        word = 0
+        ordered = {}
+        for field, (hashes, offsets) in self._pairs.items():
+            order = sorted(range(len(hashes)), key=hashes.__getitem__)
+            ordered[field] = (array("Q", (hashes[i] for i in order)), array("Q", (offsets[i] for i in order)))
+            sections[field] = [word, len(order)]
+            word += 2 * len(order)
+        header = json.dumps({"size": size, "fields": sections}).encode("utf-8")
+        header += b" " * (-len(header) % 8)
+        with open(f"{index_path(path)}.tmp", "wb") as f:
+            f.write(MAGIC + struct.pack("<Q", len(header)) + header)
+            for hashes, offsets in ordered.values():
+                hashes.tofile(f)
+                offsets.tofile(f)
+        os.replace(f"{index_path(path)}.tmp", index_path(path))
+
+
+def build_index(path, fields=tuple(INDEX_FIELDS)):
+    """
+    Index an existing JSON lines file.
+
+    Returns:
+        str: Path of the written index.
+    """
+    builder = OffsetIndexBuilder(fields)
+    offset = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                builder.add(offset, json.loads(line))
+            offset += len(line)
+    builder.write(path, offset)
+    return index_path(path)
+
+
+class OffsetIndex:
+    """
+    Point lookups in a JSON lines file through its sidecar index.
+
+    Both files are memory-mapped: a lookup bisects the sorted hashes of the field,
+    then parses only the lines at the matching offsets, so its cost does not grow
+    with the size of the file. Matches are checked against the parsed record, which
+    rules out hash collisions; keys compare case-insensitively, as Azure ids do.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): The JSON lines file; its index is `path` + INDEX_SUFFIX.
+
+        Raises:
+            ValueError: If the index is not an offset index or was written for another version of the file.
+        """
+        self.path = path
+        self._files = []
+        self._maps = []
+        index = self._map(index_path(path))
+        if index[:8] != MAGIC:
+            raise ValueError(f"{index_path(path)} is not an offset index")
+        (header_length,) = struct.unpack("<Q", index[8:16])
+        header = json.loads(bytes(index[16:16 + header_length]))
+        self.data = self._map(path)
+        if header["size"] != len(self.data):
+            raise ValueError(f"{index_path(path)} does not match {path}; rebuild it with build_index")
+        self.fields = {field: tuple(section) for field, section in header["fields"].items()}
+        self._words = memoryview(index)[16 + header_length:].cast("Q")
+
+    def _map(self, path):
+        f = open(path, "rb")
+        self._files.append(f)
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return mapped
+
+    def offsets(self, field, value):
+        """
+        Returns:
+            List[int]: Byte offsets of the lines whose key hashes like `value`, in file order.
+
+        Raises:
+            KeyError: If `field` is not indexed.
+        """
+        start, count = self.fields[field]
+        hashes = self._words[start:start + count]
+        target = key_hash(value)
+        i = bisect_left(hashes, target)
+        offsets = []
+        while i < count and hashes[i] == target:
+            offsets.append(self._words[start + count + i])
+            i += 1
+        return sorted(offsets)
+
+    def record_at(self, offset):
+        """
+        Returns:
+            Dict: The record on the line starting at `offset`.
+        """
+        end = self.data.find(b"\n", offset)
+        return json.loads(self.data[offset:end if end >= 0 else len(self.data)])
+
+    def lookup(self, field, value):
+        """
+        Args:
+            field (str): An indexed field, e.g. "principalId".
+            value (str): The key to look up.
+
+        Returns:
+            List[Dict]: The records whose `field` equals `value`, in file order.
+        """
+        records = []
+        for offset in self.offsets(field, value):
+            record = self.record_at(offset)
+            if (field_value(record, field) or "").lower() == value.lower():
+                records.append(record)
+        return records
+
+    def get(self, record_id):
+        """
+        Returns:
+            Dict: The record with id `record_id`, or None.
+        """
+        records = self.lookup("id", record_id)
+        return records[0] if records else None
+
+    def close(self):
+        """Release the memory maps and files."""
+        self._words.release()
+        for mapped in self._maps:
+            mapped.close()
+        for f in self._files:
+            f.close()
+        self._maps = []
+        self._files = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,512 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import nullcontext
+from itertools import islice
+
+from helpers.offset_index import INDEX_FIELDS, OffsetIndexBuilder, index_keys
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 256 * 2**20
+DEFAULT_BATCH_SIZE = 500
+
+_END = "end"
+_ABORT = "abort"
+_BATCH = "batch"
+_STOP = "stop"
+
+
+class MemoryBudget:
+    """
+    Byte budget shared by the pipeline queues.
+
+    `acquire` blocks while the queued data would exceed the budget, which is
+    how a slow writer slows the fetchers down. A single item larger than the
+    whole budget is let through once the queues are empty, so it cannot stall
+    the pipeline. Stages between the fetchers and the writer account with
+    `acquire(block=False)`: they must keep draining their own queue, or the
+    data they wait on could never be released.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.used = 0
+        self.peak = 0
+        self.wait_seconds = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self, nbytes, block=True):
+        with self._cond:
+            if block and self.used and self.used + nbytes > self.max_bytes:
+                start = time.perf_counter()
+                while self.used and self.used + nbytes > self.max_bytes:
+                    self._cond.wait()
+                self.wait_seconds += time.perf_counter() - start
+            self.used += nbytes
+            self.peak = max(self.peak, self.used)
+
+    def release(self, nbytes):
+        with self._cond:
+            self.used -= nbytes
+            self._cond.notify_all()
+
+
+def serialize_record(record, indent=None):
+    """
+    Serialize one record as an element of a JSON array.
+
+    Joined with "," + newline (indented) or ", " (compact) between elements and
+    wrapped in brackets, the lines give the same text as json.dump(records, indent=indent).
+    Compact records (helpers.records) are written in their JSON shape.
+    """
+    if hasattr(record, "to_dict"):
+        record = record.to_dict()
+    if indent is None:
+        return json.dumps(record)
+    pad = " " * indent
+    return "\n".join(pad + line for line in json.dumps(record, indent=indent).splitlines())
+
+
+class JsonArrayWriter:
+    """
+    Writes records as a JSON array to a temporary file that replaces `path` on `close`.
+
+    The file has the layout of json.dump(records, indent=indent); `abort` removes
+    the temporary file and leaves any previous `path` untouched.
+    """
+
+    def __init__(self, path, indent=None):
+        self.path = path
+        self.indent = indent
+        self.count = 0
+        self._separator = "," if indent is not None else ", "
+        self._newline = "\n" if indent is not None else ""
+        self._handle = open(f"{path}.tmp", "w")
+
+    def write_lines(self, lines, keys=None):
+        """
+        Append records already serialized with serialize_record(record, self.indent).
+
+        `keys` is accepted for the interface of JsonLinesWriter and ignored.
+        """
+        for line in lines:
+            self._handle.write(("[" if not self.count else self._separator) + self._newline + line)
+            self.count += 1
+
+    def write(self, records):
+        """Append records."""
+        self.write_lines(serialize_record(record, self.indent) for record in records)
+
+    def close(self):
+        """
+        Returns:
+            int: Number of records written.
+        """
+        self._handle.write(self._newline + "]" if self.count else "[]")
+        self._handle.close()
+        os.replace(f"{self.path}.tmp", self.path)
+        return self.count
+
+    def abort(self):
+        """Discard the file."""
+        self._handle.close()
+        try:
+            os.remove(f"{self.path}.tmp")
+        except FileNotFoundError:
+            pass
+
+
+class JsonLinesWriter:
+    """
+    Writes records as JSON lines to a temporary file that replaces `path` on `close`.
+
+    Same interface as JsonArrayWriter; `indent` is accepted for that reason but every
+    record takes exactly one line. With `index_fields`, the byte offset of every
+    record is indexed by those keys into a sidecar file (helpers.offset_index),
+    written on `close` once the file is complete.
+    """
+
+    def __init__(self, path, indent=None, index_fields=None):
+        self.path = path
+        self.indent = None
+        self.count = 0
+        self._handle = open(f"{path}.tmp", "w", encoding="utf-8")
+        self._index = OffsetIndexBuilder(index_fields) if index_fields else None
+        self._offset = 0
+
+    def write_lines(self, lines, keys=None):
+        """
+        Append records already serialized with serialize_record(record).
+
+        Args:
+            lines (Iterable[str]): The serialized records.
+            keys (Iterable[Tuple]): index_keys of each record, taken when the records were serialized;
+                without them an indexing writer parses every line again to index it.
+        """
+        if self._index is None:
+            for line in lines:
+                self._handle.write(line + "\n")
+                self.count += 1
+            return
+        if keys is None:
+            lines = list(lines)
+            keys = [index_keys(json.loads(line)) for line in lines]
+        for line, record_keys in zip(lines, keys):
+            self._handle.write(line + "\n")
+            self._index.add_keys(self._offset, record_keys)
+            self._offset += (len(line) if line.isascii() else len(line.encode("utf-8"))) + 1
+            self.count += 1
+
+    def write(self, records):
+        """Append records."""
+        lines, keys = [], []
+        for record in records:
+            if hasattr(record, "to_dict"):
+                record = record.to_dict()
+            lines.append(serialize_record(record))
+            keys.append(index_keys(record) if self._index is not None else None)
+            if len(lines) >= DEFAULT_BATCH_SIZE:
+                self.write_lines(lines, keys)
+                lines, keys = [], []
+        self.write_lines(lines, keys)
+
+    def close(self):
+        """
+        Returns:
+            int: Number of records written.
+        """
+        self._handle.close()
+        os.replace(f"{self.path}.tmp", self.path)
+        if self._index is not None:
+            self._index.write(self.path, self._offset)
+        return self.count
+
+    def abort(self):
+        """Discard the file."""
+        self._handle.close()
+        try:
+            os.remove(f"{self.path}.tmp")
+        except FileNotFoundError:
+            pass
+
+
+def json_lines_name(name):
+    """
+    Returns:
+        str: The JSON lines counterpart of an output file name, e.g. users.json -> users.jsonl.
+    """
+    root, extension = os.path.splitext(name)
+    return f"{root}.jsonl" if extension == ".json" else name
+
+
+def resolve_output(output_dir, name):
+    """
+    Find an output written as a JSON array (`name`) or as JSON lines (json_lines_name(name)).
+
+    Returns:
+        str: Path of whichever exists, the newer one if both do; the path of `name` if neither does.
+    """
+    paths = [path for path in (os.path.join(output_dir, name), os.path.join(output_dir, json_lines_name(name)))
+             if os.path.exists(path)]
+    if not paths:
+        return os.path.join(output_dir, name)
+    return max(paths, key=os.path.getmtime)
+
+
+def open_writer(path, indent=None, index_fields=None):
+    """
+    Returns:
+        JsonLinesWriter or JsonArrayWriter: A JSON lines writer (indexed by `index_fields`) for
+        a .jsonl path, a JSON array writer otherwise.
+    """
+    if path.endswith(".jsonl"):
+        return JsonLinesWriter(path, index_fields=index_fields)
+    return JsonArrayWriter(path, indent)
+
+
+def iter_json_records(path, chunk_size=2**20):
+    """
+    Stream the records of a JSON array file, or of a file of JSON lines, without loading it whole.
+
+    Args:
+        path (str): File to read.
+        chunk_size (int): Characters read at a time.
+
+    Yields:
+        The records, in file order.
+
+    Raises:
+        json.JSONDecodeError: If the file is not a JSON array or JSON lines.
+    """
+    decoder = json.JSONDecoder()
+    with open(path) as f:
+        buffer, pos, eof = "", 0, False
+        array = None
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n" + ("," if array else ""):
+                pos += 1
+            if pos == len(buffer) or (not eof and len(buffer) - pos < 64):
+                if eof:
+                    if array:
+                        raise json.JSONDecodeError("Unterminated array", buffer, pos)
+                    return
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+            if array is None:
+                array = buffer[pos] == "["
+                pos += array
+                continue
+            if array and buffer[pos] == "]":
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                end = None
+            # A value ending at the buffer's end may continue in the next chunk
+            if end is None or (end == len(buffer) and not eof):
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+            yield record
+            pos = end
+
+
+class OutputPipeline:
+    """
+    Fetch -> enrich -> write pipeline for collector results.
+
+    Fetchers are the scheduler's worker threads: `submit` serializes each batch
+    as it arrives and hands it to the enricher thread, which applies the
+    enrichers registered for the collector (e.g. role names) and passes the
+    lines on to the writer thread. Every collector's output is written as a
+    JSON array (or as JSON lines) to a temporary file that is renamed once the collector finishes,
+    and removed if the collector, an enricher or the write fails.
+
+    Queued data is bounded by a MemoryBudget counted in serialized bytes; the
+    decoded records behind them take a few times that much memory.
+    """
+
+    def __init__(self, output_dir="output", max_bytes=DEFAULT_MAX_BYTES, batch_size=DEFAULT_BATCH_SIZE,
+                 enrichers=None, echo=None, enrich_phase=None, json_lines=False):
+        """
+        Args:
+            output_dir (str): Directory receiving the output files.
+            max_bytes (int): Budget for data waiting in the queues.
+            batch_size (int): Records per batch when a collector returns a whole list.
+            enrichers (Dict[str, List[Tuple[str, Callable[[Dict], Dict], Optional[int]]]]): Per collector
+                name, (output file, function, JSON indent) for each additional enriched output.
+            echo (Callable[[str, List[Dict]], None]): Called on the enricher thread with each raw batch,
+                e.g. to print it.
+            enrich_phase (ContextManager): Reusable context entered around the enrichment of each
+                batch, such as PhaseProfiler.accumulator, so enrichment cost shows up in profiles.
+            json_lines (bool): Write every record output as JSON lines, to NAME.jsonl instead of
+                NAME.json, with a sidecar offset index (helpers.offset_index) by id, principal and scope.
+        """
+        self.output_dir = output_dir
+        self.budget = MemoryBudget(max_bytes)
+        self.batch_size = batch_size
+        self.enrichers = enrichers or {}
+        self.json_lines = json_lines
+        if json_lines:
+            # One line per record, whatever indent the output asks for
+            self.enrichers = {
+                name: [(output, enrich, None) for output, enrich, _ in targets]
+                for name, targets in self.enrichers.items()
+            }
+        self.echo = echo
+        self.enrich_phase = enrich_phase
+        self.outputs = {}
+        self._enrich_queue = queue.Queue()
+        self._write_queue = queue.Queue()
+        self._files = {}
+        self._threads = [
+            threading.Thread(target=self._enrich_loop, name="pipeline-enrich", daemon=True),
+            threading.Thread(target=self._write_loop, name="pipeline-write", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def submit(self, collector, result):
+        """
+        Feed a collector's result into the pipeline; usable as CollectorRegistry.run's on_result.
+
+        Blocks while the queues are full. For streaming collectors this consumes the
+        batch iterator, so the collector fetches no faster than the output is written.
+
+        Args:
+            collector (Collector): The collector that produced the result.
+            result: A list of records, an iterator of batches for a streaming collector, or a
+                single document (a dict, or an object with to_dict()) written as is.
+
+        Returns:
+            int: Number of records submitted.
+        """
+        if not collector.output:
+            return None
+        if hasattr(result, "to_dict"):
+            result = result.to_dict()
+        if isinstance(result, dict):
+            # A single document rather than records; nothing to stream
+            if self.echo:
+                self.echo(collector.name, result)
+            path = os.path.join(self.output_dir, collector.output)
+            with open(f"{path}.tmp", "w") as f:
+                json.dump(result, f)
+            os.replace(f"{path}.tmp", path)
+            self.outputs[collector.output] = {"document": True}
+            return 1
+        batches = result if collector.stream else self._batches(result)
+        count = 0
+        try:
+            for batch in batches:
+                if not batch:
+                    continue
+                lines = [serialize_record(record, None) for record in batch]
+                size = sum(len(line) for line in lines)
+                self.budget.acquire(size)
+                self._enrich_queue.put((_BATCH, collector, batch, lines, size))
+                count += len(batch)
+        except BaseException:
+            self._enrich_queue.put((_ABORT, collector, None, None, 0))
+            raise
+        self._enrich_queue.put((_END, collector, None, None, 0))
+        return count
+
+    def _batches(self, records):
+        iterator = iter(records)
+        while True:
+            batch = list(islice(iterator, self.batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def _targets(self, collector):
+        return [(collector.output, None, None)] + list(self.enrichers.get(collector.name, []))
+
+    def _enrich_loop(self):
+        # Enriched outputs that lost a batch; they are aborted, never published
+        failed = set()
+        while True:
+            kind, collector, batch, lines, size = self._enrich_queue.get()
+            if kind == _STOP:
+                self._write_queue.put((_STOP, None, None, None, None, 0))
+                return
+            if kind != _BATCH:
+                for output, _, indent in self._targets(collector):
+                    self._write_queue.put((_ABORT if output in failed else kind, output, indent, None, None, 0))
+                    failed.discard(output)
+                continue
+            # Index keys are taken from the records in hand, not by parsing the lines again
+            keys = [index_keys(record) for record in batch] if self.json_lines else None
+            self._write_queue.put((_BATCH, collector.output, None, lines, keys, size))
+            if self.echo:
+                try:
+                    self.echo(collector.name, batch)
+                except Exception as e:
+                    logger.error(f"Printing {collector.name} failed: {str(e)}")
+            for output, enrich, indent in self.enrichers.get(collector.name, []):
+                if output in failed:
+                    continue
+                try:
+                    with self.enrich_phase or nullcontext():
+                        records = [enrich(record) for record in batch]
+                        enriched = [serialize_record(record, indent) for record in records]
+                        keys = [index_keys(record) for record in records] if self.json_lines else None
+                except Exception as e:
+                    logger.error(f"Enriching {collector.name} into {output} failed: {str(e)}")
+                    failed.add(output)
+                    continue
+                enriched_size = sum(len(line) for line in enriched)
+                self.budget.acquire(enriched_size, block=False)
+                self._write_queue.put((_BATCH, output, indent, enriched, keys, enriched_size))
+
+    def _write_loop(self):
+        # Outputs whose file could not be written; dropped until their end marker
+        failed = set()
+        while True:
+            kind, output, indent, lines, keys, size = self._write_queue.get()
+            if kind == _STOP:
+                return
+            try:
+                if kind == _BATCH:
+                    if output not in failed:
+                        self._write(output, indent, lines, keys)
+                elif kind == _END and output not in failed:
+                    self._finish(output, indent)
+                else:
+                    failed.discard(output)
+                    self._abort(output)
+            except OSError as e:
+                logger.error(f"Writing {output} failed: {str(e)}")
+                failed.add(output)
+                self._abort(output)
+            finally:
+                if size:
+                    self.budget.release(size)
+
+    def file_name(self, output):
+        """
+        Returns:
+            str: Name of the file an output is written to.
+        """
+        return json_lines_name(output) if self.json_lines else output
+
+    def _open(self, output, indent):
+        writer = self._files.get(output)
+        if writer is None:
+            writer = self._files[output] = open_writer(
+                os.path.join(self.output_dir, self.file_name(output)), indent, INDEX_FIELDS
+            )
+        return writer
+
+    def _write(self, output, indent, lines, keys):
+        self._open(output, indent).write_lines(lines, keys)
+
+    def _finish(self, output, indent):
+        count = self._open(output, indent).close()
+        del self._files[output]
+        self.outputs[self.file_name(output)] = {"records": count, "indent": None if self.json_lines else indent}
+
+    def _abort(self, output):
+        writer = self._files.pop(output, None)
+        if writer is not None:
+            writer.abort()
+
+    def close(self):
+        """Drain the queues, stop the threads and drop files of collectors that never finished."""
+        self._enrich_queue.put((_STOP, None, None, None, 0))
+        for thread in self._threads:
+            thread.join()
+        for output in list(self._files):
+            self._abort(output)
+
+    def stats(self):
+        """
+        Layout of the files written so far is in `outputs`: per file name, the record count
+        and JSON indent of an array, or {"document": True} for a single document.
+
+        Returns:
+            Dict: Records written per file, the peak queued bytes and the time producers spent
+            blocked on the budget.
+        """
+        return {
+            "records": {name: output["records"] for name, output in self.outputs.items() if "records" in output},
+            "queue_peak_bytes": self.budget.peak,
+            "max_bytes": self.budget.max_bytes,
+            "backpressure_wait_seconds": round(self.budget.wait_seconds, 3),
+        }
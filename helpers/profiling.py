@@ -0,0 +1,179 @@
+import cProfile
+import json
+import os
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class PhaseProfiler:
+    """
+    Opt-in per-phase profiling: wall and CPU timers, cProfile and tracemalloc.
+
+    For each phase wrapped in `phase()` it records wall/CPU time, the tracemalloc
+    peak and the source lines that allocated the most new memory, and dumps the
+    cProfile statistics to `<output_dir>/<nn>_<phase>.pstats` (open with
+    `python -m pstats` or snakeviz). When disabled, `phase()` only measures
+    wall and CPU time.
+
+    cProfile follows the thread that enters the phase only; work done on worker
+    threads shows up in wall time and memory but not in the .pstats file.
+    """
+
+    def __init__(self, output_dir=None, enabled=False, top_allocations=10):
+        """
+        Initialize the profiler.
+
+        Args:
+            output_dir (str): Directory for the .pstats files and profile_summary.json.
+            enabled (bool): Whether to run cProfile and tracemalloc.
+            top_allocations (int): Number of allocation sites kept per phase.
+        """
+        self.output_dir = output_dir
+        self.enabled = enabled
+        self.top_allocations = top_allocations
+        self.phases = []
+        if enabled and output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Profile the enclosed block as one phase.
+
+        Args:
+            name (str): Phase name, used in the summary and the .pstats file name.
+        """
+        record = {"phase": name}
+        profiler = None
+        start_snapshot = None
+        if self.enabled:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            record["memory_start_mb"] = round(tracemalloc.get_traced_memory()[0] / 2**20, 2)
+            start_snapshot = tracemalloc.take_snapshot()
+            profiler = cProfile.Profile()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        if profiler:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler:
+                profiler.disable()
+            record["wall_seconds"] = round(time.perf_counter() - wall_start, 4)
+            record["cpu_seconds"] = round(time.process_time() - cpu_start, 4)
+            if self.enabled:
+                self._finish(record, profiler, start_snapshot)
+            self.phases.append(record)
+
+    def accumulator(self, name):
+        """
+        Create a phase that is entered many times, possibly from another thread.
+
+        Args:
+            name (str): Phase name.
+
+        Returns:
+            AccumulatedPhase: Reusable context manager; call close() to record the phase.
+        """
+        return AccumulatedPhase(self, name)
+
+    def _dump_stats(self, record, profiler):
+        slug = re.sub(r"[^a-z0-9]+", "_", record["phase"].lower()).strip("_")
+        path = os.path.join(self.output_dir, f"{len(self.phases) + 1:02d}_{slug}.pstats")
+        profiler.dump_stats(path)
+        record["pstats"] = path
+
+    def _finish(self, record, profiler, start_snapshot):
+        current, peak = tracemalloc.get_traced_memory()
+        record["memory_current_mb"] = round(current / 2**20, 2)
+        record["memory_peak_mb"] = round(peak / 2**20, 2)
+        record["memory_peak_growth_mb"] = round(record["memory_peak_mb"] - record["memory_start_mb"], 2)
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, cProfile.__file__)]
+        )
+        record["top_allocations"] = [
+            {
+                "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_diff_kb": round(stat.size_diff / 1024, 1),
+                "count_diff": stat.count_diff,
+            }
+            for stat in snapshot.compare_to(start_snapshot, "lineno")[:self.top_allocations]
+        ]
+        if self.output_dir:
+            self._dump_stats(record, profiler)
+
+    def summary_table(self):
+        """
+        Returns:
+            str: One line per phase with times and, when profiling, memory figures.
+        """
+        header = f"{'phase':<32} {'wall s':>9} {'cpu s':>9}"
+        if self.enabled:
+            header += f" {'peak MB':>9} {'peak +MB':>9} {'retained MB':>12}"
+        lines = [header, "-" * len(header)]
+        for p in self.phases:
+            line = f"{p['phase']:<32} {p['wall_seconds']:>9.3f} {p['cpu_seconds']:>9.3f}"
+            if self.enabled and "memory_peak_mb" in p:
+                line += (f" {p['memory_peak_mb']:>9.1f} {p['memory_peak_growth_mb']:>9.1f}"
+                         f" {p['memory_current_mb']:>12.1f}")
+            lines.append(line)
+        return "\n".join(lines)
+
+    def write_summary(self):
+        """Write profile_summary.json (when an output directory is set) and return the table."""
+        if self.output_dir and self.enabled:
+            with open(os.path.join(self.output_dir, "profile_summary.json"), "w") as f:
+                json.dump(self.phases, f, indent=2)
+        return self.summary_table()
+
+
+class AccumulatedPhase:
+    """
+    A phase made of many short intervals, such as per-batch enrichment on a
+    pipeline thread. Wall time, CPU time of the entering thread and the cProfile
+    statistics add up across intervals. Memory is not attributed: tracemalloc
+    figures are process-wide while other phases run concurrently.
+    """
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.intervals = 0
+        self._profile = cProfile.Profile() if profiler.enabled else None
+        self._local = threading.local()
+
+    def __enter__(self):
+        self._local.start = (time.perf_counter(), time.thread_time())
+        if self._profile:
+            self._profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._profile:
+            self._profile.disable()
+        wall_start, cpu_start = self._local.start
+        self.wall_seconds += time.perf_counter() - wall_start
+        self.cpu_seconds += time.thread_time() - cpu_start
+        self.intervals += 1
+
+    def close(self):
+        """Record the accumulated phase in the profiler, if it was ever entered."""
+        if not self.intervals:
+            return
+        record = {
+            "phase": self.name,
+            "wall_seconds": round(self.wall_seconds, 4),
+            "cpu_seconds": round(self.cpu_seconds, 4),
+            "intervals": self.intervals,
+        }
+        if self._profile and self.profiler.output_dir:
+            self.profiler._dump_stats(record, self._profile)
+        self.profiler.phases.append(record)
@@ -0,0 +1,237 @@
+import sys
+
+PROPERTIES = "properties"
+
+# Key layouts seen so far; records share one tuple per distinct layout
+_layouts = {}
+
+
+def _layout(keys):
+    return _layouts.setdefault(keys, keys)
+
+
+def _intern(value):
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, dict):
+        return {_intern(k): _intern(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_intern(v) for v in value]
+    return value
+
+
+class CompactRecord:
+    """
+    Base of the compact, slotted stand-ins for ARM and Graph records.
+
+    A subclass maps the JSON keys it knows to attributes: FIELDS for top-level keys
+    and PROPERTY_FIELDS for the keys of the nested "properties" object. Strings of
+    the attributes in INTERNED repeat across records (scopes, role definition ids,
+    principal types, tags) and are interned, so each distinct value is stored once.
+    Keys the type does not know are kept as they are, and the key order of every
+    record is kept as a shared layout tuple, so `to_dict` returns the record exactly
+    as it was read. Attributes of keys a record does not have are None.
+    """
+
+    FIELDS = {}
+    PROPERTY_FIELDS = {}
+    INTERNED = frozenset()
+    __slots__ = ("_layout", "_extra")
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Args:
+            data (Dict): The record in its JSON shape.
+
+        Returns:
+            CompactRecord: The compact record.
+        """
+        record = cls.__new__(cls)
+        for attribute in cls.FIELDS.values():
+            setattr(record, attribute, None)
+        for attribute in cls.PROPERTY_FIELDS.values():
+            setattr(record, attribute, None)
+        extra = None
+        property_keys = None
+        for key, value in data.items():
+            attribute = cls.FIELDS.get(key)
+            if attribute is not None:
+                setattr(record, attribute, _intern(value) if attribute in cls.INTERNED else value)
+            elif key == PROPERTIES and cls.PROPERTY_FIELDS and isinstance(value, dict):
+                property_keys = tuple(value)
+                for property_key, property_value in value.items():
+                    attribute = cls.PROPERTY_FIELDS.get(property_key)
+                    if attribute is None:
+                        extra = extra or {}
+                        extra[(PROPERTIES, property_key)] = property_value
+                    else:
+                        setattr(record, attribute, _intern(property_value) if attribute in cls.INTERNED else property_value)
+            else:
+                extra = extra or {}
+                extra[key] = value
+        record._layout = _layout((tuple(data), property_keys))
+        record._extra = extra
+        return record
+
+    def to_dict(self):
+        """
+        Returns:
+            Dict: The record in its JSON shape, with the keys in their original order.
+        """
+        keys, property_keys = self._layout
+        data = {}
+        for key in keys:
+            attribute = self.FIELDS.get(key)
+            if attribute is not None:
+                data[key] = getattr(self, attribute)
+            elif key == PROPERTIES and property_keys is not None:
+                data[key] = self._properties(property_keys)
+            else:
+                data[key] = self._extra[key]
+        return data
+
+    def _properties(self, property_keys):
+        properties = {}
+        for key in property_keys:
+            attribute = self.PROPERTY_FIELDS.get(key)
+            properties[key] = self._extra[(PROPERTIES, key)] if attribute is None else getattr(self, attribute)
+        return properties
+
+    def set_property(self, key, value):
+        """
+        Set a key of the nested "properties" object, adding it when the record does not have it.
+        """
+        keys, property_keys = self._layout
+        if property_keys is None:
+            property_keys = ()
+            keys = keys if PROPERTIES in keys else keys + (PROPERTIES,)
+        if key not in property_keys:
+            property_keys += (key,)
+        self._layout = _layout((keys, property_keys))
+        attribute = self.PROPERTY_FIELDS.get(key)
+        if attribute is None:
+            self._extra = self._extra or {}
+            self._extra[(PROPERTIES, key)] = value
+        else:
+            setattr(self, attribute, _intern(value) if attribute in self.INTERNED else value)
+
+    def get(self, key, default=None):
+        """
+        Read a top-level JSON key, like dict.get; "properties" is returned as a new dict.
+        """
+        keys, property_keys = self._layout
+        if key not in keys:
+            return default
+        attribute = self.FIELDS.get(key)
+        if attribute is not None:
+            return getattr(self, attribute)
+        if key == PROPERTIES and property_keys is not None:
+            return self._properties(property_keys)
+        return self._extra[key]
+
+    def __getitem__(self, key):
+        if key not in self._layout[0]:
+            raise KeyError(key)
+        return self.get(key)
+
+    def __contains__(self, key):
+        return key in self._layout[0]
+
+    def __eq__(self, other):
+        if isinstance(other, CompactRecord):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class RoleAssignmentRecord(CompactRecord):
+    """A role assignment as listed by Microsoft.Authorization/roleAssignments."""
+
+    FIELDS = {"id": "id", "type": "type", "name": "name"}
+    PROPERTY_FIELDS = {
+        "roleDefinitionId": "role_definition_id",
+        "principalId": "principal_id",
+        "principalType": "principal_type",
+        "scope": "scope",
+        "condition": "condition",
+        "conditionVersion": "condition_version",
+        "createdOn": "created_on",
+        "updatedOn": "updated_on",
+        "createdBy": "created_by",
+        "updatedBy": "updated_by",
+        "delegatedManagedIdentityResourceId": "delegated_managed_identity_resource_id",
+        "description": "description",
+        "roleName": "role_name",
+    }
+    INTERNED = frozenset({
+        "type", "role_definition_id", "principal_id", "principal_type", "scope",
+        "condition_version", "created_by", "updated_by", "role_name",
+    })
+    __slots__ = tuple(FIELDS.values()) + tuple(PROPERTY_FIELDS.values())
+
+
+class ResourceRecord(CompactRecord):
+    """A resource as listed by the ARM resources API; its properties, when expanded, are kept as they are."""
+
+    FIELDS = {
+        "id": "id",
+        "name": "name",
+        "type": "type",
+        "kind": "kind",
+        "location": "location",
+        "managedBy": "managed_by",
+        "sku": "sku",
+        "tags": "tags",
+        "identity": "identity",
+        "plan": "plan",
+        "createdTime": "created_time",
+        "changedTime": "changed_time",
+        "provisioningState": "provisioning_state",
+    }
+    INTERNED = frozenset({"type", "kind", "location", "managed_by", "sku", "tags", "provisioning_state"})
+    __slots__ = tuple(FIELDS.values())
+
+
+class PrincipalRecord(CompactRecord):
+    """A Microsoft Graph service principal, user or group."""
+
+    FIELDS = {
+        "@odata.type": "odata_type",
+        "id": "id",
+        "appId": "app_id",
+        "displayName": "display_name",
+        "servicePrincipalType": "service_principal_type",
+        "accountEnabled": "account_enabled",
+        "appOwnerOrganizationId": "app_owner_organization_id",
+        "appDisplayName": "app_display_name",
+        "signInAudience": "sign_in_audience",
+        "servicePrincipalNames": "service_principal_names",
+        "tags": "tags",
+        "userPrincipalName": "user_principal_name",
+        "mail": "mail",
+        "securityEnabled": "security_enabled",
+        "mailEnabled": "mail_enabled",
+        "groupTypes": "group_types",
+    }
+    INTERNED = frozenset({
+        "odata_type", "service_principal_type", "app_owner_organization_id", "sign_in_audience", "tags",
+        "group_types",
+    })
+    __slots__ = tuple(FIELDS.values())
+
+
+def compact(records, record_type):
+    """
+    Args:
+        records (Iterable[Dict]): Records in their JSON shape.
+        record_type (Type[CompactRecord]): Compact type to convert them to.
+
+    Returns:
+        List[CompactRecord]: The compact records.
+    """
+    return [record_type.from_dict(record) for record in records]
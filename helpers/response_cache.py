@@ -0,0 +1,244 @@
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+
+MODES = ("off", "record", "replay", "refresh")
+
+DEFAULT_TTL = 24 * 3600
+DEFAULT_MAX_BYTES = 1024 * 2**20
+# Eviction trims the stored bodies to this fraction of max_bytes; a body that
+# does not fit in it on its own is not stored at all
+EVICT_TO = 0.9
+
+
+def cache_key(method, url):
+    """
+    Build the cache key for a request.
+
+    The key covers the method, the URL with its query parameters sorted and the
+    api-version pulled out as its own component, so the same listing requested
+    with parameters in a different order hits the same entry.
+
+    Args:
+        method (str): HTTP method.
+        url (str): Request URL.
+
+    Returns:
+        Tuple[str, str, str]: (key digest, normalized URL, api-version).
+    """
+    parts = urlsplit(url)
+    params = parse_qsl(parts.query, keep_blank_values=True)
+    api_version = next((v for k, v in params if k.lower() == "api-version"), "")
+    query = urlencode(sorted((k, v) for k, v in params if k.lower() != "api-version"))
+    normalized = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, query, ""))
+    digest = hashlib.sha256(f"{method.upper()} {normalized} {api_version}".encode("utf-8")).hexdigest()
+    return digest, normalized, api_version
+
+
+class ResponseCache:
+    """
+    On-disk record/replay cache for ARM and Graph responses.
+
+    Response bodies are stored once per content hash, gzip-compressed, under
+    `objects/`; a SQLite index maps request keys to bodies and tracks age and last
+    access. The total stored size is bounded and least recently used entries are
+    evicted first.
+
+    Modes:
+        record:  serve fresh entries, fetch and store misses and stale entries.
+        replay:  serve only from the cache, whatever the age; misses return 504 and
+                 never touch the network.
+        refresh: always fetch and overwrite the entry.
+        off:     bypass the cache.
+    """
+
+    def __init__(self, cache_dir, mode="record", ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Open (or create) the cache.
+
+        Args:
+            cache_dir (str): Directory holding index.sqlite and objects/.
+            mode (str): One of MODES.
+            ttl (float): Seconds an entry stays fresh in record mode.
+            max_bytes (int): Upper bound on the compressed size of stored bodies.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown cache mode {mode!r}; expected one of {', '.join(MODES)}")
+        self.cache_dir = cache_dir
+        self.mode = mode
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.oversized = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(cache_dir, "objects"), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, method TEXT, url TEXT, api_version TEXT, digest TEXT,"
+            " status INTEGER, content_type TEXT, stored_at REAL, last_access REAL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS objects (digest TEXT PRIMARY KEY, size INTEGER)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access)")
+        self._db.commit()
+        self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+
+    def _object_path(self, digest):
+        return os.path.join(self.cache_dir, "objects", digest[:2], f"{digest}.gz")
+
+    def get(self, method, url, fetch):
+        """
+        Return the response for a request, from the cache or by calling `fetch`.
+
+        Args:
+            method (str): HTTP method.
+            url (str): Request URL.
+            fetch (Callable[[], requests.Response]): Performs the real request.
+
+        Returns:
+            requests.Response: The cached or freshly fetched response.
+        """
+        if self.mode == "off":
+            return fetch()
+        key, normalized, api_version = cache_key(method, url)
+        cached = None
+        if self.mode != "refresh":
+            cached = self._load(key, url, fresh_only=self.mode == "record")
+        # Collector threads share the cache, so the counters change under the lock
+        with self._lock:
+            if cached is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if cached is not None:
+            return cached
+        if self.mode == "replay":
+            return self._response(url, 504, b'{"error": {"code": "CacheMiss", "message": "not in replay cache"}}',
+                                  "application/json")
+        response = fetch()
+        if response.status_code == 200:
+            self._store(key, method, normalized, api_version, response)
+        return response
+
+    def _load(self, key, url, fresh_only):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT digest, status, content_type, stored_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            digest, status, content_type, stored_at = row
+            if fresh_only and time.time() - stored_at > self.ttl:
+                return None
+            try:
+                with gzip.open(self._object_path(digest), "rb") as f:
+                    body = f.read()
+            except FileNotFoundError:
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        return self._response(url, status, body, content_type)
+
+    def _store(self, key, method, normalized, api_version, response):
+        body = response.content
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        now = time.time()
+        with self._lock:
+            if self._db.execute("SELECT 1 FROM objects WHERE digest = ?", (digest,)).fetchone() is None:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.tmp"
+                with gzip.open(tmp_path, "wb", compresslevel=6) as f:
+                    f.write(body)
+                size = os.path.getsize(tmp_path)
+                if size > self.max_bytes * EVICT_TO:
+                    # Storing it would only evict everything else and then the body itself
+                    os.remove(tmp_path)
+                    self.oversized += 1
+                    return
+                os.replace(tmp_path, path)
+                self._db.execute("INSERT INTO objects (digest, size) VALUES (?, ?)", (digest, size))
+                self._total_bytes += size
+            previous = self._db.execute("SELECT digest FROM entries WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, method.upper(), normalized, api_version, digest, response.status_code,
+                 response.headers.get("Content-Type"), now, now),
+            )
+            if previous and previous[0] != digest:
+                self._drop_unreferenced(previous[0])
+            self.stores += 1
+            self._evict()
+            self._db.commit()
+
+    def _drop_unreferenced(self, digest):
+        if self._db.execute("SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)).fetchone():
+            return
+        row = self._db.execute("SELECT size FROM objects WHERE digest = ?", (digest,)).fetchone()
+        self._db.execute("DELETE FROM objects WHERE digest = ?", (digest,))
+        if row:
+            self._total_bytes -= row[0]
+        try:
+            os.remove(self._object_path(digest))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        """Drop least recently used entries until stored bodies fit in EVICT_TO of max_bytes."""
+        if self._total_bytes <= self.max_bytes:
+            return
+        target = self.max_bytes * EVICT_TO
+        rows = self._db.execute("SELECT key, digest FROM entries ORDER BY last_access").fetchall()
+        for key, digest in rows:
+            if self._total_bytes <= target:
+                break
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._drop_unreferenced(digest)
+            self.evictions += 1
+
+    @staticmethod
+    def _response(url, status, body, content_type):
+        response = requests.Response()
+        response.status_code = status
+        response._content = body
+        response.url = url
+        response.encoding = "utf-8"
+        if content_type:
+            response.headers["Content-Type"] = content_type
+        return response
+
+    def stats(self):
+        """
+        Returns:
+            Dict: Hit/miss/store/eviction counts, bodies too large to store, and the stored size.
+        """
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            return {
+                "mode": self.mode,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "oversized": self.oversized,
+                "entries": entries,
+                "stored_bytes": self._total_bytes,
+            }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
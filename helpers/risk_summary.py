@@ -0,0 +1,370 @@
+import os
+import time
+from array import array
+from collections import Counter
+
+from helpers.enrichment import parse_scope
+from helpers.inventory import ASSIGNMENT_FILES
+from helpers.pipeline import iter_json_records, resolve_output
+from helpers.roles import azure_roles
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional: without it the group-bys run as plain Python over the same columns
+    np = None
+
+# Built-in roles that grant control over access itself
+PRIVILEGED_ROLES = {
+    "8e3af657-a8ff-443c-a75c-2fe8c4bcb635": "Owner",
+    "18d7d88d-d35e-4fb5-a5c3-7773c20a72d9": "User Access Administrator",
+}
+# Scope levels at which a privileged assignment is reported
+PRIVILEGED_LEVELS = ("managementGroup", "subscription")
+SCOPE_LEVELS = ("root", "managementGroup", "subscription", "resourceGroup", "resource")
+# Directory state of the account behind a classic administrator's e-mail address
+USER_STATES = ("enabled", "disabled", "unknown")
+
+CLASSIC_ADMINS = "classic_admins.json"
+SERVICE_PRINCIPALS = "service_principals.json"
+USERS = "users.json"
+SUBSCRIPTIONS = "subscriptions.json"
+RISK_SUMMARY = "risk_summary.json"
+
+
+class Categories:
+    """
+    Integer codes for the distinct values of a string column.
+
+    Codes are handed out in order of first appearance after any values given up
+    front, so a column holds one small integer per row and each distinct string
+    is stored once.
+    """
+
+    def __init__(self, values=()):
+        self.values = []
+        self._codes = {}
+        for value in values:
+            self.code(value)
+
+    def code(self, value):
+        """
+        Returns:
+            int: The code of `value`, assigning the next one if it is new.
+        """
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __len__(self):
+        return len(self.values)
+
+
+def _column(values):
+    # Zero-copy NumPy view of an int32 array column, or the array itself without NumPy
+    return np.frombuffer(values, dtype=np.int32) if np is not None and len(values) else values
+
+
+class AssignmentColumns:
+    """
+    Role assignments held as columns of categorical codes.
+
+    Each assignment is a row of four int32 codes: role (the role definition GUID,
+    coded in the order of `helpers/roles.azure_roles`, custom roles after the
+    built-in ones), scope and principal (both lower-cased) and principal type.
+    The level and subscription of each distinct scope are parsed once and kept
+    per scope code, so group-bys over them never touch a string.
+    """
+
+    def __init__(self):
+        self.roles = Categories(azure_roles)
+        self.scopes = Categories()
+        self.principals = Categories()
+        self.principal_types = Categories()
+        self.subscriptions = Categories([""])
+        self.role = array("i")
+        self.scope = array("i")
+        self.principal = array("i")
+        self.principal_type = array("i")
+        # Per scope code
+        self.scope_level = array("i")
+        self.scope_subscription = array("i")
+
+    @classmethod
+    def load(cls, output_dir):
+        """
+        Args:
+            output_dir (str): Crawl output directory; assignments listed in several files are counted once.
+
+        Returns:
+            AssignmentColumns: The columns.
+        """
+        columns = cls()
+        seen = set()
+        for names in ASSIGNMENT_FILES:
+            path = next((resolve_output(output_dir, name) for name in names
+                         if os.path.exists(resolve_output(output_dir, name))), None)
+            if path is None:
+                continue
+            for assignment in iter_json_records(path):
+                key = (assignment.get("id") or "").lower()
+                if key in seen:
+                    continue
+                seen.add(key)
+                columns.add(assignment.get("properties") or {})
+        return columns
+
+    def add(self, properties):
+        """
+        Args:
+            properties (Dict): The `properties` object of a role assignment.
+        """
+        self.role.append(self.roles.code((properties.get("roleDefinitionId") or "").rsplit("/", 1)[-1].lower()))
+        scope = (properties.get("scope") or "").rstrip("/").lower()
+        scope_code = self.scopes.code(scope)
+        if scope_code == len(self.scope_level):
+            details = parse_scope(scope)
+            self.scope_level.append(SCOPE_LEVELS.index(details["level"]))
+            self.scope_subscription.append(self.subscriptions.code(details.get("subscriptionId", "")))
+        self.scope.append(scope_code)
+        self.principal.append(self.principals.code((properties.get("principalId") or "").lower()))
+        self.principal_type.append(self.principal_types.code(properties.get("principalType") or ""))
+
+    def __len__(self):
+        return len(self.role)
+
+    def role_name(self, code):
+        role_id = self.roles.values[code]
+        return azure_roles.get(role_id, f"Unknown Role ({role_id})")
+
+    def per_role_per_subscription(self):
+        """
+        Count the assignments at or below each subscription, per role.
+
+        Returns:
+            List[Tuple[int, int, int]]: (subscription code, role code, count), ordered by subscription and role;
+            assignments at management group or root scope are left out.
+        """
+        role, scope = _column(self.role), _column(self.scope)
+        subscription_of = _column(self.scope_subscription)
+        width = len(self.roles)
+        if np is not None:
+            if not len(self):
+                return []
+            keys = subscription_of[scope].astype(np.int64) * width + role
+            keys, counts = np.unique(keys[keys >= width], return_counts=True)
+            return [(int(key // width), int(key % width), int(count)) for key, count in zip(keys, counts)]
+        counts = Counter(subscription_of[s] * width + r for r, s in zip(role, scope) if subscription_of[s])
+        return [(key // width, key % width, count) for key, count in sorted(counts.items())]
+
+    def privileged_rows(self):
+        """
+        Returns:
+            List[int]: Rows granting a PRIVILEGED_ROLES role at a PRIVILEGED_LEVELS scope, in row order.
+        """
+        roles = [self.roles.code(role_id) for role_id in PRIVILEGED_ROLES]
+        levels = [SCOPE_LEVELS.index(level) for level in PRIVILEGED_LEVELS]
+        role, scope = _column(self.role), _column(self.scope)
+        if np is not None:
+            if not len(self):
+                return []
+            mask = np.isin(role, roles) & np.isin(_column(self.scope_level)[scope], levels)
+            return np.flatnonzero(mask).tolist()
+        roles, levels = set(roles), set(levels)
+        privileged_scope = [level in levels for level in self.scope_level]
+        return [row for row, (r, s) in enumerate(zip(role, scope)) if r in roles and privileged_scope[s]]
+
+
+class ClassicAdminColumns:
+    """
+    Classic administrators as columns of subscription and e-mail address codes,
+    with the directory state of each distinct address.
+    """
+
+    def __init__(self):
+        self.subscriptions = Categories()
+        self.emails = Categories()
+        self.subscription = array("i")
+        self.email = array("i")
+        self.roles = []
+        # Per e-mail code, an index into USER_STATES
+        self.email_state = array("i")
+
+    @classmethod
+    def load(cls, output_dir, user_states):
+        """
+        Args:
+            output_dir (str): Crawl output directory.
+            user_states (Dict[str, str]): USER_STATES entry per lower-cased user principal name and mail address.
+
+        Returns:
+            ClassicAdminColumns: The columns; empty when the crawl has no classic administrators.
+        """
+        columns = cls()
+        path = resolve_output(output_dir, CLASSIC_ADMINS)
+        if not os.path.exists(path):
+            return columns
+        for admin in iter_json_records(path):
+            properties = admin.get("properties") or {}
+            details = parse_scope((admin.get("id") or "").split("/providers/", 1)[0])
+            columns.subscription.append(columns.subscriptions.code(details.get("subscriptionId", "")))
+            email = (properties.get("emailAddress") or "").lower()
+            email_code = columns.emails.code(email)
+            if email_code == len(columns.email_state):
+                columns.email_state.append(USER_STATES.index(user_states.get(email, "unknown")))
+            columns.email.append(email_code)
+            columns.roles.append(properties.get("role"))
+        return columns
+
+    def stale_rows(self):
+        """
+        Returns:
+            List[int]: Rows whose address belongs to no enabled user of the directory, in row order.
+        """
+        enabled = USER_STATES.index("enabled")
+        if np is not None:
+            if not len(self.email):
+                return []
+            return np.flatnonzero(_column(self.email_state)[_column(self.email)] != enabled).tolist()
+        return [row for row, email in enumerate(self.email) if self.email_state[email] != enabled]
+
+
+def _user_states(output_dir):
+    states = {}
+    path = resolve_output(output_dir, USERS)
+    if os.path.exists(path):
+        for user in iter_json_records(path):
+            state = "disabled" if user.get("accountEnabled") is False else "enabled"
+            for key in ("userPrincipalName", "mail"):
+                if user.get(key):
+                    states[user[key].lower()] = state
+    return states
+
+
+def _service_principals(output_dir, principal_ids):
+    # Only the privileged principals are kept, so the file is streamed, not loaded
+    details = {}
+    path = resolve_output(output_dir, SERVICE_PRINCIPALS)
+    if principal_ids and os.path.exists(path):
+        for sp in iter_json_records(path):
+            key = (sp.get("id") or "").lower()
+            if key in principal_ids:
+                details[key] = {
+                    "displayName": sp.get("displayName"),
+                    "appId": sp.get("appId"),
+                    "servicePrincipalType": sp.get("servicePrincipalType"),
+                    "accountEnabled": sp.get("accountEnabled"),
+                }
+    return details
+
+
+def _subscription_names(output_dir):
+    names = {}
+    path = resolve_output(output_dir, SUBSCRIPTIONS)
+    if os.path.exists(path):
+        for sub in iter_json_records(path):
+            if sub.get("subscriptionId"):
+                names[sub["subscriptionId"].lower()] = sub.get("displayName")
+    return names
+
+
+def summarize(output_dir):
+    """
+    Compute the privilege risk summary of one crawl.
+
+    Role assignments and classic administrators are loaded into integer code
+    columns (see AssignmentColumns); the group-bys then run over the codes, with
+    NumPy when it is installed and as plain Python otherwise.
+
+    Args:
+        output_dir (str): Crawl output directory, JSON array or JSON lines outputs.
+
+    Returns:
+        Dict: `assignments_per_role_per_subscription`, `privileged_principals` (Owner or User Access
+        Administrator at management group or subscription scope, with service principal details),
+        `stale_classic_admins` (whose address is not an enabled user), per-section `totals` and `timings`.
+    """
+    timings = {}
+    start = time.perf_counter()
+    assignments = AssignmentColumns.load(output_dir)
+    admins = ClassicAdminColumns.load(output_dir, _user_states(output_dir))
+    subscription_names = _subscription_names(output_dir)
+    timings["load_seconds"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    per_role = [
+        {
+            "subscriptionId": assignments.subscriptions.values[sub],
+            "subscriptionName": subscription_names.get(assignments.subscriptions.values[sub]),
+            "roleId": assignments.roles.values[role],
+            "roleName": assignments.role_name(role),
+            "assignments": count,
+        }
+        for sub, role, count in assignments.per_role_per_subscription()
+    ]
+
+    privileged = {}
+    for row in assignments.privileged_rows():
+        principal_id = assignments.principals.values[assignments.principal[row]]
+        entry = privileged.setdefault(principal_id, {
+            "principalId": principal_id,
+            "principalType": assignments.principal_types.values[assignments.principal_type[row]],
+            "assignments": [],
+        })
+        scope_code = assignments.scope[row]
+        entry["assignments"].append({
+            "roleName": assignments.role_name(assignments.role[row]),
+            "scope": assignments.scopes.values[scope_code],
+            "level": SCOPE_LEVELS[assignments.scope_level[scope_code]],
+        })
+    service_principals = _service_principals(output_dir, set(privileged))
+    for principal_id, details in service_principals.items():
+        privileged[principal_id]["servicePrincipal"] = details
+
+    stale = [
+        {
+            "subscriptionId": admins.subscriptions.values[admins.subscription[row]],
+            "subscriptionName": subscription_names.get(admins.subscriptions.values[admins.subscription[row]].lower()),
+            "emailAddress": admins.emails.values[admins.email[row]],
+            "role": admins.roles[row],
+            "userState": USER_STATES[admins.email_state[admins.email[row]]],
+        }
+        for row in admins.stale_rows()
+    ]
+    timings["group_by_seconds"] = time.perf_counter() - start
+
+    return {
+        "assignments_per_role_per_subscription": per_role,
+        "privileged_principals": list(privileged.values()),
+        "stale_classic_admins": stale,
+        "totals": {
+            "assignments": len(assignments),
+            "scopes": len(assignments.scopes),
+            "principals": len(assignments.principals),
+            "privileged_principals": len(privileged),
+            "classic_admins": len(admins.email),
+            "stale_classic_admins": len(stale),
+        },
+        "timings": {name: round(seconds, 3) for name, seconds in timings.items()},
+        "engine": "numpy" if np is not None else "python",
+    }
+
+
+def summary_lines(summary):
+    """
+    Returns:
+        str: Headline counts and the privileged principals, one line each.
+    """
+    totals = summary["totals"]
+    lines = [
+        f"{totals['assignments']} assignments over {totals['scopes']} scopes and {totals['principals']} principals; "
+        f"{totals['privileged_principals']} privileged principals; "
+        f"{totals['stale_classic_admins']} of {totals['classic_admins']} classic admins stale "
+        f"({summary['engine']}, {summary['timings']})"
+    ]
+    for principal in summary["privileged_principals"]:
+        name = (principal.get("servicePrincipal") or {}).get("displayName") or ""
+        roles = sorted({f"{a['roleName']} at {a['level']}" for a in principal["assignments"]})
+        lines.append(f"{principal['principalId']} {principal['principalType']:<16} {name:<24} {', '.join(roles)}")
+    return "\n".join(lines)
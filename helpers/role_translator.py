@@ -1,4 +1,5 @@
 import json
+from helpers.records import RoleAssignmentRecord
 from helpers.roles import azure_roles
 
 class RoleTranslator:
@@ -17,6 +18,25 @@ class RoleTranslator:
         guid = self.extract_role_id(role_definition_id)
         return self.role_mappings.get(guid, f"Unknown Role ({guid})")
 
+    def translate_assignment(self, assignment):
+        """
+        Add the friendly role name to a role assignment as properties.roleName.
+
+        Args:
+            assignment (dict or RoleAssignmentRecord): Role assignment as returned by ARM; updated in place.
+
+        Returns:
+            dict or RoleAssignmentRecord: The same role assignment.
+        """
+        if isinstance(assignment, RoleAssignmentRecord):
+            if assignment.role_definition_id is not None:
+                assignment.set_property('roleName', self.get_role_name(assignment.role_definition_id))
+            return assignment
+        if 'properties' in assignment and 'roleDefinitionId' in assignment['properties']:
+            role_id = assignment['properties']['roleDefinitionId']
+            assignment['properties']['roleName'] = self.get_role_name(role_id)
+        return assignment
+
     def process_role_assignments(self, input_file, output_file):
         """
         Process role assignments JSON file and add friendly names.
@@ -32,10 +52,7 @@ class RoleTranslator:
             
             # Process each role assignment
             for assignment in data:
-                if 'properties' in assignment and 'roleDefinitionId' in assignment['properties']:
-                    role_id = assignment['properties']['roleDefinitionId']
-                    friendly_name = self.get_role_name(role_id)
-                    assignment['properties']['roleName'] = friendly_name
+                self.translate_assignment(assignment)
             
             # Write the processed data to output file
             with open(output_file, 'w') as f:
@@ -0,0 +1,73 @@
+from fnmatch import fnmatchcase
+
+
+class ScopeFilter:
+    """
+    Glob filter for ARM scopes (subscriptions, management groups, resource groups).
+
+    A pattern matches a scope when it matches, case-insensitively, any of:
+    the full resource id, the last id segment (subscription GUID, group name),
+    `name`, `subscriptionId` or the display name. A pattern of the form
+    KEY=VALUE matches the scope's tags instead, with globs allowed on both
+    sides. An empty filter matches everything.
+    """
+
+    def __init__(self, patterns=None):
+        """
+        Args:
+            patterns (Iterable[str]): Glob patterns; a scope matching any one of them is kept.
+        """
+        self.patterns = [p.lower() for p in patterns or []]
+
+    def __bool__(self):
+        return bool(self.patterns)
+
+    @staticmethod
+    def _names(item):
+        properties = item.get("properties") or {}
+        scope_id = item.get("id") or ""
+        return [
+            value.lower()
+            for value in (
+                scope_id,
+                scope_id.rstrip("/").rsplit("/", 1)[-1],
+                item.get("name"),
+                item.get("subscriptionId"),
+                item.get("displayName"),
+                properties.get("displayName"),
+            )
+            if value
+        ]
+
+    def matches(self, item):
+        """
+        Args:
+            item (Dict): A scope as returned by ARM.
+
+        Returns:
+            bool: Whether the scope passes the filter.
+        """
+        if not self.patterns:
+            return True
+        names = self._names(item)
+        tags = {str(k).lower(): str(v).lower() for k, v in (item.get("tags") or {}).items()}
+        for pattern in self.patterns:
+            if "=" in pattern:
+                key_pattern, value_pattern = pattern.split("=", 1)
+                if any(fnmatchcase(k, key_pattern) and fnmatchcase(v, value_pattern) for k, v in tags.items()):
+                    return True
+            elif any(fnmatchcase(name, pattern) for name in names):
+                return True
+        return False
+
+    def select(self, items):
+        """
+        Args:
+            items (List[Dict]): Scopes to filter.
+
+        Returns:
+            List[Dict]: The scopes that pass the filter.
+        """
+        if not self.patterns:
+            return items
+        return [item for item in items if self.matches(item)]
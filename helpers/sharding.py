@@ -0,0 +1,238 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+
+from helpers.dedup import SpillingKeySet
+from helpers.offset_index import INDEX_FIELDS
+from helpers.pipeline import iter_json_records, open_writer
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+# Shard that runs the tenant-wide collectors (management groups, Graph)
+TENANT_SHARD = 0
+
+
+def subscription_key(subscription):
+    """
+    Returns:
+        str: The lower-cased subscription GUID of a subscription record, resource id or GUID.
+    """
+    if isinstance(subscription, dict):
+        subscription = subscription.get("subscriptionId") or subscription.get("id") or ""
+    return subscription.rstrip("/").split("/")[-1].lower()
+
+
+class ShardPlan:
+    """
+    Deterministic assignment of subscriptions to the shards of a crawl.
+
+    Subscriptions listed in `assignments` go to the shard given there; every other
+    subscription goes to the shard picked by the SHA-256 of its GUID, so every
+    worker computes the same partition from the subscription list alone. Shard 0
+    also runs the tenant-wide collectors.
+    """
+
+    def __init__(self, index, count, assignments=None):
+        """
+        Args:
+            index (int): This worker's shard, from 0.
+            count (int): Number of shards.
+            assignments (Dict[str, int]): Explicit shard per subscription GUID or id.
+
+        Raises:
+            ValueError: If the index or an assignment is outside 0..count-1.
+        """
+        if count < 1 or not 0 <= index < count:
+            raise ValueError(f"Shard {index} is not one of 0..{count - 1}")
+        self.index = index
+        self.count = count
+        self.assignments = {subscription_key(key): shard for key, shard in (assignments or {}).items()}
+        invalid = sorted(key for key, shard in self.assignments.items() if not 0 <= shard < count)
+        if invalid:
+            raise ValueError(f"Subscriptions assigned outside 0..{count - 1}: {', '.join(invalid)}")
+
+    @classmethod
+    def parse(cls, spec, map_path=None):
+        """
+        Build a plan from the command line.
+
+        Args:
+            spec (str): "INDEX/COUNT", e.g. "0/4".
+            map_path (str): Optional JSON file mapping subscription GUIDs to shard indexes.
+
+        Returns:
+            ShardPlan: The plan.
+        """
+        try:
+            index, count = (int(part) for part in spec.split("/"))
+        except ValueError:
+            raise ValueError(f"Shard {spec!r} is not INDEX/COUNT") from None
+        assignments = None
+        if map_path:
+            with open(map_path) as f:
+                assignments = json.load(f)
+        return cls(index, count, assignments)
+
+    @property
+    def owns_tenant(self):
+        """bool: Whether this shard runs the tenant-wide collectors."""
+        return self.index == TENANT_SHARD
+
+    @property
+    def name(self):
+        """str: Directory name of this shard's output."""
+        return f"shard-{self.index}-of-{self.count}"
+
+    def shard_of(self, subscription):
+        """
+        Args:
+            subscription: A subscription record, resource id or GUID.
+
+        Returns:
+            int: The shard the subscription belongs to.
+        """
+        key = subscription_key(subscription)
+        if key in self.assignments:
+            return self.assignments[key]
+        return int.from_bytes(hashlib.sha256(key.encode("ascii")).digest()[:8], "big") % self.count
+
+    def select(self, subscriptions):
+        """
+        Returns:
+            List[Dict]: The subscriptions belonging to this shard, in their original order.
+        """
+        return [sub for sub in subscriptions if self.shard_of(sub) == self.index]
+
+    def write_manifest(self, output_dir, subscriptions, collectors, failed, outputs, started):
+        """
+        Write the shard manifest, which marks the shard's outputs as complete.
+
+        Args:
+            output_dir (str): The shard's output directory.
+            subscriptions (List[Dict]): Subscriptions crawled by this shard.
+            collectors (List[str]): Collectors run by this shard.
+            failed (List[str]): Collectors among them that failed or were skipped.
+            outputs (Dict[str, Dict]): Layout of each output file, as in OutputPipeline.outputs.
+            started (float): Start of the crawl, as time.time().
+
+        Returns:
+            str: Path of the manifest.
+        """
+        manifest = {
+            "shard": self.index,
+            "shards": self.count,
+            "partition": "map" if self.assignments else "hash",
+            "tenant": self.owns_tenant,
+            "subscriptions": [subscription_key(sub) for sub in subscriptions],
+            "collectors": list(collectors),
+            "failed": list(failed),
+            "outputs": outputs,
+            "started": started,
+            "finished": time.time(),
+        }
+        path = os.path.join(output_dir, MANIFEST)
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(f"{path}.tmp", path)
+        return path
+
+
+def load_manifests(directories):
+    """
+    Read and check the manifests of a complete set of shards.
+
+    Args:
+        directories (Iterable[str]): Shard output directories.
+
+    Returns:
+        List[Dict]: The manifests in shard order, each with its `directory`.
+
+    Raises:
+        ValueError: If a shard is missing or duplicated, or the shards come from different partitions.
+    """
+    manifests = []
+    for directory in directories:
+        path = os.path.join(directory, MANIFEST)
+        if not os.path.exists(path):
+            raise ValueError(f"{directory} has no {MANIFEST}; the shard did not finish")
+        with open(path) as f:
+            manifest = json.load(f)
+        manifest["directory"] = directory
+        manifests.append(manifest)
+    if not manifests:
+        raise ValueError("No shards to merge")
+    counts = {manifest["shards"] for manifest in manifests}
+    if len(counts) != 1:
+        raise ValueError(f"Shards come from crawls with different shard counts: {sorted(counts)}")
+    count = counts.pop()
+    indexes = sorted(manifest["shard"] for manifest in manifests)
+    if indexes != list(range(count)):
+        missing = sorted(set(range(count)) - set(indexes))
+        duplicated = sorted({index for index in indexes if indexes.count(index) > 1})
+        raise ValueError(f"Incomplete shard set: missing {missing}, duplicated {duplicated}")
+    return sorted(manifests, key=lambda manifest: manifest["shard"])
+
+
+def merge_shards(directories, output_dir="output"):
+    """
+    Combine the outputs of all shards into the standard output files.
+
+    Arrays and JSON lines files are concatenated in shard order, streaming record
+    by record, in the layout the pipeline writes them (JSON lines files get a new
+    offset index). A record whose id was already merged from an
+    earlier shard is dropped: role assignments inherited from a management group are
+    listed under the subscriptions of every shard. Single documents (written by one
+    shard) are copied.
+
+    Args:
+        directories (Iterable[str]): Shard output directories.
+        output_dir (str): Directory receiving the merged files.
+
+    Returns:
+        Dict[str, int]: Records written per merged array file.
+
+    Raises:
+        ValueError: If the shard set is incomplete or a document was written by several shards.
+    """
+    manifests = load_manifests(directories)
+    for manifest in manifests:
+        if manifest["failed"]:
+            logger.warning(f"Shard {manifest['shard']}: collectors {', '.join(manifest['failed'])} did not complete")
+
+    parts = {}
+    for manifest in manifests:
+        for name, layout in manifest["outputs"].items():
+            parts.setdefault(name, []).append((os.path.join(manifest["directory"], name), layout))
+
+    os.makedirs(output_dir, exist_ok=True)
+    records = {}
+    for name, files in parts.items():
+        path = os.path.join(output_dir, name)
+        if any(layout.get("document") for _, layout in files):
+            if len(files) > 1:
+                raise ValueError(f"{name} was written by {len(files)} shards")
+            shutil.copyfile(files[0][0], f"{path}.tmp")
+            os.replace(f"{path}.tmp", path)
+        else:
+            indent = files[0][1].get("indent")
+            records[name] = _concatenate([source for source, _ in files], path, indent)
+    return records
+
+
+def _concatenate(sources, destination, indent):
+    writer = open_writer(destination, indent, INDEX_FIELDS)
+    with SpillingKeySet() as seen:
+        try:
+            for source in sources:
+                writer.write(
+                    record for record in iter_json_records(source)
+                    if not isinstance(record, dict) or not record.get("id") or seen.add(record["id"])
+                )
+        except BaseException:
+            writer.abort()
+            raise
+    return writer.close()
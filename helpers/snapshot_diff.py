@@ -0,0 +1,185 @@
+import hashlib
+import heapq
+import json
+import os
+import shutil
+import tempfile
+
+from helpers.pipeline import iter_json_records, resolve_output
+
+# Outputs compared by default; their records carry an ARM or Graph `id`
+SNAPSHOT_FILES = (
+    "role_assignments.json",
+    "all_resource_role_assignments.json",
+    "service_principals.json",
+    "classic_admins.json",
+    "logic_apps.json",
+    "applications.json",
+    "users.json",
+    "groups.json",
+    "directory_roles.json",
+    "oauth2_permission_grants.json",
+)
+# (id, digest) pairs sorted in memory before a run is written to disk
+DEFAULT_MAX_ENTRIES = 1_000_000
+CHANGES = ("added", "removed", "changed")
+
+
+def record_digest(record):
+    """
+    Returns:
+        str: Hex digest of the record's canonical JSON (sorted keys, no whitespace).
+    """
+    body = json.dumps(record, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class _ExternalSort:
+    """Sorts (key, value) string pairs, spilling sorted runs to disk beyond `max_entries` pairs."""
+
+    def __init__(self, max_entries, spill_dir):
+        self.max_entries = max_entries
+        self.spill_dir = spill_dir
+        self.runs = []
+        self._pairs = []
+
+    def add(self, key, value):
+        self._pairs.append((key, value))
+        if len(self._pairs) >= self.max_entries:
+            self._spill()
+
+    def _spill(self):
+        self._pairs.sort()
+        path = os.path.join(self.spill_dir, f"run-{id(self)}-{len(self.runs)}.tsv")
+        with open(path, "w") as f:
+            f.writelines(f"{key}\t{value}\n" for key, value in self._pairs)
+        self.runs.append(path)
+        self._pairs = []
+
+    @staticmethod
+    def _read(path):
+        with open(path) as f:
+            for line in f:
+                key, value = line.rstrip("\n").split("\t")
+                yield key, value
+
+    def __iter__(self):
+        self._pairs.sort()
+        if not self.runs:
+            return iter(self._pairs)
+        return heapq.merge(self._pairs, *(self._read(path) for path in self.runs))
+
+
+def sorted_digests(path, max_entries=DEFAULT_MAX_ENTRIES, spill_dir=None):
+    """
+    Stream a snapshot file into (lower-cased id, content digest) pairs sorted by id.
+
+    Records listed more than once (snapshots written before role assignments were
+    de-duplicated) count once; records without an id are skipped.
+
+    Args:
+        path (str): JSON array or JSON lines file; a missing file is an empty snapshot.
+        max_entries (int): Pairs sorted in memory before a sorted run is spilled to disk.
+        spill_dir (str): Directory for the spilled runs.
+
+    Yields:
+        Tuple[str, str]: Id and digest, in id order.
+    """
+    if not os.path.exists(path):
+        return
+    pairs = _ExternalSort(max_entries, spill_dir or tempfile.gettempdir())
+    for record in iter_json_records(path):
+        if isinstance(record, dict) and record.get("id"):
+            # Ids hold no tabs or newlines, which separate the fields of a spilled run
+            pairs.add(record["id"].lower(), record_digest(record))
+    previous = None
+    for key, digest in pairs:
+        if key != previous:
+            yield key, digest
+        previous = key
+
+
+def diff_files(old_path, new_path, max_entries=DEFAULT_MAX_ENTRIES, spill_dir=None):
+    """
+    Compare two versions of a snapshot file by record id and content digest.
+
+    Both files are streamed and externally sorted, then merged in one pass, so
+    memory is bounded by `max_entries` pairs per file whatever their size.
+
+    Args:
+        old_path (str): The earlier file.
+        new_path (str): The later file.
+        max_entries (int): Pairs per file sorted in memory before spilling.
+        spill_dir (str): Directory for the spilled runs.
+
+    Returns:
+        Dict: Counts of added, removed, changed and unchanged records, and the ids of the
+        changed ones (lower-cased) under `ids`.
+    """
+    spill = tempfile.mkdtemp(prefix="snapshot-diff-", dir=spill_dir)
+    try:
+        old = sorted_digests(old_path, max_entries, spill)
+        new = sorted_digests(new_path, max_entries, spill)
+        ids = {change: [] for change in CHANGES}
+        unchanged = 0
+        old_item, new_item = next(old, None), next(new, None)
+        while old_item is not None or new_item is not None:
+            if new_item is None or (old_item is not None and old_item[0] < new_item[0]):
+                ids["removed"].append(old_item[0])
+                old_item = next(old, None)
+            elif old_item is None or new_item[0] < old_item[0]:
+                ids["added"].append(new_item[0])
+                new_item = next(new, None)
+            else:
+                if old_item[1] == new_item[1]:
+                    unchanged += 1
+                else:
+                    ids["changed"].append(new_item[0])
+                old_item, new_item = next(old, None), next(new, None)
+    finally:
+        shutil.rmtree(spill, ignore_errors=True)
+    report = {change: len(ids[change]) for change in CHANGES}
+    report["unchanged"] = unchanged
+    report["ids"] = ids
+    return report
+
+
+def diff_snapshots(old_dir, new_dir, files=SNAPSHOT_FILES, max_entries=DEFAULT_MAX_ENTRIES, spill_dir=None):
+    """
+    Compare two crawl output directories.
+
+    Args:
+        old_dir (str): Output directory of the earlier crawl.
+        new_dir (str): Output directory of the later crawl.
+        files (Iterable[str]): Output files to compare; each is read as NAME.json or NAME.jsonl,
+            whichever the crawl wrote.
+        max_entries (int): Pairs per file sorted in memory before spilling.
+        spill_dir (str): Directory for the spilled runs.
+
+    Returns:
+        Dict: The change report, with a diff_files result per file present in either snapshot.
+    """
+    report = {"old": old_dir, "new": new_dir, "files": {}}
+    for name in files:
+        old_path, new_path = resolve_output(old_dir, name), resolve_output(new_dir, name)
+        if not os.path.exists(old_path) and not os.path.exists(new_path):
+            continue
+        result = diff_files(old_path, new_path, max_entries, spill_dir)
+        for side, path in (("old", old_path), ("new", new_path)):
+            if not os.path.exists(path):
+                result[f"missing_in_{side}"] = True
+        report["files"][name] = result
+    return report
+
+
+def summary_table(report):
+    """
+    Returns:
+        str: One line of change counts per compared file.
+    """
+    lines = [f"{'file':<38} {'added':>8} {'removed':>8} {'changed':>8} {'unchanged':>10}"]
+    for name, result in report["files"].items():
+        lines.append(
+            f"{name:<38} {result['added']:>8} {result['removed']:>8} {result['changed']:>8} {result['unchanged']:>10}"
+        )
+    return "\n".join(lines)
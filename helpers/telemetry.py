@@ -0,0 +1,287 @@
+import bisect
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Latency histogram upper bounds in seconds: 1 ms growing by 1.5x up to ~60 s
+LATENCY_BUCKETS = tuple(round(0.001 * 1.5 ** i, 6) for i in range(28))
+
+METRIC_PREFIX = "azure_random"
+
+
+def endpoint_family(url):
+    """
+    Group a request URL into an endpoint family, e.g. 'arm:microsoft.authorization/roleassignments'.
+
+    ARM URLs are grouped by the provider resource type of the last `providers` segment
+    (or by the collection name for subscriptions, resource groups and resources);
+    Graph URLs by the last collection in the path. Identifiers never appear in a family.
+
+    Args:
+        url (str): Request URL.
+
+    Returns:
+        str: The endpoint family.
+    """
+    parts = urlsplit(url)
+    segments = [s for s in parts.path.lower().split("/") if s]
+    if "graph" in parts.netloc or (segments and segments[0] in ("v1.0", "beta")):
+        segments = segments[1:] if segments and segments[0] in ("v1.0", "beta") else segments
+        collections = segments[0::2]
+        return f"graph:{collections[-1] if collections else ''}"
+    if "providers" in segments:
+        p = len(segments) - 1 - segments[::-1].index("providers")
+        namespace = segments[p + 1] if len(segments) > p + 1 else ""
+        types = segments[p + 2::2]
+        return f"arm:{namespace}/{'/'.join(types)}"
+    collections = segments[0::2]
+    return f"arm:{collections[-1] if collections else ''}"
+
+
+class _FamilyStats:
+    __slots__ = ("count", "errors", "throttled", "retries", "bytes", "latency_sum", "latency_max",
+                 "buckets", "statuses", "items", "pages", "fetch_seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.throttled = 0
+        self.retries = 0
+        self.bytes = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.statuses = {}
+        self.items = 0
+        self.pages = 0
+        self.fetch_seconds = 0.0
+
+
+class RequestTelemetry:
+    """
+    Per-endpoint-family request counters, latency histograms, response bytes,
+    retries and throttle events for outbound ARM, Graph and SDK calls.
+
+    Recording is a handful of integer updates under a lock, so it stays on for
+    every run; the report is only built when exported.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._families = {}
+        self.started = time.time()
+
+    def reset(self):
+        """Drop everything recorded so far."""
+        with self._lock:
+            self._families = {}
+            self.started = time.time()
+
+    def record(self, url, status, seconds, nbytes=0, retry=False):
+        """
+        Record one completed request attempt.
+
+        Args:
+            url (str): Request URL.
+            status (int): HTTP status code, or 0 when no response was received.
+            seconds (float): Time from sending the request to receiving the response.
+            nbytes (int): Response body size.
+            retry (bool): Whether this attempt retried an earlier one.
+        """
+        family = endpoint_family(url)
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            stats = self._families.get(family)
+            if stats is None:
+                stats = self._families[family] = _FamilyStats()
+            stats.count += 1
+            stats.bytes += nbytes
+            stats.latency_sum += seconds
+            if seconds > stats.latency_max:
+                stats.latency_max = seconds
+            stats.buckets[bucket] += 1
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            if status == 429:
+                stats.throttled += 1
+            elif status == 0 or status >= 400:
+                stats.errors += 1
+            if retry:
+                stats.retries += 1
+
+    def record_items(self, url, items, seconds):
+        """
+        Record one page of a paged collection, for its throughput.
+
+        Args:
+            url (str): URL of the page.
+            items (int): Records on the page.
+            seconds (float): Time taken to fetch and decode the page, token included.
+        """
+        family = endpoint_family(url)
+        with self._lock:
+            stats = self._families.get(family)
+            if stats is None:
+                stats = self._families[family] = _FamilyStats()
+            stats.items += items
+            stats.pages += 1
+            stats.fetch_seconds += seconds
+
+    def requests_hook(self, response, *args, **kwargs):
+        """`requests` response hook recording each response of a session."""
+        self.record(
+            response.request.url,
+            response.status_code,
+            response.elapsed.total_seconds(),
+            len(response.content),
+        )
+        return response
+
+    def sdk_request_hook(self, request):
+        """azure-core raw_request_hook; the pipeline context survives retries of the same request."""
+        context = request.context
+        context["telemetry_retry"] = "telemetry_start" in context
+        context["telemetry_start"] = time.perf_counter()
+
+    def sdk_response_hook(self, response):
+        """azure-core raw_response_hook recording each attempt of an SDK request."""
+        start = response.context.get("telemetry_start")
+        http_response = response.http_response
+        body = http_response.headers.get("Content-Length")
+        self.record(
+            response.http_request.url,
+            http_response.status_code,
+            time.perf_counter() - start if start is not None else 0.0,
+            int(body) if body and body.isdigit() else 0,
+            retry=response.context.get("telemetry_retry", False),
+        )
+
+    def sdk_client_kwargs(self):
+        """Keyword arguments wiring this telemetry into azure-mgmt clients."""
+        return {"raw_request_hook": self.sdk_request_hook, "raw_response_hook": self.sdk_response_hook}
+
+    @staticmethod
+    def _percentile(stats, fraction):
+        """Estimate a latency percentile by interpolating within its histogram bucket, capped at the maximum seen."""
+        if not stats.count:
+            return None
+        rank = fraction * stats.count
+        seen = 0
+        for i, n in enumerate(stats.buckets):
+            if n and seen + n >= rank:
+                lower = LATENCY_BUCKETS[i - 1] if i > 0 else 0.0
+                upper = LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else LATENCY_BUCKETS[-1]
+                return round(min(lower + (upper - lower) * (rank - seen) / n, stats.latency_max), 6)
+            seen += n
+        return round(stats.latency_max, 6)
+
+    @staticmethod
+    def _throughput(stats):
+        """Records, pages and records per second of fetch time, for families whose pages were counted."""
+        if not stats.pages:
+            return {}
+        return {
+            "items": stats.items,
+            "pages": stats.pages,
+            "items_per_second": round(stats.items / stats.fetch_seconds, 1) if stats.fetch_seconds else None,
+        }
+
+    def report(self):
+        """
+        Build the telemetry report.
+
+        Returns:
+            Dict: Run totals plus counts, latency percentiles, bytes, retries and
+            throttle events for each endpoint family.
+        """
+        with self._lock:
+            families = dict(self._families)
+            families = {
+                name: {
+                    "requests": s.count,
+                    "errors": s.errors,
+                    "throttled": s.throttled,
+                    "retries": s.retries,
+                    "response_bytes": s.bytes,
+                    "statuses": {str(k): v for k, v in sorted(s.statuses.items())},
+                    **self._throughput(s),
+                    "latency_seconds": {
+                        "mean": round(s.latency_sum / s.count, 6) if s.count else None,
+                        "p50": self._percentile(s, 0.50),
+                        "p95": self._percentile(s, 0.95),
+                        "p99": self._percentile(s, 0.99),
+                        "max": round(s.latency_max, 6),
+                    },
+                }
+                for name, s in sorted(families.items())
+            }
+        return {
+            "started": self.started,
+            "finished": time.time(),
+            "requests": sum(f["requests"] for f in families.values()),
+            "throttled": sum(f["throttled"] for f in families.values()),
+            "response_bytes": sum(f["response_bytes"] for f in families.values()),
+            "families": families,
+        }
+
+    def prometheus(self):
+        """
+        Render the counters and histograms in the Prometheus text exposition format.
+
+        Returns:
+            str: Textfile collector content.
+        """
+        with self._lock:
+            families = sorted(self._families.items())
+            lines = [
+                f"# HELP {METRIC_PREFIX}_requests_total Outbound API requests by endpoint family and status.",
+                f"# TYPE {METRIC_PREFIX}_requests_total counter",
+            ]
+            for name, s in families:
+                for status, n in sorted(s.statuses.items()):
+                    lines.append(f'{METRIC_PREFIX}_requests_total{{family="{name}",status="{status}"}} {n}')
+            for metric, attr, help_text in (
+                ("response_bytes_total", "bytes", "Response body bytes by endpoint family."),
+                ("throttled_total", "throttled", "HTTP 429 responses by endpoint family."),
+                ("retries_total", "retries", "Retried request attempts by endpoint family."),
+                ("items_total", "items", "Records received from paged collections by endpoint family."),
+                ("fetch_seconds_total", "fetch_seconds", "Time spent fetching the pages of paged collections."),
+            ):
+                lines.append(f"# HELP {METRIC_PREFIX}_{metric} {help_text}")
+                lines.append(f"# TYPE {METRIC_PREFIX}_{metric} counter")
+                for name, s in families:
+                    lines.append(f'{METRIC_PREFIX}_{metric}{{family="{name}"}} {getattr(s, attr)}')
+            lines.append(f"# HELP {METRIC_PREFIX}_request_duration_seconds Request latency by endpoint family.")
+            lines.append(f"# TYPE {METRIC_PREFIX}_request_duration_seconds histogram")
+            for name, s in families:
+                cumulative = 0
+                for bound, n in zip(LATENCY_BUCKETS, s.buckets):
+                    cumulative += n
+                    lines.append(f'{METRIC_PREFIX}_request_duration_seconds_bucket{{family="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{METRIC_PREFIX}_request_duration_seconds_bucket{{family="{name}",le="+Inf"}} {s.count}')
+                lines.append(f'{METRIC_PREFIX}_request_duration_seconds_sum{{family="{name}"}} {s.latency_sum:.6f}')
+                lines.append(f'{METRIC_PREFIX}_request_duration_seconds_count{{family="{name}"}} {s.count}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, json_path=None, prometheus_path=None):
+        """
+        Write the JSON report and/or the Prometheus textfile.
+
+        Files are written to a temporary name and renamed so collectors never read
+        a partial file.
+        """
+        for path, content in (
+            (json_path, lambda: json.dumps(self.report(), indent=2)),
+            (prometheus_path, self.prometheus),
+        ):
+            if not path:
+                continue
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(content())
+            os.replace(tmp_path, path)
+
+
+# Process-wide telemetry shared by the HTTP session and the SDK clients
+telemetry = RequestTelemetry()
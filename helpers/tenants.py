@@ -0,0 +1,108 @@
+import json
+import os
+import re
+import time
+
+# Per-tenant output trees go under this directory of --output-dir, beside the combined index
+TENANTS_DIR = "tenants"
+TENANT_INDEX = "index.json"
+# Tenant names become directory names
+_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*$")
+
+
+def load_tenants(path):
+    """
+    Read the tenants to crawl.
+
+    The file holds a JSON array of objects with `tenant_id`, `client_id` and either
+    `client_secret` or `client_secret_env`, the environment variable holding the
+    secret, plus an optional `name` (the tenant id by default) naming the tenant's
+    output directory.
+
+    Args:
+        path (str): The tenants file.
+
+    Returns:
+        List[Dict]: One dict per tenant with name, tenant_id, client_id and client_secret.
+
+    Raises:
+        ValueError: If an entry is incomplete, a secret variable is not set, or names are invalid or repeated.
+    """
+    with open(path) as f:
+        entries = json.load(f)
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"{path} must hold a non-empty JSON array of tenants")
+    tenants = []
+    names = set()
+    for i, entry in enumerate(entries):
+        missing = [key for key in ("tenant_id", "client_id") if not entry.get(key)]
+        if missing:
+            raise ValueError(f"Tenant {i} in {path} has no {', '.join(missing)}")
+        secret = entry.get("client_secret")
+        if secret is None and entry.get("client_secret_env"):
+            secret = os.environ.get(entry["client_secret_env"])
+            if secret is None:
+                raise ValueError(f"Tenant {i} in {path}: {entry['client_secret_env']} is not set")
+        if secret is None:
+            raise ValueError(f"Tenant {i} in {path} has no client_secret or client_secret_env")
+        name = entry.get("name") or entry["tenant_id"]
+        if not _NAME.match(name):
+            raise ValueError(f"Tenant name {name!r} in {path} is not a valid directory name")
+        if name in names:
+            raise ValueError(f"Tenant name {name!r} appears more than once in {path}")
+        names.add(name)
+        tenants.append({
+            "name": name,
+            "tenant_id": entry["tenant_id"],
+            "client_id": entry["client_id"],
+            "client_secret": secret,
+        })
+    return tenants
+
+
+def tenant_dir(output_dir, name):
+    """
+    Returns:
+        str: Output directory of one tenant under `output_dir`.
+    """
+    return os.path.join(output_dir, TENANTS_DIR, name)
+
+
+def write_tenant_index(output_dir, runs, started):
+    """
+    Write the combined index of a multi-tenant crawl.
+
+    Args:
+        output_dir (str): Directory holding the TENANTS_DIR tree.
+        runs (List[Dict]): Result of each tenant's crawl: name, tenant_id, output_dir, subscriptions,
+            outputs (layout per file, as in OutputPipeline.outputs), failed collectors, requests,
+            seconds and error (None on success).
+        started (float): Start of the crawl, as time.time().
+
+    Returns:
+        str: Path of the index.
+    """
+    subscriptions = {}
+    records = {}
+    runs = sorted(runs, key=lambda run: run["name"])
+    for run in runs:
+        # A subscription delegated to several tenants is listed under each of them
+        for subscription_id in run["subscriptions"]:
+            subscriptions.setdefault(subscription_id, []).append(run["name"])
+        for name, layout in run["outputs"].items():
+            if "records" in layout:
+                records[name] = records.get(name, 0) + layout["records"]
+    index = {
+        "tenants": runs,
+        "subscriptions": subscriptions,
+        "records": records,
+        "failed": sorted(run["name"] for run in runs if run["error"]),
+        "started": started,
+        "finished": time.time(),
+    }
+    path = os.path.join(output_dir, TENANTS_DIR, TENANT_INDEX)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(index, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+    return path
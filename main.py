@@ -1,23 +1,53 @@
+import argparse
 import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pprint import pprint
-from typing import List, Dict
-from helpers.auth import AuthClientGraph, AuthClientARM
-from modules.graph_data import get_graph_data, get_federated_credentials
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
+from helpers import http_session
+from helpers.collector_registry import collector, registry
+from helpers.content_store import ContentStore
+from helpers.dedup import Deduplicator, SpillingKeySet
+from helpers.auth import AuthClientGraph, AuthClientARM, OfflineAuthClient
+from modules.graph_data import get_graph_data, get_federated_credentials, iter_graph_pages
+from modules.group_membership import DEFAULT_CACHE_TTL as GROUP_CACHE_TTL, GroupExpander, group_principal_ids
+from modules.management_groups import ManagementGroupTree, load_management_group_tree
 from modules.arm_data import (
     get_subscriptions,
     get_resource_groups,
     get_sub_role_assignment,
     get_rg_role_assignment,
     get_mg_role_assignment,
-    get_management_groups,
     get_classic_admins,
     get_resources,
     get_resource_role_assignment,
-    get_logic_apps_configuration,
+    iter_subscription_logic_apps,
+    NON_ASSIGNABLE_RESOURCE_TYPES,
 )
-import config
 import json
+from helpers.records import PrincipalRecord, ResourceRecord, RoleAssignmentRecord, compact
+from helpers.offset_index import INDEX_FIELDS, INDEX_SUFFIX, OffsetIndex, build_index
+from helpers.pipeline import (
+    DEFAULT_MAX_BYTES as PIPELINE_MAX_BYTES,
+    OutputPipeline,
+    json_lines_name,
+    open_writer,
+    resolve_output,
+)
+from helpers.profiling import PhaseProfiler
+from helpers.response_cache import DEFAULT_MAX_BYTES, DEFAULT_TTL, MODES, ResponseCache
 from helpers.role_translator import RoleTranslator
+from helpers.scope_filter import ScopeFilter
+from helpers.inventory import GROUP_MEMBERS, PRINCIPAL_FILES, InventoryIndex, InventoryServer
+from helpers.enrichment import DEFAULT_CHUNK_SIZE, enrich_file, enriched_path, load_principal_names
+from helpers.risk_summary import RISK_SUMMARY, summarize, summary_lines
+from helpers.sharding import ShardPlan, merge_shards, subscription_key
+from helpers.snapshot_diff import SNAPSHOT_FILES, diff_snapshots, summary_table
+from helpers.telemetry import telemetry
+from helpers.tenants import load_tenants, tenant_dir, write_tenant_index
 
 # Constants
 APP_ID = "appId"
@@ -26,6 +56,31 @@ DISPLAY_NAME = "displayName"
 PROPERTIES = "properties"
 PRINCIPAL_ID = "principalId"
 
+# Concurrent per-resource role assignment requests
+RESOURCE_SCOPE_WORKERS = 8
+
+# Graph collections crawled alongside servicePrincipals: collector name -> (collection, output file)
+GRAPH_COLLECTIONS = {
+    "applications": ("applications", "applications.json"),
+    "users": ("users", "users.json"),
+    "groups": ("groups", "groups.json"),
+    "directory_roles": ("directoryRoles", "directory_roles.json"),
+    "oauth2_permission_grants": ("oauth2PermissionGrants", "oauth2_permission_grants.json"),
+}
+
+# Scopes each role assignment was listed at, written beside role_assignments.json
+ROLE_ASSIGNMENT_SCOPES = "role_assignment_scopes.json"
+
+# Daemon mode: crawl schedule, query API address, and the collectors re-run
+# between full crawls (the ones whose data changes most often)
+DAEMON_INTERVAL = 3600
+DAEMON_LISTEN = "127.0.0.1:8765"
+DAEMON_FULL_REFRESH_EVERY = 6
+DAEMON_REFRESH_COLLECTORS = ("role_assignments", "service_principals", "users", "groups", "classic_admins")
+
+# Tenants crawled concurrently by --tenants runs
+TENANT_WORKERS = 4
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
@@ -53,196 +108,1215 @@ def fetch_data(auth_client, endpoint: str) -> List[Dict]:
         return []
 
 
-def get_service_principals(graph_auth_client: AuthClientGraph) -> Dict[str, str]:
+@collector("service_principals", output="service_principals.json", auth="graph", stream=True, tenant_wide=True)
+def iter_service_principals(graph_auth_client: AuthClientGraph) -> Iterator[List[Dict]]:
     """
-    Fetch service principals and create a lookup dictionary.
+    Yield service principals page by page.
 
     Args:
         graph_auth_client (AuthClientGraph): The authentication client to use for fetching service principals.
 
+    Yields:
+        List[Dict]: The service principals of each page.
+    """
+    try:
+        for page in iter_graph_pages(graph_auth_client, "servicePrincipals"):
+            yield page
+        logger.info("Fetched data from servicePrincipals")
+    except Exception as e:
+        logger.error(f"Error fetching data from servicePrincipals: {str(e)}")
+        raise
+
+
+def get_service_principals(graph_auth_client: AuthClientGraph, compact_records: bool = False) -> List:
+    """
+    Fetch service principals.
+
+    Args:
+        graph_auth_client (AuthClientGraph): The authentication client to use for fetching service principals.
+        compact_records (bool): Return PrincipalRecord objects instead of dictionaries.
+
     Returns:
-        Dict[str, str]: A dictionary where the keys are application IDs and the values are service principal IDs.
+        List: The service principals.
     """
+    if compact_records:
+        return [
+            PrincipalRecord.from_dict(sp)
+            for page in iter_graph_pages(graph_auth_client, "servicePrincipals")
+            for sp in page
+        ]
     service_principals = []
     service_principals = fetch_data(graph_auth_client, "servicePrincipals")
     return service_principals
 
 
+def graph_collection(endpoint: str):
+    """
+    Build a streaming collector for a Microsoft Graph collection.
+
+    Args:
+        endpoint (str): The collection, e.g. "users".
+
+    Returns:
+        Callable: Generator function yielding the collection page by page.
+    """
+    def iter_collection(graph_auth_client: AuthClientGraph) -> Iterator[List[Dict]]:
+        try:
+            for page in iter_graph_pages(graph_auth_client, endpoint):
+                yield page
+            logger.info(f"Fetched data from {endpoint}")
+        except Exception as e:
+            logger.error(f"Error fetching data from {endpoint}: {str(e)}")
+            raise
+
+    iter_collection.__name__ = f"iter_{endpoint}"
+    return iter_collection
+
+
+for name, (endpoint, output) in GRAPH_COLLECTIONS.items():
+    collector(name, output=output, auth="graph", stream=True, tenant_wide=True)(graph_collection(endpoint))
+
+
+@collector("subscriptions", output="subscriptions.json")
 def fetch_subscriptions(arm_auth_client: AuthClientARM) -> List[Dict]:
     # Fetch subscriptions
     subs = get_subscriptions(arm_auth_client)
     return subs
 
 
-def fetch_role_assignments(
+@collector("resource_groups", requires=("subscriptions",))
+def fetch_resource_groups(
     arm_auth_client: AuthClientARM, subs: List[Dict]
-) -> List[Dict]:
+) -> Dict[str, List[Dict]]:
     """
-    Fetch role assignments from ARM API for subscriptions, resource groups, and management groups.
+    Fetch the resource groups of every subscription once, for the collectors that walk them.
 
     Args:
-        arm_auth_client (AuthClientARM): The authentication client to use for fetching role assignments.
+        arm_auth_client (AuthClientARM): The authentication client to use for fetching resource groups.
         subs (List[Dict]): A list of subscriptions.
 
     Returns:
-        List[Dict]: A list of dictionaries representing role assignments.
+        Dict[str, List[Dict]]: Resource groups keyed by subscription ID.
     """
-    role_assignments = []
+    return {
+        sub.get(ID): get_resource_groups(arm_auth_client, subscription=sub.get(ID))
+        for sub in subs
+    }
 
-    for sub in subs:
-        sub_id = sub.get(ID)
-        sub_role_assignments = get_sub_role_assignment(
-            arm_auth_client, subscription=sub_id
-        )
-        role_assignments.extend(sub_role_assignments)
 
-        rgs = get_resource_groups(arm_auth_client, subscription=sub_id)
+@collector("resources", requires=("subscriptions", "resource_groups"))
+def fetch_resources(
+    arm_auth_client: AuthClientARM, subs: List[Dict], rgs_by_sub: Dict[str, List[Dict]]
+) -> Dict[str, List[Dict]]:
+    """
+    Fetch the resources of every resource group once, for the collectors that walk them.
+
+    The whole estate's resources are held until the crawl ends, so they are kept as
+    compact ResourceRecord objects rather than dictionaries.
+
+    Args:
+        arm_auth_client (AuthClientARM): The authentication client to use for fetching resources.
+        subs (List[Dict]): A list of subscriptions.
+        rgs_by_sub (Dict[str, List[Dict]]): Resource groups keyed by subscription ID.
 
-        for rg in rgs:
+    Returns:
+        Dict[str, List[ResourceRecord]]: Resources keyed by resource group ID.
+    """
+    resources_by_rg = {}
+    for sub in subs:
+        sub_id = sub.get(ID)
+        for rg in rgs_by_sub.get(sub_id, []):
             rg_id = rg.get(ID)
-            rg_role_assignments = get_rg_role_assignment(
-                arm_auth_client, subscription=sub_id, resource_group=rg_id
+            resources_by_rg[rg_id] = compact(
+                get_resources(arm_auth_client, subscription=sub_id, resource_group=rg_id), ResourceRecord
             )
-            role_assignments.extend(rg_role_assignments)
+    return resources_by_rg
 
-    # Fetch management groups
-    mgs = get_management_groups(arm_auth_client)
 
-    for mg in mgs:
-        mg_id = mg.get(ID)
-        mg_role_assignments = get_mg_role_assignment(
-            arm_auth_client, management_group=mg_id
-        )
-        role_assignments.extend(mg_role_assignments)
+@collector(
+    "management_group_tree", requires=("subscriptions",), output="management_group_tree.json", tenant_wide=True
+)
+def fetch_management_group_tree(
+    arm_auth_client: AuthClientARM, subs: List[Dict], refresh: bool = False
+) -> ManagementGroupTree:
+    """
+    Load the management group hierarchy in one expanded call on the tenant root group.
 
-    return role_assignments
+    Args:
+        arm_auth_client (AuthClientARM): The authentication client to use for fetching the hierarchy.
+        subs (List[Dict]): A list of subscriptions; their tenant ID names the root group.
+        refresh (bool): Fetch the hierarchy again even if this process already loaded it.
 
+    Returns:
+        ManagementGroupTree: The hierarchy with subscriptions linked to their parent groups.
+    """
+    tenant_id = next((sub.get("tenantId") for sub in subs if sub.get("tenantId")), None)
+    return load_management_group_tree(arm_auth_client, tenant_id, refresh=refresh)
 
-def fetch_all_resource_role_assignments(
-    arm_auth_client: AuthClientARM, subs: List[Dict]
+
+@collector("management_groups", requires=("management_group_tree",), tenant_wide=True)
+def fetch_management_groups(
+    arm_auth_client: AuthClientARM, tree: Optional[ManagementGroupTree] = None
 ) -> List[Dict]:
     """
-    Fetch role assignments for all resources within the subscriptions.
+    List the management groups, parents before children, from the cached hierarchy.
+
+    Args:
+        arm_auth_client (AuthClientARM): The authentication client, used when the hierarchy is not loaded yet.
+        tree (Optional[ManagementGroupTree]): The hierarchy; loaded when omitted.
+
+    Returns:
+        List[Dict]: Management groups in the shape of the management group list API.
+    """
+    if tree is None:
+        tree = load_management_group_tree(arm_auth_client)
+    return tree.to_list()
+
+
+@collector(
+    "role_assignments",
+    requires=("subscriptions", "resource_groups", "management_groups"),
+    output="role_assignments.json",
+    stream=True,
+)
+def iter_role_assignments(
+    arm_auth_client: AuthClientARM,
+    subs: List[Dict],
+    rgs_by_sub: Optional[Dict[str, List[Dict]]] = None,
+    mgs: Optional[List[Dict]] = None,
+    deduplicator: Optional[Deduplicator] = None,
+) -> Iterator[List[Dict]]:
+    """
+    Yield role assignments for subscriptions, resource groups, and management groups, one scope at a time.
+
+    A listing includes the assignments inherited from the scopes above, so the
+    same assignment is listed at many scopes; each one is yielded only once.
+
+    Args:
+        arm_auth_client (AuthClientARM): The authentication client to use for fetching role assignments.
+        subs (List[Dict]): A list of subscriptions.
+        rgs_by_sub (Optional[Dict[str, List[Dict]]]): Resource groups keyed by subscription ID; fetched when omitted.
+        mgs (Optional[List[Dict]]): Management groups, parents first; taken from the hierarchy when omitted.
+        deduplicator (Optional[Deduplicator]): Drops assignments already yielded and can record the scopes
+            each assignment was listed at; an in-memory one is used when omitted.
+
+    Yields:
+        List[Dict]: The role assignments first listed at each scope.
+    """
+    if rgs_by_sub is None:
+        rgs_by_sub = fetch_resource_groups(arm_auth_client, subs)
+    own_deduplicator = deduplicator is None
+    if own_deduplicator:
+        deduplicator = Deduplicator()
+
+    try:
+        for sub in subs:
+            sub_id = sub.get(ID)
+            yield deduplicator.filter(get_sub_role_assignment(arm_auth_client, subscription=sub_id), sub_id)
+
+            for rg in rgs_by_sub.get(sub_id, []):
+                rg_id = rg.get(ID)
+                yield deduplicator.filter(
+                    get_rg_role_assignment(arm_auth_client, subscription=sub_id, resource_group=rg_id), rg_id
+                )
+
+        # Fetch management groups
+        if mgs is None:
+            mgs = fetch_management_groups(arm_auth_client)
+
+        for mg in mgs:
+            mg_id = mg.get(ID)
+            yield deduplicator.filter(get_mg_role_assignment(arm_auth_client, management_group=mg_id), mg_id)
+        logger.info(f"Role assignment de-duplication: {deduplicator.stats()}")
+    finally:
+        if own_deduplicator:
+            deduplicator.seen.close()
+
+
+def fetch_role_assignments(
+    arm_auth_client: AuthClientARM,
+    subs: List[Dict],
+    rgs_by_sub: Optional[Dict[str, List[Dict]]] = None,
+    mgs: Optional[List[Dict]] = None,
+    compact_records: bool = False,
+) -> List:
+    """
+    Fetch the distinct role assignments from ARM API for subscriptions, resource groups, and management groups.
 
     Args:
         arm_auth_client (AuthClientARM): The authentication client to use for fetching role assignments.
         subs (List[Dict]): A list of subscriptions.
+        rgs_by_sub (Optional[Dict[str, List[Dict]]]): Resource groups keyed by subscription ID; fetched when omitted.
+        mgs (Optional[List[Dict]]): Management groups, parents first; taken from the hierarchy when omitted.
+        compact_records (bool): Return RoleAssignmentRecord objects instead of dictionaries.
 
     Returns:
-        List[Dict]: A list of dictionaries representing role assignments for all resources.
+        List: The role assignments.
     """
-    all_resource_role_assignments = []
+    assignments = []
+    for batch in iter_role_assignments(arm_auth_client, subs, rgs_by_sub, mgs):
+        assignments.extend(compact(batch, RoleAssignmentRecord) if compact_records else batch)
+    return assignments
+
 
+@collector(
+    "resource_role_assignments",
+    requires=("subscriptions", "resource_groups", "resources"),
+    output="all_resource_role_assignments.json",
+    stream=True,
+)
+def iter_resource_role_assignments(
+    arm_auth_client: AuthClientARM,
+    subs: List[Dict],
+    rgs_by_sub: Optional[Dict[str, List[Dict]]] = None,
+    resources_by_rg: Optional[Dict[str, List[Dict]]] = None,
+) -> Iterator[List[Dict]]:
+    """
+    Yield role assignments made on the resources within the subscriptions, one resource at a time.
+
+    Args:
+        arm_auth_client (AuthClientARM): The authentication client to use for fetching role assignments.
+        subs (List[Dict]): A list of subscriptions.
+        rgs_by_sub (Optional[Dict[str, List[Dict]]]): Resource groups keyed by subscription ID; fetched when omitted.
+        resources_by_rg (Optional[Dict[str, List[Dict]]]): Resources keyed by resource group ID; fetched when omitted.
+
+    Yields:
+        List[Dict]: The role assignments of each resource, in resource order.
+    """
+    if rgs_by_sub is None:
+        rgs_by_sub = fetch_resource_groups(arm_auth_client, subs)
+    if resources_by_rg is None:
+        resources_by_rg = fetch_resources(arm_auth_client, subs, rgs_by_sub)
+
+    # One request per distinct resource scope; child and extension types that
+    # cannot carry their own assignments are skipped
+    scopes = {}
     for sub in subs:
         sub_id = sub.get(ID)
-        rgs = get_resource_groups(arm_auth_client, subscription=sub_id)
 
-        for rg in rgs:
+        for rg in rgs_by_sub.get(sub_id, []):
             rg_id = rg.get(ID)
-            resources = get_resources(arm_auth_client, subscription=sub_id, resource_group=rg_id)
 
-            for resource in resources:
+            for resource in resources_by_rg.get(rg_id, []):
                 resource_id = resource.get(ID)
-                resource_role_assignments = get_resource_role_assignment(
-                    arm_auth_client, subscription=sub_id, resource_group=rg_id, resource=resource_id
-                )
-                all_resource_role_assignments.extend(resource_role_assignments)
+                if not resource_id or resource.get("type", "").lower() in NON_ASSIGNABLE_RESOURCE_TYPES:
+                    continue
+                scopes.setdefault(resource_id.lower(), (sub_id, rg_id, resource_id))
 
-    return all_resource_role_assignments
+    def fetch_scope(scope):
+        sub_id, rg_id, resource_id = scope
+        return get_resource_role_assignment(
+            arm_auth_client, subscription=sub_id, resource_group=rg_id, resource=resource_id
+        )
 
+    # Keep a bounded window of requests in flight so a slow consumer slows the
+    # requests down instead of piling up finished results
+    with ThreadPoolExecutor(max_workers=RESOURCE_SCOPE_WORKERS) as pool:
+        in_flight = deque()
+        for scope in scopes.values():
+            in_flight.append(pool.submit(fetch_scope, scope))
+            if len(in_flight) >= 2 * RESOURCE_SCOPE_WORKERS:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
 
-def fetch_classic_admins(
-    arm_auth_client: AuthClientARM, subs: List[Dict]
+
+def fetch_all_resource_role_assignments(
+    arm_auth_client: AuthClientARM,
+    subs: List[Dict],
+    rgs_by_sub: Optional[Dict[str, List[Dict]]] = None,
+    resources_by_rg: Optional[Dict[str, List[Dict]]] = None,
 ) -> List[Dict]:
-    classic_admins = []
+    """
+    Fetch role assignments for all resources within the subscriptions.
 
+    Args:
+        arm_auth_client (AuthClientARM): The authentication client to use for fetching role assignments.
+        subs (List[Dict]): A list of subscriptions.
+        rgs_by_sub (Optional[Dict[str, List[Dict]]]): Resource groups keyed by subscription ID; fetched when omitted.
+        resources_by_rg (Optional[Dict[str, List[Dict]]]): Resources keyed by resource group ID; fetched when omitted.
+
+    Returns:
+        List[Dict]: A list of dictionaries representing role assignments for all resources.
+    """
+    return [
+        assignment
+        for batch in iter_resource_role_assignments(arm_auth_client, subs, rgs_by_sub, resources_by_rg)
+        for assignment in batch
+    ]
+
+
+@collector("classic_admins", requires=("subscriptions",), output="classic_admins.json", stream=True)
+def iter_classic_admins(
+    arm_auth_client: AuthClientARM, subs: List[Dict]
+) -> Iterator[List[Dict]]:
     for sub in subs:
         sub_id = sub.get(ID)
         sub_classic_admins = get_classic_admins(arm_auth_client, subscription=sub_id)
         logger.info(
             f"Classic Administrators for subscription {sub_id}: {sub_classic_admins}"
         )
-        classic_admins.extend(sub_classic_admins)
+        yield sub_classic_admins
+
+
+def fetch_classic_admins(
+    arm_auth_client: AuthClientARM, subs: List[Dict]
+) -> List[Dict]:
+    return [admin for batch in iter_classic_admins(arm_auth_client, subs) for admin in batch]
+
+
+@collector("logic_apps", requires=("subscriptions", "resource_groups"), output="logic_apps.json", stream=True)
+def iter_logic_apps(
+    arm_auth_client: AuthClientARM,
+    subs: List[Dict],
+    rgs_by_sub: Optional[Dict[str, List[Dict]]] = None,
+    definition_store: Optional[ContentStore] = None,
+    batch_size: int = 100,
+) -> Iterator[List[Dict]]:
+    """
+    Yield Logic Apps in batches, with one paged listing per subscription.
 
-    return classic_admins
+    Args:
+        arm_auth_client (AuthClientARM): The authentication client to use for fetching Logic Apps.
+        subs (List[Dict]): A list of subscriptions.
+        rgs_by_sub (Optional[Dict[str, List[Dict]]]): Resource groups keyed by subscription ID; when given,
+            only Logic Apps in these resource groups are kept.
+        definition_store (Optional[ContentStore]): When given, each workflow definition is written to the
+            store and replaced in the record by its `definitionHash`.
+        batch_size (int): Logic Apps per yielded batch.
 
-def fetch_logic_apps(arm_auth_client: AuthClientARM, subs: List[Dict]) -> List[Dict]:
-    logic_apps = []
+    Yields:
+        List[Dict]: Logic App configurations.
+    """
+    batch = []
     for sub in subs:
         sub_id = sub.get(ID)
-        rgs = get_resource_groups(arm_auth_client, subscription=sub_id)
-        for rg in rgs:
-            rg_id = rg.get(ID)
-            logic_apps_config = get_logic_apps_configuration(arm_auth_client, subscription=sub_id, resource_group=rg_id)
-            for logic_app in logic_apps_config:
-                logic_app["subscriptionId"] = sub_id  # Add subscriptionId to each Logic App
-            logic_apps.extend(logic_apps_config)
-    return logic_apps
+        rg_ids = None
+        if rgs_by_sub is not None:
+            rg_ids = {rg.get(ID).lower() for rg in rgs_by_sub.get(sub_id, [])}
+        for logic_app in iter_subscription_logic_apps(arm_auth_client, subscription=sub_id):
+            if rg_ids is not None and "/".join(logic_app.get(ID, "").split("/")[:5]).lower() not in rg_ids:
+                continue
+            logic_app["subscriptionId"] = sub_id  # Add subscriptionId to each Logic App
+            properties = logic_app.get(PROPERTIES) or {}
+            if definition_store is not None and "definition" in properties:
+                properties["definitionHash"] = definition_store.put(properties.pop("definition"))
+            batch.append(logic_app)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
 
-def main():
+def fetch_logic_apps(
+    arm_auth_client: AuthClientARM,
+    subs: List[Dict],
+    rgs_by_sub: Optional[Dict[str, List[Dict]]] = None,
+    definition_store: Optional[ContentStore] = None,
+) -> List[Dict]:
     """
-    Main function to orchestrate the fetching and processing of data.
+    Fetch Logic Apps with one paged listing per subscription.
+
+    Args:
+        arm_auth_client (AuthClientARM): The authentication client to use for fetching Logic Apps.
+        subs (List[Dict]): A list of subscriptions.
+        rgs_by_sub (Optional[Dict[str, List[Dict]]]): Resource groups keyed by subscription ID; when given,
+            only Logic Apps in these resource groups are kept.
+        definition_store (Optional[ContentStore]): When given, each workflow definition is written to the
+            store and replaced in the record by its `definitionHash`.
+
+    Returns:
+        List[Dict]: A list of Logic App configurations.
     """
-    try:
-        graph_auth_client = AuthClientGraph(
-            config.CLIENT_ID, config.CLIENT_SECRET, config.TENANT_ID
+    return [
+        logic_app
+        for batch in iter_logic_apps(arm_auth_client, subs, rgs_by_sub, definition_store)
+        for logic_app in batch
+    ]
+
+
+def echo_batch(collector_name: str, batch) -> None:
+    """
+    Print a batch of collected records; called on the pipeline's enricher thread.
+
+    Args:
+        collector_name (str): Name of the collector that produced the batch.
+        batch: The records (or document) collected.
+    """
+    pprint(batch)
+
+
+def export_telemetry(output_dir: str = "output") -> None:
+    """
+    Write the request telemetry of this run as JSON and as a Prometheus textfile.
+
+    Args:
+        output_dir (str): Directory receiving telemetry.json and telemetry.prom.
+    """
+    report = telemetry.report()
+    for family, stats in report["families"].items():
+        throughput = f", {stats['items']} records at {stats['items_per_second']}/s" if "items" in stats else ""
+        logger.info(
+            f"{family}: {stats['requests']} requests, p95 {stats['latency_seconds']['p95']}s, "
+            f"{stats['throttled']} throttled, {stats['errors']} errors{throughput}"
         )
-        arm_auth_client = AuthClientARM(
-            config.CLIENT_ID, config.CLIENT_SECRET, config.TENANT_ID
+    telemetry.export(
+        json_path=f"{output_dir}/telemetry.json",
+        prometheus_path=f"{output_dir}/telemetry.prom",
+    )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """
+    Parse command line arguments.
+
+    Args:
+        argv (Optional[List[str]]): Arguments to parse; defaults to sys.argv.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Collect Azure role assignments, principals and Logic Apps.")
+    parser.add_argument(
+        "--profile",
+        metavar="DIR",
+        help="Profile each phase with cProfile and tracemalloc and write .pstats files and a summary to DIR",
+    )
+    parser.add_argument(
+        "--collectors",
+        type=lambda value: [name.strip() for name in value.split(",") if name.strip()],
+        help=f"Comma-separated collectors to run (default: all of {', '.join(registry.outputs())}); "
+             "their inputs are collected automatically",
+    )
+    parser.add_argument(
+        "--list-collectors", action="store_true", help="List the registered collectors and their inputs, then exit"
+    )
+    scope = parser.add_argument_group(
+        "scope filters",
+        "Glob patterns matched case-insensitively against the id, name or display name; KEY=VALUE matches tags. "
+        "Repeat an option to allow several patterns. Scopes that do not match are dropped before anything "
+        "below them is requested.",
+    )
+    scope.add_argument("--subscription", action="append", metavar="PATTERN", help="Only crawl matching subscriptions")
+    scope.add_argument(
+        "--management-group", action="append", metavar="PATTERN", help="Only crawl matching management groups"
+    )
+    scope.add_argument(
+        "--resource-group", action="append", metavar="PATTERN", help="Only crawl matching resource groups"
+    )
+    parser.add_argument(
+        "--logic-app-definitions",
+        metavar="DIR",
+        help="Write each distinct Logic App workflow definition once to DIR (content-addressed by SHA-256) "
+             "and keep only its definitionHash in logic_apps.json",
+    )
+    parser.add_argument(
+        "--spill-dir",
+        metavar="DIR",
+        help="Where role assignment de-duplication and snapshot diffs spill data that outgrows memory "
+             "(default: the system temporary directory)",
+    )
+    parser.add_argument(
+        "--pipeline-memory-mb",
+        type=float,
+        default=PIPELINE_MAX_BYTES / 2**20,
+        help="Ceiling for collected data waiting to be enriched and written, in MB of JSON; collectors "
+             f"pause while it is reached (default: {PIPELINE_MAX_BYTES // 2**20})",
+    )
+    parser.add_argument(
+        "--output-format",
+        choices=("json", "jsonl"),
+        default="json",
+        help="Write each output as a JSON array (NAME.json) or as JSON lines (NAME.jsonl) with an offset "
+        f"index by {', '.join(INDEX_FIELDS)} in NAME.jsonl{INDEX_SUFFIX} (default: json)",
+    )
+    parser.add_argument("--quiet", action="store_true", help="Do not print the collected records")
+    parser.add_argument(
+        "--output-dir",
+        help="Directory receiving the output files (default: output, or output/shard-I-of-N with --shard)",
+    )
+    sharding = parser.add_argument_group(
+        "sharding",
+        "Split a crawl across N workers: each runs with its own --shard and writes its outputs and a "
+        "manifest; --merge-shards then combines them. Subscriptions are partitioned by hash unless "
+        "listed in --shard-map; management group and Graph collectors run on shard 0 only.",
+    )
+    sharding.add_argument("--shard", metavar="I/N", help="Crawl shard I (from 0) of N")
+    sharding.add_argument(
+        "--shard-map", metavar="FILE", help="JSON object assigning subscription IDs to shard indexes"
+    )
+    sharding.add_argument(
+        "--merge-shards",
+        nargs="+",
+        metavar="DIR",
+        help="Merge the output directories of every shard into --output-dir, then exit",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Collectors run concurrently once their inputs are ready (default: 4; 1 when profiling)",
+    )
+    parser.add_argument(
+        "--graph-workers",
+        type=int,
+        default=len(GRAPH_COLLECTIONS) + 1,
+        help="Graph collectors run concurrently, on their own workers next to the ARM crawl "
+        f"(default: {len(GRAPH_COLLECTIONS) + 1}; when profiling, all collectors share one worker)",
+    )
+    parser.add_argument(
+        "--cache-mode",
+        choices=MODES,
+        default="off",
+        help="HTTP response cache: record (serve fresh, store misses), replay (offline, cache only), "
+             "refresh (always fetch and overwrite) or off (default)",
+    )
+    parser.add_argument("--cache-dir", default=".http_cache", help="Response cache directory (default: .http_cache)")
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=DEFAULT_TTL,
+        help=f"Seconds a cached response stays fresh in record mode (default: {DEFAULT_TTL})",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=DEFAULT_MAX_BYTES / 2**20,
+        help=f"Size bound of the response cache in MB (default: {DEFAULT_MAX_BYTES // 2**20})",
+    )
+    diff = parser.add_argument_group("snapshot diff")
+    diff.add_argument(
+        "--diff-snapshots",
+        nargs=2,
+        metavar=("OLD_DIR", "NEW_DIR"),
+        help="Report the records added, removed or changed between two output directories, then exit",
+    )
+    diff.add_argument(
+        "--diff-report",
+        metavar="FILE",
+        help="Where to write the change report (default: snapshot_diff.json in --output-dir)",
+    )
+    diff.add_argument(
+        "--diff-files",
+        type=lambda value: [name.strip() for name in value.split(",") if name.strip()],
+        default=list(SNAPSHOT_FILES),
+        help=f"Comma-separated output files to compare (default: {','.join(SNAPSHOT_FILES)})",
+    )
+    enrichment = parser.add_argument_group("parallel enrichment")
+    enrichment.add_argument(
+        "--enrich",
+        nargs="+",
+        metavar="FILE",
+        help="Add role names, principal names and parsed scopes to role assignment files "
+        "(JSON array or JSON lines) on a process pool, then exit; writes NAME_enriched next to each file",
+    )
+    enrichment.add_argument(
+        "--enrich-workers",
+        type=int,
+        default=None,
+        help="Worker processes for --enrich (default: one per CPU)",
+    )
+    enrichment.add_argument(
+        "--enrich-chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help=f"Records per worker task for --enrich (default: {DEFAULT_CHUNK_SIZE})",
+    )
+    enrichment.add_argument(
+        "--principal-files",
+        nargs="+",
+        metavar="FILE",
+        help="Graph outputs whose display names become principalName "
+        f"(default: {', '.join(PRINCIPAL_FILES)} next to each enriched file)",
+    )
+    risk = parser.add_argument_group("risk summary")
+    risk.add_argument(
+        "--risk-summary",
+        action="store_true",
+        help="Summarize the role assignments, classic admins and service principals in --output-dir "
+        f"(assignments per role per subscription, Owner and User Access Administrator holders at management "
+        f"group or subscription scope, stale classic admins) into {RISK_SUMMARY}, then exit",
+    )
+    groups = parser.add_argument_group("group expansion")
+    groups.add_argument(
+        "--expand-groups",
+        action="store_true",
+        help=f"After the crawl, list the transitive members of every group holding a role assignment "
+        f"into {GROUP_MEMBERS}",
+    )
+    groups.add_argument(
+        "--group-cache",
+        metavar="FILE",
+        help="JSON file keeping group expansions for later runs (default: none)",
+    )
+    groups.add_argument(
+        "--group-cache-ttl",
+        type=float,
+        default=GROUP_CACHE_TTL,
+        help=f"Seconds a cached group expansion is reused (default: {GROUP_CACHE_TTL})",
+    )
+    lookup = parser.add_argument_group("indexed lookup")
+    lookup.add_argument(
+        "--lookup",
+        nargs=3,
+        metavar=("FILE", "FIELD", "VALUE"),
+        help=f"Print the records of a JSON lines output whose FIELD ({', '.join(INDEX_FIELDS)}) is VALUE, "
+        "read through its offset index, then exit",
+    )
+    lookup.add_argument(
+        "--build-index",
+        nargs="+",
+        metavar="FILE",
+        help="Write the offset index of existing JSON lines files, then exit",
+    )
+    daemon = parser.add_argument_group("daemon mode")
+    daemon.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Keep running: crawl every --interval seconds and answer queries on --listen from the last inventory",
+    )
+    daemon.add_argument(
+        "--interval",
+        type=float,
+        default=DAEMON_INTERVAL,
+        help=f"Seconds from the start of one crawl to the start of the next (default: {DAEMON_INTERVAL})",
+    )
+    daemon.add_argument(
+        "--listen",
+        default=DAEMON_LISTEN,
+        metavar="HOST:PORT",
+        help=f"Address of the query API; keep it on a loopback address (default: {DAEMON_LISTEN})",
+    )
+    daemon.add_argument(
+        "--full-refresh-every",
+        type=int,
+        default=DAEMON_FULL_REFRESH_EVERY,
+        metavar="N",
+        help="Run every collector on every N-th crawl; the crawls in between only run --refresh-collectors "
+        f"(default: {DAEMON_FULL_REFRESH_EVERY})",
+    )
+    daemon.add_argument(
+        "--refresh-collectors",
+        type=lambda value: [name.strip() for name in value.split(",") if name.strip()],
+        default=list(DAEMON_REFRESH_COLLECTORS),
+        help=f"Comma-separated collectors run by the crawls between full ones "
+        f"(default: {','.join(DAEMON_REFRESH_COLLECTORS)})",
+    )
+    daemon.add_argument(
+        "--endpoints-dir",
+        metavar="DIR",
+        help="Output directory of azure_endpoint_mapper.py whose endpoints the query API serves",
+    )
+    tenants = parser.add_argument_group(
+        "multi-tenant runs",
+        "Crawl several tenants concurrently, each in its own worker process with its own credentials, "
+        "into --output-dir/tenants/NAME, with a combined index in --output-dir/tenants/index.json.",
+    )
+    tenants.add_argument(
+        "--tenants",
+        metavar="FILE",
+        help="JSON array of tenants: tenant_id, client_id, client_secret or client_secret_env (the variable "
+        "holding the secret) and an optional name; replaces the credentials in config.py",
+    )
+    tenants.add_argument(
+        "--tenant-workers",
+        type=int,
+        metavar="N",
+        default=TENANT_WORKERS,
+        help=f"Tenants crawled concurrently (default: {TENANT_WORKERS})",
+    )
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.collectors or [] if name not in registry.collectors]
+    if unknown:
+        parser.error(f"unknown collector(s) {', '.join(unknown)}; choose from {', '.join(registry.collectors)}")
+    args.shard_plan = None
+    if args.shard:
+        try:
+            args.shard_plan = ShardPlan.parse(args.shard, args.shard_map)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+    elif args.shard_map:
+        parser.error("--shard-map requires --shard")
+    if args.lookup and args.lookup[1] not in INDEX_FIELDS:
+        parser.error(f"--lookup FIELD must be one of {', '.join(INDEX_FIELDS)}")
+    if args.daemon and args.shard_plan:
+        parser.error("--daemon cannot be combined with --shard")
+    args.tenant_list = None
+    if args.tenants:
+        if args.daemon or args.shard_plan:
+            parser.error("--tenants cannot be combined with --daemon or --shard")
+        try:
+            args.tenant_list = load_tenants(args.tenants)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+    if args.tenant_workers < 1:
+        parser.error("--tenant-workers must be at least 1")
+    unknown = [name for name in args.refresh_collectors if name not in registry.collectors]
+    if unknown:
+        parser.error(f"unknown refresh collector(s) {', '.join(unknown)}")
+    if args.output_dir is None:
+        args.output_dir = os.path.join("output", args.shard_plan.name) if args.shard_plan else "output"
+    return args
+
+
+def scope_filters(args: argparse.Namespace) -> Dict:
+    """
+    Build the scheduler filters for the subscription, management group and resource group patterns.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+
+    Returns:
+        Dict: Filter function per collector name, for CollectorRegistry.run.
+    """
+    filters = {}
+    subscriptions = ScopeFilter(args.subscription)
+    management_groups = ScopeFilter(args.management_group)
+    resource_groups = ScopeFilter(args.resource_group)
+    if subscriptions:
+        filters["subscriptions"] = subscriptions.select
+    if management_groups:
+        filters["management_groups"] = management_groups.select
+    if resource_groups:
+        filters["resource_groups"] = lambda rgs_by_sub: {
+            sub_id: resource_groups.select(rgs) for sub_id, rgs in rgs_by_sub.items()
+        }
+    plan = args.shard_plan
+    if plan:
+        filters["subscriptions"] = (
+            (lambda subs: plan.select(subscriptions.select(subs))) if subscriptions else plan.select
         )
+    return filters
 
-        logger.info("Fetching subscriptions...")
-        subs = fetch_subscriptions(arm_auth_client)
-        pprint(subs)
-        with open("output/subscriptions.json", "w") as f:
-            json.dump(subs, f)
-
-        logger.info("Fetching role assignments...")
-        role_assignments = fetch_role_assignments(arm_auth_client, subs)
-        pprint(role_assignments)
-        with open("output/role_assignments.json", "w") as f:
-            json.dump(role_assignments, f)
-
-        logger.info("Fetching all resource role assignments...")
-        all_resource_role_assignments = fetch_all_resource_role_assignments(arm_auth_client, subs)
-        pprint(all_resource_role_assignments)
-        with open("output/all_resource_role_assignments.json", "w") as f:
-            json.dump(all_resource_role_assignments, f)
-
-        logger.info("Fetching classic administrators...")
-        classic_admins = fetch_classic_admins(arm_auth_client, subs)
-        pprint(classic_admins)
-        with open("output/classic_admins.json", "w") as f:
-            json.dump(classic_admins, f)
-
-        logger.info("Fetching service principals...")
-        service_principals = get_service_principals(graph_auth_client)
-        pprint(service_principals)
-        with open("output/service_principals.json", "w") as f:
-            json.dump(service_principals, f)
-
-
-        logger.info("Fetching Logic Apps configuration...")
-        logic_apps = fetch_logic_apps(arm_auth_client, subs)
-        pprint(logic_apps)
-        with open("output/logic_apps.json", "w") as f:
-            json.dump(logic_apps, f)
 
-    except Exception as e:
-        logger.error(f"An unexpected error occurred: {str(e)}")
+def shard_stand_ins(args: argparse.Namespace) -> Dict:
+    """
+    Empty results for the tenant-wide collectors that another shard runs.
 
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
 
+    Returns:
+        Dict: Results per collector name, for CollectorRegistry.run.
+    """
+    if not args.shard_plan or args.shard_plan.owns_tenant:
+        return {}
+    return {name: [] for name, c in registry.collectors.items() if c.tenant_wide}
+
+
+def output_file(args: argparse.Namespace, name: str) -> str:
+    """
+    Returns:
+        str: File name of an output in the selected --output-format.
+    """
+    return json_lines_name(name) if args.output_format == "jsonl" else name
+
+
+def expand_groups(graph_auth_client, args: argparse.Namespace) -> Dict:
+    """
+    Write the transitive members of the groups that hold role assignments to GROUP_MEMBERS.
+
+    Args:
+        graph_auth_client: The Graph authentication client.
+        args (argparse.Namespace): Parsed command line arguments.
+
+    Returns:
+        Dict: Layout of the written file, keyed by its name, as in OutputPipeline.outputs.
+    """
+    group_ids = group_principal_ids(
+        resolve_output(args.output_dir, name)
+        for name in ("role_assignments.json", "all_resource_role_assignments.json")
+    )
+    expander = GroupExpander(graph_auth_client, cache_path=args.group_cache, ttl=args.group_cache_ttl)
+    members = expander.expand(group_ids)
+    name = output_file(args, GROUP_MEMBERS)
+    writer = open_writer(os.path.join(args.output_dir, name), index_fields=INDEX_FIELDS)
+    writer.write({"id": group_id, "members": group_members} for group_id, group_members in members.items())
+    count = writer.close()
+    expander.save()
+    logger.info(f"Group expansion: {expander.stats()}")
+    return {name: {"records": count, "indent": None}}
+
+
+def collector_options(args: argparse.Namespace) -> Dict:
+    """
+    Build the per-collector keyword arguments selected on the command line.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+
+    Returns:
+        Dict: Keyword arguments per collector name, for CollectorRegistry.run.
+    """
+    options = {}
+    if args.logic_app_definitions:
+        options["logic_apps"] = {"definition_store": ContentStore(args.logic_app_definitions)}
+    return options
+
+
+def crawl(
+    args: argparse.Namespace,
+    auth_clients: Dict,
+    profiler: PhaseProfiler,
+    names: Optional[List[str]] = None,
+    warm: Optional[Dict] = None,
+    refresh: bool = False,
+) -> Tuple[Dict, Dict]:
+    """
+    Run the collectors through the output pipeline into args.output_dir.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+        auth_clients (Dict): Authentication client per `auth` kind.
+        profiler (PhaseProfiler): Profiler wrapping each collector.
+        names (Optional[List[str]]): Collectors to run; those selected on the command line by default.
+        warm (Optional[Dict]): Results of earlier runs reused instead of fetching them again.
+        refresh (bool): Reload data this process keeps between runs, such as the management group tree.
+
+    Returns:
+        Tuple[Dict, Dict]: The collector results, and the layout of each written file as in OutputPipeline.outputs.
+    """
+    # Collectors fetch, the pipeline enriches and writes concurrently; role
+    # names are resolved on the way into role_assignments_processed.json
     translator = RoleTranslator()
-    input_file = 'output/role_assignments.json'
-    output_file = 'output/role_assignments_processed.json'
+    translation = profiler.accumulator("role translation")
+    pipeline = OutputPipeline(
+        output_dir=args.output_dir,
+        max_bytes=int(args.pipeline_memory_mb * 2**20),
+        enrichers={
+            "role_assignments": [
+                ("role_assignments_processed.json", translator.translate_assignment, 2)
+            ],
+            "resource_role_assignments": [
+                ("all_resource_role_assignments_processed.json", translator.translate_assignment, 2)
+            ],
+        },
+        echo=None if args.quiet else echo_batch,
+        enrich_phase=translation,
+        json_lines=args.output_format == "jsonl",
+    )
+    names = names or args.collectors or registry.outputs()
+    preset = {**shard_stand_ins(args), **(warm or {})}
+    options = collector_options(args)
+    if refresh:
+        options["management_group_tree"] = {"refresh": True}
+    scope_writer = None
+    if "role_assignments" in registry.resolve(names) and "role_assignments" not in preset:
+        # Every assignment is written once; the scopes it was listed at go to a side file
+        scope_writer = open_writer(os.path.join(args.output_dir, output_file(args, ROLE_ASSIGNMENT_SCOPES)))
+        options["role_assignments"] = {
+            "deduplicator": Deduplicator(SpillingKeySet(spill_dir=args.spill_dir), sightings=scope_writer),
+        }
+    with pipeline:
+        # Profiled phases share tracemalloc and the process CPU clock, so run
+        # collectors one at a time when profiling to keep the figures per phase.
+        results = registry.run(
+            names,
+            auth_clients,
+            max_workers=1 if args.profile else args.workers,
+            worker_limits=None if args.profile else {"graph": args.graph_workers},
+            on_result=pipeline.submit,
+            phase=profiler.phase,
+            filters=scope_filters(args),
+            options=options,
+            results=preset,
+        )
+    translation.close()
+    logger.info(f"Output pipeline: {pipeline.stats()}")
+    outputs = dict(pipeline.outputs)
+    if scope_writer is not None:
+        options["role_assignments"]["deduplicator"].seen.close()
+        if "role_assignments" in results:
+            outputs[output_file(args, ROLE_ASSIGNMENT_SCOPES)] = {"records": scope_writer.close(), "indent": None}
+        else:
+            scope_writer.abort()
+
+    if args.expand_groups:
+        outputs.update(expand_groups(auth_clients["graph"], args))
+    return results, outputs
+
+
+def run_daemon(args: argparse.Namespace, auth_clients: Dict, profiler: PhaseProfiler) -> None:
+    """
+    Crawl on a schedule and answer queries from the last inventory over a local HTTP API.
+
+    The process stays up, so tokens, pooled connections and the management group
+    tree stay warm between crawls. Every --full-refresh-every-th crawl runs all
+    collectors; the crawls in between only run --refresh-collectors and reuse the
+    subscriptions, resource groups, resources and management groups of the last
+    full crawl instead of listing them again. After each crawl the outputs are
+    loaded into a new InventoryIndex that replaces the served one.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+        auth_clients (Dict): Authentication client per `auth` kind.
+        profiler (PhaseProfiler): Profiler wrapping each collector.
+    """
+    host, _, port = args.listen.rpartition(":")
+    server = InventoryServer((host or "127.0.0.1", int(port)), InventoryIndex.load(args.output_dir, args.endpoints_dir))
+    server.start()
+    warm = {}
+    cycle = 0
     try:
-        translator.process_role_assignments(
-            input_file, 
-            output_file
+        while True:
+            start = time.time()
+            full = not warm or cycle % args.full_refresh_every == 0
+            try:
+                results, _ = crawl(
+                    args,
+                    auth_clients,
+                    profiler,
+                    names=None if full else args.refresh_collectors,
+                    warm=None if full else warm,
+                    refresh=full and cycle > 0,
+                )
+                if full:
+                    warm = {name: result for name, result in results.items() if not registry.collectors[name].stream}
+                server.index = InventoryIndex.load(args.output_dir, args.endpoints_dir)
+                export_telemetry(args.output_dir)
+            except Exception as e:
+                logger.error(f"Refresh {cycle} failed, still serving the previous inventory: {str(e)}")
+            finished = time.time()
+            server.status = {
+                "cycle": cycle,
+                "full": full,
+                "crawl_started": start,
+                "crawl_seconds": round(finished - start, 3),
+                "next_crawl": start + args.interval,
+            }
+            logger.info(f"Refresh {cycle} ({'full' if full else 'incremental'}) took {finished - start:.1f}s: "
+                        f"{server.index.stats()}")
+            cycle += 1
+            time.sleep(max(0.0, start + args.interval - time.time()))
+    except KeyboardInterrupt:
+        logger.info("Stopping the daemon")
+    finally:
+        server.stop()
+
+
+def run(args: argparse.Namespace, client_id: str, client_secret: str, tenant_id: str) -> Dict:
+    """
+    Crawl one tenant (or run the daemon on it) into args.output_dir.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+        client_id (str): Client ID of the application registration.
+        client_secret (str): Its client secret.
+        tenant_id (str): The tenant to crawl.
+
+    Returns:
+        Dict: The subscriptions crawled, the layout of each written file, the collectors that failed or
+        were skipped, and the error that stopped the crawl, if any.
+    """
+    started = time.time()
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    profiler = PhaseProfiler(output_dir=args.profile, enabled=bool(args.profile))
+
+    cache = None
+    if args.cache_mode != "off":
+        cache = ResponseCache(
+            args.cache_dir,
+            mode=args.cache_mode,
+            ttl=args.cache_ttl,
+            max_bytes=int(args.cache_max_mb * 2**20),
         )
-        
+        http_session.configure_cache(cache)
+
+    results, outputs, error = {}, {}, None
+    try:
+        if args.cache_mode == "replay":
+            graph_auth_client = arm_auth_client = OfflineAuthClient()
+        else:
+            graph_auth_client = AuthClientGraph(client_id, client_secret, tenant_id)
+            arm_auth_client = AuthClientARM(client_id, client_secret, tenant_id)
+
+        auth_clients = {"arm": arm_auth_client, "graph": graph_auth_client}
+        if args.daemon:
+            run_daemon(args, auth_clients, profiler)
+        else:
+            results, outputs = crawl(args, auth_clients, profiler)
+
+        if args.shard_plan:
+            stand_ins = shard_stand_ins(args)
+            ran = [name for name in registry.resolve(args.collectors or registry.outputs()) if name not in stand_ins]
+            manifest = args.shard_plan.write_manifest(
+                args.output_dir,
+                results.get("subscriptions", []),
+                ran,
+                [name for name in ran if name not in results],
+                outputs,
+                started,
+            )
+            logger.info(f"Shard {args.shard_plan.name} complete: {manifest}")
+
     except Exception as e:
-        print(f"Error processing roles: {str(e)}")
+        logger.error(f"An unexpected error occurred: {str(e)}")
+        error = str(e)
+
+    export_telemetry(args.output_dir)
+
+    if cache is not None:
+        logger.info(f"Response cache: {cache.stats()}")
+        cache.close()
+
+    if args.profile:
+        logger.info(f"Phase profile (details in {args.profile}):\n{profiler.write_summary()}")
+
+    return {
+        "subscriptions": [subscription_key(sub) for sub in results.get("subscriptions", [])],
+        "outputs": outputs,
+        "failed": [name for name in registry.resolve(args.collectors or registry.outputs()) if name not in results],
+        "error": error,
+    }
+
+
+def tenant_args(args: argparse.Namespace, tenant: Dict) -> argparse.Namespace:
+    """
+    Point the arguments of a multi-tenant run at one tenant.
+
+    The tenant writes to its own tree under --output-dir, and the state that
+    belongs to one tenant (response cache, group cache, profile) moves to a
+    directory named after it.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+        tenant (Dict): The tenant, as returned by load_tenants.
+
+    Returns:
+        argparse.Namespace: A copy of the arguments for that tenant.
+    """
+    name = tenant["name"]
+    args = argparse.Namespace(**vars(args))
+    args.tenants = args.tenant_list = None
+    args.output_dir = tenant_dir(args.output_dir, name)
+    args.cache_dir = os.path.join(args.cache_dir, name)
+    if args.group_cache:
+        args.group_cache = os.path.join(os.path.dirname(args.group_cache), name, os.path.basename(args.group_cache))
+    if args.profile:
+        args.profile = os.path.join(args.profile, name)
+    return args
+
+
+def crawl_tenant(args: argparse.Namespace, tenant: Dict) -> Dict:
+    """
+    Crawl one tenant of a multi-tenant run; runs in its own worker process.
+
+    Args:
+        args (argparse.Namespace): The arguments returned by tenant_args.
+        tenant (Dict): The tenant, as returned by load_tenants.
+
+    Returns:
+        Dict: The result of run, with the tenant, its output directory, request count and duration.
+    """
+    for handler in logging.getLogger().handlers:
+        handler.setFormatter(logging.Formatter(f"%(asctime)s - %(levelname)s - [{tenant['name']}] %(message)s"))
+    if args.group_cache:
+        os.makedirs(os.path.dirname(args.group_cache), exist_ok=True)
+    start = time.perf_counter()
+    result = run(args, tenant["client_id"], tenant["client_secret"], tenant["tenant_id"])
+    return {
+        "name": tenant["name"],
+        "tenant_id": tenant["tenant_id"],
+        "output_dir": args.output_dir,
+        **result,
+        "requests": telemetry.report()["requests"],
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def _crawl_tenant(job: Tuple[argparse.Namespace, Dict]) -> Dict:
+    return crawl_tenant(*job)
+
+
+def run_tenants(args: argparse.Namespace) -> None:
+    """
+    Crawl every tenant of --tenants, up to --tenant-workers at a time, then write the combined index.
+
+    Each tenant is crawled in a new worker process, which exits when the tenant is
+    done, so tenants never share auth clients, MSAL token caches, the pooled HTTP
+    session, the response cache or telemetry: all of them are per process.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+    """
+    started = time.time()
+    jobs = [(tenant_args(args, tenant), tenant) for tenant in args.tenant_list]
+    runs = []
+    with multiprocessing.Pool(processes=min(args.tenant_workers, len(jobs)), maxtasksperchild=1) as pool:
+        for result in pool.imap_unordered(_crawl_tenant, jobs):
+            status = f"failed: {result['error']}" if result["error"] else "done"
+            logger.info(f"Tenant {result['name']} {status} in {result['seconds']:.1f}s, "
+                        f"{len(result['subscriptions'])} subscriptions, {result['requests']} requests")
+            runs.append(result)
+    path = write_tenant_index(args.output_dir, runs, started)
+    logger.info(f"Crawled {len(runs)} tenants in {time.time() - started:.1f}s; index in {path}")
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Main function to orchestrate the fetching and processing of data.
+    """
+    args = parse_args(argv)
+    if args.list_collectors:
+        for name, c in registry.collectors.items():
+            print(f"{name:<28} inputs: {', '.join(c.requires) or '-':<50} output: {c.output or '-'}")
+        return
+    if args.merge_shards:
+        merged = merge_shards(args.merge_shards, args.output_dir)
+        logger.info(f"Merged {len(args.merge_shards)} shards into {args.output_dir}: {merged}")
+        return
+    if args.build_index:
+        for path in args.build_index:
+            start = time.perf_counter()
+            index = build_index(path)
+            logger.info(f"Indexed {path} in {time.perf_counter() - start:.2f}s: {index}")
+        return
+    if args.lookup:
+        path, field, value = args.lookup
+        with OffsetIndex(path) as index:
+            for record in index.lookup(field, value):
+                print(json.dumps(record))
+        return
+    if args.enrich:
+        for path in args.enrich:
+            principal_files = args.principal_files or [
+                resolve_output(os.path.dirname(path), name) for name in PRINCIPAL_FILES
+            ]
+            start = time.perf_counter()
+            count = enrich_file(
+                path,
+                principal_names=load_principal_names(principal_files),
+                workers=args.enrich_workers,
+                chunk_size=args.enrich_chunk_size,
+            )
+            logger.info(f"Enriched {count} records of {path} in {time.perf_counter() - start:.2f}s: {enriched_path(path)}")
+        return
+    if args.diff_snapshots:
+        report = diff_snapshots(*args.diff_snapshots, files=args.diff_files, spill_dir=args.spill_dir)
+        path = args.diff_report or os.path.join(args.output_dir, "snapshot_diff.json")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(report, f)
+        logger.info(f"Snapshot changes (ids in {path}):\n{summary_table(report)}")
+        return
+
+    if args.risk_summary:
+        summary = summarize(args.output_dir)
+        path = os.path.join(args.output_dir, RISK_SUMMARY)
+        with open(path, "w") as f:
+            json.dump(summary, f, indent=2)
+        logger.info(f"Risk summary (details in {path}):\n{summary_lines(summary)}")
+        return
+
+    if args.tenants:
+        run_tenants(args)
+        return
+
+    import config
+
+    run(args, config.CLIENT_ID, config.CLIENT_SECRET, config.TENANT_ID)
 
 
 if __name__ == "__main__":
@@ -1,4 +1,42 @@
-import requests
+from helpers import http_session
+
+ARM_ENDPOINT = "https://management.azure.com"
+
+# Child and extension resource types that are listed alongside their parent but
+# are not used as role assignment scopes; collecting them only costs requests
+NON_ASSIGNABLE_RESOURCE_TYPES = frozenset({
+    "microsoft.compute/virtualmachines/extensions",
+    "microsoft.compute/virtualmachinescalesets/extensions",
+    "microsoft.hybridcompute/machines/extensions",
+    "microsoft.network/networkwatchers/flowlogs",
+    "microsoft.network/networkwatchers/connectionmonitors",
+})
+
+
+def iter_paged(arm_auth_client, url, description):
+    """
+    Yield the items of an ARM list operation, following `nextLink` across pages.
+
+    Only one page is held in memory at a time.
+
+    Args:
+        arm_auth_client: The authentication client to use for fetching the token.
+        url (str): URL of the first page.
+        description (str): What is being listed, for the error message.
+
+    Yields:
+        Dict: The listed items.
+    """
+    while url:
+        token = arm_auth_client.get_token()
+        headers = {"Authorization": f"Bearer {token}"}
+        response = http_session.get(url, headers=headers)
+        if response.status_code != 200:
+            print(f"Error fetching {description}: {response.status_code} - {response.text}")
+            return
+        page = response.json()
+        yield from page.get("value", [])
+        url = page.get("nextLink")
 
 
 def get_management_groups(arm_auth_client):
@@ -12,9 +50,9 @@ def get_management_groups(arm_auth_client):
         List[Dict]: A list of dictionaries containing the management group details.
     """
     token = arm_auth_client.get_token()
-    url = "https://management.azure.com/providers/Microsoft.Management/managementGroups?api-version=2020-05-01"
+    url = f"{ARM_ENDPOINT}/providers/Microsoft.Management/managementGroups?api-version=2020-05-01"
     headers = {"Authorization": f"Bearer {token}"}
-    response = requests.get(url, headers=headers)
+    response = http_session.get(url, headers=headers)
     if response.status_code == 200:
         return response.json().get("value", [])
     else:
@@ -24,6 +62,33 @@ def get_management_groups(arm_auth_client):
         return []
 
 
+def get_management_group_hierarchy(arm_auth_client, root_group):
+    """
+    Fetch a management group with all descendant groups and subscriptions in one call.
+
+    Args:
+        arm_auth_client: The authentication client to use for fetching the token.
+        root_group (str): Name of the group to expand; the tenant root group is named after the tenant ID.
+
+    Returns:
+        Dict: The group with nested `properties.children`, or None if the call fails.
+    """
+    token = arm_auth_client.get_token()
+    url = (
+        f"{ARM_ENDPOINT}/providers/Microsoft.Management/managementGroups/{root_group}"
+        "?api-version=2020-05-01&$expand=children&$recurse=true"
+    )
+    headers = {"Authorization": f"Bearer {token}"}
+    response = http_session.get(url, headers=headers)
+    if response.status_code == 200:
+        return response.json()
+    else:
+        print(
+            f"Error fetching management group hierarchy: {response.status_code} - {response.text}"
+        )
+        return None
+
+
 def get_subscriptions(arm_auth_client):
     """
     Fetch the list of subscriptions from the Azure Management API.
@@ -35,9 +100,9 @@ def get_subscriptions(arm_auth_client):
         List[Dict]: A list of dictionaries containing the subscription details.
     """
     token = arm_auth_client.get_token()
-    url = "https://management.azure.com/subscriptions?api-version=2020-01-01"
+    url = f"{ARM_ENDPOINT}/subscriptions?api-version=2020-01-01"
     headers = {"Authorization": f"Bearer {token}"}
-    response = requests.get(url, headers=headers)
+    response = http_session.get(url, headers=headers)
     if response.status_code == 200:
         return response.json().get("value", [])
     else:
@@ -57,9 +122,9 @@ def get_resource_groups(arm_auth_client, subscription):
         List[Dict]: A list of dictionaries containing the resource group details.
     """
     token = arm_auth_client.get_token()
-    url = f"https://management.azure.com{subscription}/resourceGroups?api-version=2020-01-01"
+    url = f"{ARM_ENDPOINT}{subscription}/resourceGroups?api-version=2020-01-01"
     headers = {"Authorization": f"Bearer {token}"}
-    response = requests.get(url, headers=headers)
+    response = http_session.get(url, headers=headers)
     if response.status_code == 200:
         return response.json().get("value", [])
     else:
@@ -81,9 +146,9 @@ def get_sub_role_assignment(arm_auth_client, subscription):
         List[Dict]: A list of dictionaries containing the role assignment details.
     """
     token = arm_auth_client.get_token()
-    url = f"https://management.azure.com{subscription}/providers/Microsoft.Authorization/roleAssignments?api-version=2022-04-01"
+    url = f"{ARM_ENDPOINT}{subscription}/providers/Microsoft.Authorization/roleAssignments?api-version=2022-04-01"
     headers = {"Authorization": f"Bearer {token}"}
-    response = requests.get(url, headers=headers)
+    response = http_session.get(url, headers=headers)
     if response.status_code == 200:
         return response.json().get("value", [])
     else:
@@ -106,9 +171,9 @@ def get_rg_role_assignment(arm_auth_client, subscription, resource_group):
         List[Dict]: A list of dictionaries containing the role assignment details.
     """
     token = arm_auth_client.get_token()
-    url = f"https://management.azure.com{resource_group}/providers/Microsoft.Authorization/roleAssignments?api-version=2022-04-01"
+    url = f"{ARM_ENDPOINT}{resource_group}/providers/Microsoft.Authorization/roleAssignments?api-version=2022-04-01"
     headers = {"Authorization": f"Bearer {token}"}
-    response = requests.get(url, headers=headers)
+    response = http_session.get(url, headers=headers)
     if response.status_code == 200:
         return response.json().get("value", [])
     else:
@@ -130,9 +195,9 @@ def get_mg_role_assignment(arm_auth_client, management_group):
         List[Dict]: A list of dictionaries containing the role assignment details.
     """
     token = arm_auth_client.get_token()
-    url = f"https://management.azure.com{management_group}/providers/Microsoft.Authorization/roleAssignments?api-version=2022-04-01"
+    url = f"{ARM_ENDPOINT}{management_group}/providers/Microsoft.Authorization/roleAssignments?api-version=2022-04-01"
     headers = {"Authorization": f"Bearer {token}"}
-    response = requests.get(url, headers=headers)
+    response = http_session.get(url, headers=headers)
     if response.status_code == 200:
         return response.json().get("value", [])
     else:
@@ -144,9 +209,9 @@ def get_mg_role_assignment(arm_auth_client, management_group):
 
 def get_classic_admins(arm_auth_client, subscription):
     token = arm_auth_client.get_token()
-    url = f"https://management.azure.com{subscription}/providers/Microsoft.Authorization/classicAdministrators?api-version=2015-07-01"
+    url = f"{ARM_ENDPOINT}{subscription}/providers/Microsoft.Authorization/classicAdministrators?api-version=2015-07-01"
     headers = {"Authorization": f"Bearer {token}"}
-    response = requests.get(url, headers=headers)
+    response = http_session.get(url, headers=headers)
     if response.status_code == 200:
         return response.json().get("value", [])
     else:
@@ -168,9 +233,9 @@ def get_resources(arm_auth_client, subscription, resource_group):
         List[Dict]: A list of dictionaries containing the resource details.
     """
     token = arm_auth_client.get_token()
-    url = f"https://management.azure.com{resource_group}/resources?api-version=2021-04-01"
+    url = f"{ARM_ENDPOINT}{resource_group}/resources?api-version=2021-04-01"
     headers = {"Authorization": f"Bearer {token}"}
-    response = requests.get(url, headers=headers)
+    response = http_session.get(url, headers=headers)
     if response.status_code == 200:
         return response.json().get("value", [])
     else:
@@ -179,27 +244,36 @@ def get_resources(arm_auth_client, subscription, resource_group):
 
 def get_resource_role_assignment(arm_auth_client, subscription, resource_group, resource):
     """
-    Fetch the list of role assignments for a specific resource from the Azure Management API.
+    Fetch the list of role assignments made directly on a specific resource from the Azure Management API.
+
+    `atScope()` also returns the assignments inherited from the resource group,
+    subscription and management groups; only those whose scope is the resource
+    itself are kept.
 
     Args:
         arm_auth_client: The authentication client to use for fetching the token.
-        subscription (str): The subscription ID to fetch role assignments for.
-        resource_group (str): The resource group ID to fetch role assignments for.
+        subscription (str): The subscription ID the resource belongs to.
+        resource_group (str): The resource group ID the resource belongs to.
         resource (str): The resource ID to fetch role assignments for.
 
     Returns:
         List[Dict]: A list of dictionaries containing the role assignment details.
     """
     token = arm_auth_client.get_token()
-    url = f"https://management.azure.com{resource_group}/providers/Microsoft.Authorization/roleAssignments?api-version=2022-04-01&$filter=atScope()"
+    url = f"{ARM_ENDPOINT}{resource}/providers/Microsoft.Authorization/roleAssignments?api-version=2022-04-01&$filter=atScope()"
     headers = {"Authorization": f"Bearer {token}"}
-    response = requests.get(url, headers=headers)
+    response = http_session.get(url, headers=headers)
     if response.status_code == 200:
-        return response.json().get("value", [])
+        scope = resource.lower()
+        return [
+            assignment
+            for assignment in response.json().get("value", [])
+            if (assignment.get("properties") or {}).get("scope", "").lower() == scope
+        ]
     else:
         print(f"Error fetching resource role assignments: {response.status_code} - {response.text}")
         return []
-    
+
 
 def get_logic_apps_configuration(arm_auth_client, subscription, resource_group):
     """
@@ -214,12 +288,26 @@ def get_logic_apps_configuration(arm_auth_client, subscription, resource_group):
         List[Dict]: A list of dictionaries containing the Logic Apps configuration details.
     """
     token = arm_auth_client.get_token()
-    url = f"https://management.azure.com/{resource_group}/providers/Microsoft.Logic/workflows?api-version=2019-05-01"
+    url = f"{ARM_ENDPOINT}{resource_group}/providers/Microsoft.Logic/workflows?api-version=2019-05-01"
     headers = {"Authorization": f"Bearer {token}"}
-    response = requests.get(url, headers=headers)
+    response = http_session.get(url, headers=headers)
     if response.status_code == 200:
         return response.json().get("value", [])
     else:
         print(f"Error fetching Logic Apps configuration: {response.status_code} - {response.text}")
         return []
-    
\ No newline at end of file
+
+
+def iter_subscription_logic_apps(arm_auth_client, subscription):
+    """
+    Yield every Logic App (Microsoft.Logic/workflows) in a subscription with a single paged listing.
+
+    Args:
+        arm_auth_client: The authentication client to use for fetching the token.
+        subscription (str): The subscription ID to list Logic Apps for.
+
+    Yields:
+        Dict: Logic App configurations, including their workflow definitions.
+    """
+    url = f"{ARM_ENDPOINT}{subscription}/providers/Microsoft.Logic/workflows?api-version=2019-05-01"
+    yield from iter_paged(arm_auth_client, url, "Logic Apps configuration")
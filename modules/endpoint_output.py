@@ -0,0 +1,156 @@
+import csv
+import json
+import os
+import time
+from collections import Counter
+from itertools import islice
+
+CSV_FIELDS = [
+    "service_type",
+    "name",
+    "resource_group",
+    "url",
+    "kind",
+    "ip_address",
+    "probe_dns",
+    "probe_tcp",
+    "probe_tls",
+    "probe_cert_valid",
+    "probe_http_status",
+    "probe_error",
+]
+
+
+def chunked(iterable, size):
+    """
+    Split an iterable into lists of at most `size` items without materialising it.
+
+    Args:
+        iterable: Any iterable, typically a scanner endpoint generator.
+        size (int): Maximum number of items per chunk.
+
+    Yields:
+        List: The next chunk of items.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _csv_row(endpoint):
+    row = {key: endpoint.get(key) for key in CSV_FIELDS[:6]}
+    probe = endpoint.get("probe")
+    if probe:
+        row.update({
+            "probe_dns": probe["dns"],
+            "probe_tcp": probe["tcp"],
+            "probe_tls": probe["tls"],
+            "probe_cert_valid": probe["cert_valid"],
+            "probe_http_status": probe["http_status"],
+            "probe_error": probe["error"],
+        })
+    return row
+
+
+class EndpointWriter:
+    """
+    Streams endpoint records to JSONL and/or CSV files as they are discovered.
+
+    Each batch is flushed as soon as it is written so downstream tools can tail
+    the files while the scan runs; only running counts are kept in memory. The
+    summary file is written last, via a rename, so its presence marks a finished scan.
+    """
+
+    def __init__(self, output_dir, formats=("jsonl",), summary_name="summary.json"):
+        """
+        Open the output files.
+
+        Args:
+            output_dir (str): Directory for endpoints.jsonl, endpoints.csv and the summary.
+            formats (Iterable[str]): Any of 'jsonl' and 'csv'.
+            summary_name (str): File name of the summary written by close().
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.summary_path = os.path.join(output_dir, summary_name)
+        self.started = time.time()
+        self.by_service_type = Counter()
+        self.reachable = 0
+        self.probed = 0
+        self.errors = []
+        self.files = {}
+        self._jsonl = None
+        self._csv = None
+        if "jsonl" in formats:
+            path = os.path.join(output_dir, "endpoints.jsonl")
+            self._jsonl = open(path, "w")
+            self.files["jsonl"] = path
+        if "csv" in formats:
+            path = os.path.join(output_dir, "endpoints.csv")
+            self._csv_file = open(path, "w", newline="")
+            self._csv = csv.DictWriter(self._csv_file, fieldnames=CSV_FIELDS)
+            self._csv.writeheader()
+            self.files["csv"] = path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.errors.append(f"{type(exc).__name__}: {exc}")
+        self.close()
+
+    def write_many(self, endpoints):
+        """
+        Append a batch of endpoint records and flush it to disk.
+
+        Args:
+            endpoints (List[Dict]): Endpoint records, optionally carrying a 'probe' result.
+        """
+        for endpoint in endpoints:
+            self.by_service_type[endpoint["service_type"]] += 1
+            probe = endpoint.get("probe")
+            if probe:
+                self.probed += 1
+                if probe["http_status"] is not None:
+                    self.reachable += 1
+            if self._jsonl:
+                self._jsonl.write(json.dumps(endpoint) + "\n")
+            if self._csv:
+                self._csv.writerow(_csv_row(endpoint))
+        if self._jsonl:
+            self._jsonl.flush()
+        if self._csv:
+            self._csv_file.flush()
+
+    def summary(self):
+        """
+        Returns:
+            Dict: Totals for the records written so far.
+        """
+        return {
+            "started": self.started,
+            "finished": time.time(),
+            "total_endpoints": sum(self.by_service_type.values()),
+            "by_service_type": dict(self.by_service_type),
+            "probed": self.probed,
+            "reachable": self.reachable,
+            "errors": self.errors,
+            "files": self.files,
+        }
+
+    def close(self):
+        """Close the record files and write the summary."""
+        if self._jsonl:
+            self._jsonl.close()
+            self._jsonl = None
+        if self._csv:
+            self._csv_file.close()
+            self._csv = None
+        tmp_path = f"{self.summary_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+        os.replace(tmp_path, self.summary_path)
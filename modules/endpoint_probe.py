@@ -0,0 +1,216 @@
+import asyncio
+import socket
+import ssl
+import time
+from urllib.parse import urlsplit
+
+DEFAULT_TIMEOUT = 5.0
+DEFAULT_CONCURRENCY = 200
+DEFAULT_PER_HOST = 2
+USER_AGENT = "azure-endpoint-mapper-probe"
+
+
+def probe_target(endpoint, default_scheme="https"):
+    """
+    Work out what to connect to for a scanner endpoint record.
+
+    Args:
+        endpoint (Dict): Endpoint record from AzureEndpointScanner.
+        default_scheme (str): Scheme used for bare host names and IP addresses.
+
+    Returns:
+        Tuple[str, str, int, str] or None: (scheme, host, port, path), or None when the
+        record only carries an ARM resource ID and no address to probe.
+    """
+    url = endpoint.get("url") or ""
+    if url.startswith("/subscriptions/"):
+        if not endpoint.get("ip_address"):
+            return None
+        url = endpoint["ip_address"]
+    if "://" not in url:
+        url = f"{default_scheme}://{url}"
+    parts = urlsplit(url)
+    if not parts.hostname:
+        return None
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    return parts.scheme, parts.hostname, port, parts.path or "/"
+
+
+class EndpointProber:
+    """
+    Concurrent reachability checks for discovered public endpoints.
+
+    Each probe resolves the host, opens a TCP connection, performs the TLS
+    handshake (recording certificate details) for https targets and reads the
+    HTTP status of a HEAD request. A global semaphore caps open connections and
+    a per-host semaphore keeps the load on any single host small.
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, per_host=DEFAULT_PER_HOST,
+                 timeout=DEFAULT_TIMEOUT, ssl_context=None, default_scheme="https"):
+        """
+        Initialize the prober.
+
+        Args:
+            concurrency (int): Maximum number of probes in flight.
+            per_host (int): Maximum number of concurrent probes against one host.
+            timeout (float): Timeout in seconds for each of DNS, connect/TLS and HTTP.
+            ssl_context (ssl.SSLContext): Verifying context; defaults to the system trust store.
+                Pass a context trusting a local CA to test against stand-in servers.
+            default_scheme (str): Scheme assumed for endpoints given as bare host or IP.
+        """
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.ssl_context = ssl_context or ssl.create_default_context()
+        self.default_scheme = default_scheme
+        self._insecure_context = ssl.create_default_context()
+        self._insecure_context.check_hostname = False
+        self._insecure_context.verify_mode = ssl.CERT_NONE
+        self._global_limit = None
+        self._host_limits = {}
+
+    async def probe_all(self, endpoints):
+        """
+        Probe every endpoint concurrently.
+
+        Args:
+            endpoints (List[Dict]): Endpoint records from AzureEndpointScanner.
+
+        Returns:
+            List[Dict]: One probe result per endpoint, in input order.
+        """
+        self._global_limit = asyncio.Semaphore(self.concurrency)
+        self._host_limits = {}
+        return await asyncio.gather(*(self.probe(endpoint) for endpoint in endpoints))
+
+    async def probe(self, endpoint):
+        """
+        Probe a single endpoint.
+
+        Returns:
+            Dict: Probe result with the stages reached and any error.
+        """
+        result = {
+            "url": endpoint.get("url"),
+            "host": None,
+            "port": None,
+            "addresses": [],
+            "dns": False,
+            "tcp": False,
+            "tls": None,
+            "cert_valid": None,
+            "cert_subject": None,
+            "cert_issuer": None,
+            "cert_not_after": None,
+            "http_status": None,
+            "error": None,
+            "elapsed_ms": None,
+        }
+        target = probe_target(endpoint, self.default_scheme)
+        if target is None:
+            result["error"] = "no probeable address"
+            return result
+        scheme, host, port, path = target
+        result["host"], result["port"] = host, port
+
+        host_limit = self._host_limits.setdefault(host, asyncio.Semaphore(self.per_host))
+        start = time.perf_counter()
+        # Wait for the host's slot before taking a global one, so probes queued behind a
+        # busy host do not hold global slots that other hosts could use
+        async with host_limit, self._global_limit:
+            try:
+                await self._probe_stages(result, scheme, host, port, path)
+            except asyncio.TimeoutError:
+                result["error"] = "timeout"
+            except (OSError, ssl.SSLError, ValueError) as e:
+                result["error"] = f"{type(e).__name__}: {e}"
+        result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return result
+
+    async def _probe_stages(self, result, scheme, host, port, path):
+        loop = asyncio.get_running_loop()
+        infos = await asyncio.wait_for(
+            loop.getaddrinfo(host, port, type=socket.SOCK_STREAM), self.timeout
+        )
+        result["addresses"] = sorted({info[4][0] for info in infos})
+        result["dns"] = True
+        address = infos[0][4][0]
+
+        if scheme != "https":
+            reader, writer = await self._connect(address, port, None, None)
+            result["tcp"] = True
+        else:
+            try:
+                reader, writer = await self._connect(address, port, self.ssl_context, host)
+                result["cert_valid"] = True
+            except ssl.SSLCertVerificationError as e:
+                result["tcp"] = True
+                result["cert_valid"] = False
+                result["error"] = f"certificate: {e.verify_message}"
+                reader, writer = await self._connect(address, port, self._insecure_context, host)
+            result["tcp"] = True
+            result["tls"] = True
+            self._record_certificate(result, writer.get_extra_info("peercert"))
+
+        try:
+            result["http_status"] = await asyncio.wait_for(
+                self._http_status(reader, writer, host, path), self.timeout
+            )
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (OSError, ssl.SSLError):
+                pass
+
+    async def _connect(self, address, port, context, server_hostname):
+        return await asyncio.wait_for(
+            asyncio.open_connection(
+                address, port, ssl=context,
+                server_hostname=server_hostname if context else None,
+            ),
+            self.timeout,
+        )
+
+    @staticmethod
+    def _record_certificate(result, cert):
+        # peercert is empty when verification was disabled for the fallback handshake
+        if not cert:
+            return
+        result["cert_subject"] = dict(item[0] for item in cert.get("subject", ())).get("commonName")
+        result["cert_issuer"] = dict(item[0] for item in cert.get("issuer", ())).get("organizationName")
+        result["cert_not_after"] = cert.get("notAfter")
+
+    @staticmethod
+    async def _http_status(reader, writer, host, path):
+        request = (
+            f"HEAD {path} HTTP/1.1\r\n"
+            f"Host: {host}\r\n"
+            f"User-Agent: {USER_AGENT}\r\n"
+            "Connection: close\r\n\r\n"
+        )
+        writer.write(request.encode("ascii"))
+        await writer.drain()
+        status_line = await reader.readline()
+        parts = status_line.decode("latin-1").split()
+        if len(parts) < 2 or not parts[0].startswith("HTTP/") or not parts[1].isdigit():
+            raise ValueError(f"unexpected HTTP status line {status_line[:80]!r}")
+        return int(parts[1])
+
+
+def probe_endpoints(endpoints, **kwargs):
+    """
+    Probe endpoints concurrently and attach each result to its record under 'probe'.
+
+    Args:
+        endpoints (List[Dict]): Endpoint records from AzureEndpointScanner.
+        **kwargs: Options passed to EndpointProber.
+
+    Returns:
+        List[Dict]: The same endpoint records, each with a 'probe' entry.
+    """
+    results = asyncio.run(EndpointProber(**kwargs).probe_all(endpoints))
+    for endpoint, result in zip(endpoints, results):
+        endpoint["probe"] = result
+    return endpoints
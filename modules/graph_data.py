@@ -1,4 +1,79 @@
-import requests
+import time
+
+from helpers import http_session
+from helpers.telemetry import telemetry
+
+GRAPH_ENDPOINT = "https://graph.microsoft.com"
+
+# Throttled or briefly unavailable responses are retried after their Retry-After
+# delay (or an exponential backoff when Graph sends none), up to MAX_RETRIES times
+RETRY_STATUSES = (429, 503)
+MAX_RETRIES = 5
+MAX_BACKOFF = 60.0
+# Characters of a failed response's body kept in the error message
+ERROR_BODY_CHARS = 500
+
+
+class GraphRequestError(Exception):
+    """A Microsoft Graph request failed with a status that is not retried, or kept failing after retries."""
+
+    def __init__(self, endpoint, status_code, text):
+        super().__init__(f"Error fetching {endpoint}: {status_code} - {text[:ERROR_BODY_CHARS]}")
+        self.status_code = status_code
+
+
+def _retry_delay(response, attempt):
+    retry_after = response.headers.get("Retry-After", "")
+    try:
+        return min(max(float(retry_after), 0.0), MAX_BACKOFF)
+    except ValueError:
+        return min(2.0 ** attempt, MAX_BACKOFF)
+
+
+def _get_page(auth_client, url, endpoint):
+    for attempt in range(MAX_RETRIES + 1):
+        token = auth_client.get_token()
+        headers = {"Authorization": f"Bearer {token}"}
+        response = http_session.get(url, headers=headers)
+        if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+            break
+        time.sleep(_retry_delay(response, attempt))
+    if response.status_code != 200:
+        raise GraphRequestError(endpoint, response.status_code, response.text)
+    return response.json()
+
+
+def iter_graph_pages(auth_client, endpoint):
+    """
+    Yield the pages of a Microsoft Graph collection, following `@odata.nextLink`.
+
+    The token is requested for every page, so a long listing picks up a renewed
+    token instead of failing once the first one expires; the authentication client
+    serves it from its cache until then. Every page is counted in the telemetry, so
+    the report shows the throughput of each collection.
+
+    A page answered with 429 or 503 is requested again after the Retry-After delay.
+    Any other failure raises, so a collector never mistakes a partial listing for a
+    complete one.
+
+    Args:
+        auth_client: The authentication client to use for fetching the token.
+        endpoint (str): The endpoint to fetch data from.
+
+    Yields:
+        List[Dict]: The items of each page.
+
+    Raises:
+        GraphRequestError: If a page fails with another status, or is still throttled after MAX_RETRIES retries.
+    """
+    url = f"{GRAPH_ENDPOINT}/v1.0/{endpoint}"
+    while url:
+        start = time.perf_counter()
+        response_data = _get_page(auth_client, url, endpoint)
+        page = response_data.get("value", [])
+        telemetry.record_items(url, len(page), time.perf_counter() - start)
+        yield page
+        url = response_data.get("@odata.nextLink")
 
 
 def get_graph_data(auth_client, endpoint):
@@ -11,16 +86,13 @@ def get_graph_data(auth_client, endpoint):
 
     Returns:
         List[Dict]: A list of dictionaries containing the fetched data.
+
+    Raises:
+        GraphRequestError: If a page cannot be fetched.
     """
-    token = auth_client.get_token()
-    url = f"https://graph.microsoft.com/v1.0/{endpoint}"
-    headers = {"Authorization": f"Bearer {token}"}
     data = []
-    while url:
-        response = requests.get(url, headers=headers)
-        response_data = response.json()
-        data.extend(response_data.get("value", []))
-        url = response_data.get("@odata.nextLink")
+    for page in iter_graph_pages(auth_client, endpoint):
+        data.extend(page)
     return data
 
 
@@ -38,3 +110,20 @@ def get_federated_credentials(auth_client, app_id):
     return get_graph_data(
         auth_client, f"applications/{app_id}/federatedIdentityCredentials"
     )
+
+
+def iter_transitive_members(auth_client, group_id, select=("id", "displayName")):
+    """
+    Yield the pages of a group's direct and nested members, resolved by Graph in one paged listing.
+
+    Args:
+        auth_client: The authentication client to use for fetching the token.
+        group_id (str): Object id of the group.
+        select (Iterable[str]): Member properties to return; `@odata.type` is always included.
+
+    Yields:
+        List[Dict]: The members of each page.
+    """
+    yield from iter_graph_pages(
+        auth_client, f"groups/{group_id}/transitiveMembers?$select={','.join(select)}&$top=999"
+    )
@@ -0,0 +1,192 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from helpers.pipeline import iter_json_records
+from modules.graph_data import iter_transitive_members
+
+logger = logging.getLogger(__name__)
+
+# Member properties requested from Graph; `@odata.type` comes with every member
+MEMBER_FIELDS = ("id", "displayName", "userPrincipalName", "appId")
+# Seconds a persisted expansion is reused by later runs
+DEFAULT_CACHE_TTL = 24 * 3600
+# Concurrent transitiveMembers listings
+DEFAULT_WORKERS = 8
+
+
+class GroupExpander:
+    """
+    Memoised transitive membership of Entra ID groups.
+
+    Each group is expanded with one paged `transitiveMembers` listing, which Graph
+    resolves through every level of nesting, so nested groups cost no extra calls.
+    A group is listed at most once per run: callers asking for a group that is being
+    listed wait for that listing. When groups are nested in a cycle, Graph returns a
+    group among its own members; it is dropped, and members reached over several
+    paths are kept once. A listing that fails part way is neither memoised nor
+    persisted: the group is listed again the next time it is asked for.
+
+    With a `cache_path`, expansions younger than `ttl` are read from that file when
+    the expander is created and every expansion is written back by `save`, so later
+    runs only list the groups they have not seen recently.
+    """
+
+    def __init__(self, auth_client, cache_path=None, ttl=DEFAULT_CACHE_TTL, select=MEMBER_FIELDS):
+        """
+        Args:
+            auth_client: The Graph authentication client.
+            cache_path (str): JSON file persisting expansions across runs; none by default.
+            ttl (float): Seconds a persisted expansion stays valid.
+            select (Iterable[str]): Member properties to request.
+        """
+        self.auth_client = auth_client
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.select = list(select)
+        self.listed = 0
+        self.pages = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        # Lower-cased group id -> Future of (fetched time, members)
+        self._expansions = {}
+        self._cached = set()
+        self._requested = set()
+        if cache_path and os.path.exists(cache_path):
+            self._load()
+
+    def _load(self):
+        with open(self.cache_path) as f:
+            cached = json.load(f)
+        if cached.get("select") != self.select:
+            return
+        oldest = time.time() - self.ttl
+        for key, entry in cached.get("groups", {}).items():
+            if entry["fetched"] >= oldest:
+                future = Future()
+                future.set_result((entry["fetched"], entry["members"]))
+                self._expansions[key] = future
+                self._cached.add(key)
+
+    def members(self, group_id):
+        """
+        Args:
+            group_id (str): Object id of the group.
+
+        Returns:
+            List[Dict]: The group's direct and nested members, each once.
+
+        Raises:
+            GraphRequestError: If a page of the listing fails; the group is listed again on the next call.
+        """
+        key = group_id.lower()
+        with self._lock:
+            self._requested.add(key)
+            future = self._expansions.get(key)
+            owner = future is None
+            if owner:
+                future = self._expansions[key] = Future()
+        if owner:
+            try:
+                future.set_result((time.time(), self._list(group_id)))
+            except BaseException as e:
+                # Forget the failed listing, so neither a later call nor save() sees it
+                with self._lock:
+                    del self._expansions[key]
+                    self.failed += 1
+                future.set_exception(e)
+        return future.result()[1]
+
+    def _list(self, group_id):
+        key = group_id.lower()
+        members = {}
+        pages = 0
+        for page in iter_transitive_members(self.auth_client, group_id, self.select):
+            pages += 1
+            for member in page:
+                member_id = (member.get("id") or "").lower()
+                if member_id and member_id != key and member_id not in members:
+                    members[member_id] = member
+        with self._lock:
+            self.listed += 1
+            self.pages += pages
+        return list(members.values())
+
+    def expand(self, group_ids, workers=DEFAULT_WORKERS):
+        """
+        Expand several groups concurrently.
+
+        Args:
+            group_ids (Iterable[str]): Object ids of the groups.
+            workers (int): Concurrent listings.
+
+        Returns:
+            Dict[str, List[Dict]]: Members per group id, in the order given; groups whose
+            listing failed are logged and left out.
+        """
+        group_ids = list(dict.fromkeys(group_ids))
+
+        def expand_one(group_id):
+            try:
+                return self.members(group_id)
+            except Exception as e:
+                logger.error(f"Error expanding group {group_id}: {str(e)}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            expanded = dict(zip(group_ids, pool.map(expand_one, group_ids)))
+        return {group_id: members for group_id, members in expanded.items() if members is not None}
+
+    def save(self):
+        """Write every completed expansion to `cache_path`, if one was given."""
+        if not self.cache_path:
+            return
+        with self._lock:
+            done = [(key, future) for key, future in self._expansions.items() if future.done()]
+        groups = {}
+        for key, future in done:
+            if future.exception() is None:
+                fetched, members = future.result()
+                groups[key] = {"fetched": fetched, "members": members}
+        with open(f"{self.cache_path}.tmp", "w") as f:
+            json.dump({"select": self.select, "groups": groups}, f)
+        os.replace(f"{self.cache_path}.tmp", self.cache_path)
+
+    def stats(self):
+        """
+        Returns:
+            Dict: Groups requested, listings and pages fetched from Graph, listings that failed, and groups
+            served from the cache file.
+        """
+        with self._lock:
+            return {
+                "groups": len(self._requested),
+                "listed": self.listed,
+                "pages": self.pages,
+                "failed": self.failed,
+                "cached": len(self._requested & self._cached),
+            }
+
+
+def group_principal_ids(paths):
+    """
+    Collect the groups that hold role assignments.
+
+    Args:
+        paths (Iterable[str]): Role assignment files (JSON array or JSON lines); missing files are skipped.
+
+    Returns:
+        List[str]: Object ids of the principals of type Group, each once, in order of appearance.
+    """
+    group_ids = {}
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        for assignment in iter_json_records(path):
+            properties = assignment.get("properties") or {}
+            if properties.get("principalType") == "Group" and properties.get("principalId"):
+                group_ids.setdefault(properties["principalId"].lower(), properties["principalId"])
+    return list(group_ids.values())
@@ -0,0 +1,213 @@
+from modules.arm_data import get_management_group_hierarchy, get_management_groups
+
+MG_TYPE = "Microsoft.Management/managementGroups"
+SUBSCRIPTION_TYPE = "/subscriptions"
+
+# Trees already loaded in this process, keyed by lower-cased root group id
+_trees = {}
+
+
+class ManagementGroupNode:
+    """
+    One management group in the hierarchy.
+
+    Attributes:
+        id (str): Management group resource id.
+        name (str): Management group name (the root group's name is the tenant id).
+        display_name (str): Display name.
+        parent (ManagementGroupNode): Parent group, None for the root.
+        children (List[ManagementGroupNode]): Child management groups.
+        subscriptions (List[str]): Ids of the subscriptions placed directly in this group.
+    """
+
+    __slots__ = ("id", "name", "display_name", "parent", "children", "subscriptions")
+
+    def __init__(self, id, name, display_name, parent=None):
+        self.id = id
+        self.name = name
+        self.display_name = display_name
+        self.parent = parent
+        self.children = []
+        self.subscriptions = []
+
+
+class ManagementGroupTree:
+    """
+    In-memory management group hierarchy with subscriptions linked to their parent group.
+
+    Built from a single `$expand=children&$recurse=true` response on the root group,
+    so walking the hierarchy or resolving the groups a scope inherits from needs no
+    further API calls.
+    """
+
+    def __init__(self, tenant_id=None):
+        self.tenant_id = tenant_id
+        self.root = None
+        self.groups = {}
+        self.subscription_parent = {}
+
+    def _add_group(self, id, name, display_name, parent):
+        node = ManagementGroupNode(id, name, display_name, parent)
+        self.groups[id.lower()] = node
+        if parent is not None:
+            parent.children.append(node)
+        elif self.root is None:
+            self.root = node
+        return node
+
+    @classmethod
+    def from_expanded(cls, data):
+        """
+        Build the tree from the expanded root group response.
+
+        Args:
+            data (Dict): Response of GET managementGroups/{root}?$expand=children&$recurse=true.
+
+        Returns:
+            ManagementGroupTree: The hierarchy.
+        """
+        properties = data.get("properties") or {}
+        tree = cls(properties.get("tenantId"))
+        root = tree._add_group(data["id"], data.get("name"), properties.get("displayName"), None)
+        stack = [(root, properties.get("children") or [])]
+        while stack:
+            parent, children = stack.pop()
+            for child in children:
+                if child.get("type", "").lower() == SUBSCRIPTION_TYPE:
+                    parent.subscriptions.append(child["id"])
+                    tree.subscription_parent[child["id"].lower()] = parent
+                else:
+                    node = tree._add_group(child["id"], child.get("name"), child.get("displayName"), parent)
+                    stack.append((node, child.get("children") or []))
+        return tree
+
+    @classmethod
+    def from_flat(cls, groups):
+        """
+        Build a tree from the flat management group list, for callers without read
+        access on the root group. Parents are linked where the list carries them;
+        subscriptions stay unlinked.
+
+        Args:
+            groups (List[Dict]): Management groups as returned by get_management_groups.
+
+        Returns:
+            ManagementGroupTree: The (possibly partial) hierarchy.
+        """
+        tree = cls(next(((g.get("properties") or {}).get("tenantId") for g in groups), None))
+        parents = {}
+        for group in groups:
+            properties = group.get("properties") or {}
+            tree._add_group(group["id"], group.get("name"), properties.get("displayName"), None)
+            parent = ((properties.get("details") or {}).get("parent") or {}).get("id")
+            if parent:
+                parents[group["id"].lower()] = parent.lower()
+        for group_id, parent_id in parents.items():
+            node, parent = tree.groups[group_id], tree.groups.get(parent_id)
+            if parent is not None:
+                node.parent = parent
+                parent.children.append(node)
+        roots = [node for node in tree.groups.values() if node.parent is None]
+        tree.root = roots[0] if len(roots) == 1 else None
+        return tree
+
+    def walk(self):
+        """
+        Yields:
+            ManagementGroupNode: Every group, parents before their children.
+        """
+        pending = [self.root] if self.root else [n for n in self.groups.values() if n.parent is None]
+        pending.reverse()
+        while pending:
+            node = pending.pop()
+            yield node
+            pending.extend(reversed(node.children))
+
+    def ancestors(self, scope):
+        """
+        Management groups a scope inherits role assignments from, nearest first.
+
+        Args:
+            scope (str): A management group id, subscription id or any scope below a subscription.
+
+        Returns:
+            List[ManagementGroupNode]: The group itself (for a group scope) and its ancestors
+            up to the root; empty when the scope is not linked into the tree.
+        """
+        scope = scope.lower().rstrip("/")
+        node = self.groups.get(scope)
+        if node is None and scope.startswith("/subscriptions/"):
+            node = self.subscription_parent.get("/".join(scope.split("/")[:3]))
+        chain = []
+        while node is not None:
+            chain.append(node)
+            node = node.parent
+        return chain
+
+    def to_list(self):
+        """
+        Returns:
+            List[Dict]: The groups in the shape of the management group list API, parents first.
+        """
+        return [
+            {
+                "id": node.id,
+                "type": MG_TYPE,
+                "name": node.name,
+                "properties": {
+                    "tenantId": self.tenant_id,
+                    "displayName": node.display_name,
+                    "details": {"parent": {"id": node.parent.id} if node.parent else None},
+                },
+            }
+            for node in self.walk()
+        ]
+
+    def to_dict(self):
+        """
+        Returns:
+            Dict: The nested hierarchy, for JSON output.
+        """
+        def node_dict(node):
+            return {
+                "id": node.id,
+                "name": node.name,
+                "displayName": node.display_name,
+                "subscriptions": list(node.subscriptions),
+                "children": [node_dict(child) for child in node.children],
+            }
+
+        roots = [self.root] if self.root else [n for n in self.groups.values() if n.parent is None]
+        return {"tenantId": self.tenant_id, "roots": [node_dict(root) for root in roots]}
+
+
+def load_management_group_tree(arm_auth_client, tenant_id=None, refresh=False):
+    """
+    Load the management group hierarchy, once per process unless `refresh` is set.
+
+    Args:
+        arm_auth_client: The authentication client to use for fetching the token.
+        tenant_id (str): Tenant id, which is the root group's name. Looked up from the
+            flat management group list when omitted.
+        refresh (bool): Fetch again even if the tree is cached.
+
+    Returns:
+        ManagementGroupTree: The hierarchy; built from the flat list when the expanded
+        call on the root group is not permitted.
+    """
+    flat = None
+    if tenant_id is None:
+        flat = get_management_groups(arm_auth_client)
+        tenant_id = next(((g.get("properties") or {}).get("tenantId") for g in flat), None)
+        if tenant_id is None:
+            return ManagementGroupTree()
+    key = tenant_id.lower()
+    if not refresh and key in _trees:
+        return _trees[key]
+    expanded = get_management_group_hierarchy(arm_auth_client, tenant_id)
+    if expanded:
+        tree = ManagementGroupTree.from_expanded(expanded)
+    else:
+        tree = ManagementGroupTree.from_flat(flat if flat is not None else get_management_groups(arm_auth_client))
+    _trees[key] = tree
+    return tree
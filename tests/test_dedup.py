@@ -0,0 +1,79 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers.dedup import MAX_RUNS, SpillingKeySet  # noqa: E402
+
+
+def _key(i):
+    return f"/subscriptions/sub/resourceGroups/rg/providers/Microsoft.Compute/virtualMachines/vm-{i}"
+
+
+class SpillingKeySetTest(unittest.TestCase):
+    """SpillingKeySet membership across memory, spilled runs and merged runs."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+
+    def test_in_memory(self):
+        with SpillingKeySet(max_entries=100, spill_dir=self._tmp.name) as keys:
+            self.assertTrue(keys.add(_key(1)))
+            self.assertFalse(keys.add(_key(1)))
+            self.assertIn(_key(1), keys)
+            self.assertNotIn(_key(2), keys)
+            self.assertEqual(keys.stats(), {"keys": 1, "in_memory": 1, "spilled_runs": 0})
+        self.assertEqual(os.listdir(self._tmp.name), [])
+
+    def test_spilled_runs(self):
+        # 10 keys per run, fewer runs than trigger a merge
+        keys = SpillingKeySet(max_entries=10, spill_dir=self._tmp.name)
+        self.addCleanup(keys.close)
+        count = 10 * MAX_RUNS + 5
+        for i in range(count):
+            self.assertTrue(keys.add(_key(i)))
+        self.assertEqual(keys.stats(), {"keys": count, "in_memory": 5, "spilled_runs": MAX_RUNS})
+        for i in range(count):
+            self.assertIn(_key(i), keys)
+            self.assertFalse(keys.add(_key(i)))
+        self.assertNotIn(_key(count), keys)
+        self.assertEqual(len(keys), count)
+
+    def test_merged_runs(self):
+        # Enough spills to merge several times; every key must survive the merges
+        keys = SpillingKeySet(max_entries=7, spill_dir=self._tmp.name)
+        self.addCleanup(keys.close)
+        count = 7 * (3 * MAX_RUNS + 2) + 3
+        for i in range(count):
+            self.assertTrue(keys.add(_key(i)))
+        self.assertLessEqual(keys.stats()["spilled_runs"], MAX_RUNS)
+        self.assertEqual(len(keys), count)
+        for i in range(count):
+            self.assertIn(_key(i), keys)
+        for i in range(count, count + 100):
+            self.assertNotIn(_key(i), keys)
+
+    def test_keys_are_case_insensitive(self):
+        keys = SpillingKeySet(max_entries=3, spill_dir=self._tmp.name)
+        self.addCleanup(keys.close)
+        for i in range(20):
+            keys.add(_key(i))
+        self.assertIn(_key(1).upper(), keys)
+        self.assertFalse(keys.add(_key(15).lower()))
+        self.assertEqual(len(keys), 20)
+
+    def test_close_removes_spill_files(self):
+        keys = SpillingKeySet(max_entries=5, spill_dir=self._tmp.name)
+        for i in range(100):
+            keys.add(_key(i))
+        self.assertEqual(len(os.listdir(self._tmp.name)), 1)
+        keys.close()
+        self.assertEqual(os.listdir(self._tmp.name), [])
+        self.assertNotIn(_key(1), keys)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+import asyncio
+import datetime
+import ipaddress
+import os
+import ssl
+import sys
+import tempfile
+import unittest
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.endpoint_probe import EndpointProber  # noqa: E402
+
+
+def _name(common_name, organization):
+    return x509.Name([
+        x509.NameAttribute(NameOID.COMMON_NAME, common_name),
+        x509.NameAttribute(NameOID.ORGANIZATION_NAME, organization),
+    ])
+
+
+def _certificate(subject, issuer, public_key, signing_key, is_ca, san=None):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    builder = (
+        x509.CertificateBuilder()
+        .subject_name(subject)
+        .issuer_name(issuer)
+        .public_key(public_key)
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=5))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.BasicConstraints(ca=is_ca, path_length=None), critical=True)
+    )
+    if san:
+        builder = builder.add_extension(x509.SubjectAlternativeName(san), critical=False)
+    return builder.sign(signing_key, hashes.SHA256())
+
+
+def write_private_ca(directory):
+    """
+    Create a CA and a server certificate for localhost signed by it.
+
+    Returns:
+        Tuple[str, str, str]: Paths of the CA certificate, server certificate and server key.
+    """
+    ca_key = ec.generate_private_key(ec.SECP256R1())
+    ca_name = _name("Probe Test CA", "Probe Test CA")
+    ca_cert = _certificate(ca_name, ca_name, ca_key.public_key(), ca_key, True)
+    server_key = ec.generate_private_key(ec.SECP256R1())
+    server_cert = _certificate(
+        _name("localhost", "Probe Test"), ca_name, server_key.public_key(), ca_key, False,
+        [x509.DNSName("localhost"), x509.IPAddress(ipaddress.ip_address("127.0.0.1"))],
+    )
+    paths = [os.path.join(directory, name) for name in ("ca.pem", "server.pem", "server.key")]
+    with open(paths[0], "wb") as f:
+        f.write(ca_cert.public_bytes(serialization.Encoding.PEM))
+    with open(paths[1], "wb") as f:
+        f.write(server_cert.public_bytes(serialization.Encoding.PEM))
+    with open(paths[2], "wb") as f:
+        f.write(server_key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ))
+    return paths
+
+
+class EndpointProberTest(unittest.IsolatedAsyncioTestCase):
+    """EndpointProber against local HTTP and TLS listeners with a private CA."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.ca_path, cert_path, key_path = write_private_ca(cls._tmp.name)
+        cls.server_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        cls.server_context.load_cert_chain(cert_path, key_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    async def asyncSetUp(self):
+        self.delay = 0.0
+        self.http = await asyncio.start_server(self._respond, "127.0.0.1", 0)
+        self.https = await asyncio.start_server(self._respond, "127.0.0.1", 0, ssl=self.server_context)
+        self.http_port = self.http.sockets[0].getsockname()[1]
+        self.https_port = self.https.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        for server in (self.http, self.https):
+            server.close()
+            await server.wait_closed()
+
+    async def _respond(self, reader, writer):
+        try:
+            while (await reader.readline()) not in (b"\r\n", b""):
+                pass
+            await asyncio.sleep(self.delay)
+            writer.write(b"HTTP/1.1 204 No Content\r\nConnection: close\r\n\r\n")
+            await writer.drain()
+        except (ConnectionError, ssl.SSLError):
+            pass
+        finally:
+            writer.close()
+
+    def prober(self, **kwargs):
+        return EndpointProber(ssl_context=ssl.create_default_context(cafile=self.ca_path), timeout=5, **kwargs)
+
+    async def test_http_endpoint(self):
+        [result] = await self.prober().probe_all([{"url": f"http://127.0.0.1:{self.http_port}/"}])
+        self.assertTrue(result["dns"])
+        self.assertTrue(result["tcp"])
+        self.assertIsNone(result["tls"])
+        self.assertIsNone(result["cert_valid"])
+        self.assertEqual(result["http_status"], 204)
+        self.assertIsNone(result["error"])
+
+    async def test_tls_endpoint_trusted_by_private_ca(self):
+        [result] = await self.prober().probe_all([{"url": f"https://localhost:{self.https_port}/health"}])
+        self.assertTrue(result["dns"])
+        self.assertTrue(result["tcp"])
+        self.assertTrue(result["tls"])
+        self.assertTrue(result["cert_valid"])
+        self.assertEqual(result["cert_subject"], "localhost")
+        self.assertEqual(result["cert_issuer"], "Probe Test CA")
+        self.assertEqual(result["http_status"], 204)
+        self.assertIsNone(result["error"])
+
+    async def test_untrusted_certificate_still_reads_status(self):
+        prober = EndpointProber(ssl_context=ssl.create_default_context(), timeout=5)
+        [result] = await prober.probe_all([{"url": f"https://localhost:{self.https_port}/"}])
+        self.assertTrue(result["tcp"])
+        self.assertTrue(result["tls"])
+        self.assertFalse(result["cert_valid"])
+        self.assertTrue(result["error"].startswith("certificate:"))
+        self.assertEqual(result["http_status"], 204)
+
+    async def test_unresolvable_host(self):
+        [result] = await self.prober().probe_all([{"url": "https://probe-test.invalid/"}])
+        self.assertFalse(result["dns"])
+        self.assertFalse(result["tcp"])
+        self.assertIsNone(result["http_status"])
+        self.assertIsNotNone(result["error"])
+
+    async def test_busy_host_does_not_hold_global_slots(self):
+        # Two slow probes queue on 127.0.0.1 (one per host at a time); the probe of
+        # localhost must still get one of the two global slots straight away
+        self.delay = 0.5
+        endpoints = [{"url": f"http://127.0.0.1:{self.http_port}/"}] * 2
+        endpoints.append({"url": f"http://localhost:{self.http_port}/"})
+        results = await self.prober(concurrency=2, per_host=1).probe_all(endpoints)
+        self.assertEqual([r["http_status"] for r in results], [204, 204, 204])
+        self.assertLess(results[2]["elapsed_ms"], 900)
+        self.assertGreater(results[1]["elapsed_ms"], 900)
+
+
+if __name__ == "__main__":
+    unittest.main()
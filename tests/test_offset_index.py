@@ -0,0 +1,117 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers.offset_index import OffsetIndex, build_index, index_path  # noqa: E402
+from helpers.pipeline import JsonLinesWriter  # noqa: E402
+from helpers.records import RoleAssignmentRecord  # noqa: E402
+
+
+def _assignment(i, principal):
+    return {
+        "id": f"/subscriptions/sub/providers/Microsoft.Authorization/roleAssignments/a-{i}",
+        "properties": {
+            "principalId": principal,
+            "scope": f"/subscriptions/sub/resourceGroups/rg-{i % 3}",
+            # Multi-byte characters make byte offsets differ from character offsets
+            "description": "tildelt – ü" * (i % 4),
+        },
+    }
+
+
+RECORDS = [_assignment(i, f"principal-{i % 5}") for i in range(50)]
+
+
+class OffsetIndexTest(unittest.TestCase):
+    """OffsetIndex lookups through indexes written by JsonLinesWriter and build_index."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.path = os.path.join(self._tmp.name, "role_assignments.jsonl")
+
+    def write(self, records):
+        writer = JsonLinesWriter(self.path, index_fields=("id", "principalId", "scope"))
+        writer.write(records)
+        return writer.close()
+
+    def open(self):
+        index = OffsetIndex(self.path)
+        self.addCleanup(index.close)
+        return index
+
+    def test_lookups(self):
+        self.assertEqual(self.write(RECORDS), 50)
+        index = self.open()
+        self.assertEqual(index.get(RECORDS[17]["id"]), RECORDS[17])
+        self.assertEqual(index.lookup("principalId", "principal-2"), [r for r in RECORDS if r["properties"]["principalId"] == "principal-2"])
+        self.assertEqual(len(index.lookup("scope", "/subscriptions/sub/resourceGroups/rg-0")), 17)
+
+    def test_lookups_are_case_insensitive(self):
+        self.write(RECORDS)
+        index = self.open()
+        self.assertEqual(index.get(RECORDS[3]["id"].upper()), RECORDS[3])
+        self.assertEqual(len(index.lookup("principalId", "PRINCIPAL-4")), 10)
+
+    def test_missing_key(self):
+        self.write(RECORDS)
+        index = self.open()
+        self.assertIsNone(index.get("/subscriptions/sub/providers/Microsoft.Authorization/roleAssignments/none"))
+        self.assertEqual(index.lookup("principalId", "principal-5"), [])
+        with self.assertRaises(KeyError):
+            index.lookup("displayName", "anything")
+
+    def test_records_without_a_field(self):
+        records = RECORDS[:3] + [{"id": "no-properties"}, {"id": "null-principal", "properties": {"principalId": None}}]
+        self.write(records)
+        index = self.open()
+        self.assertEqual(index.get("no-properties"), {"id": "no-properties"})
+        self.assertEqual(index.get("null-principal"), records[4])
+        self.assertEqual(len(index.lookup("principalId", "principal-0")), 1)
+
+    def test_empty_file(self):
+        self.assertEqual(self.write([]), 0)
+        self.assertEqual(os.path.getsize(self.path), 0)
+        index = self.open()
+        self.assertIsNone(index.get("anything"))
+        self.assertEqual(index.lookup("scope", "/"), [])
+
+    def test_compact_records_index_like_dicts(self):
+        self.write([RoleAssignmentRecord.from_dict(record) for record in RECORDS])
+        with open(index_path(self.path), "rb") as f:
+            written = f.read()
+        build_index(self.path)
+        with open(index_path(self.path), "rb") as f:
+            self.assertEqual(f.read(), written)
+        self.assertEqual(self.open().get(RECORDS[0]["id"]), RECORDS[0])
+
+    def test_build_index_skips_blank_lines(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            for record in RECORDS[:5]:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n\n")
+        build_index(self.path)
+        index = self.open()
+        for record in RECORDS[:5]:
+            self.assertEqual(index.get(record["id"]), record)
+
+    def test_stale_index_is_rejected(self):
+        self.write(RECORDS)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(_assignment(99, "principal-0")) + "\n")
+        with self.assertRaises(ValueError):
+            OffsetIndex(self.path)
+
+    def test_not_an_index(self):
+        self.write(RECORDS)
+        with open(index_path(self.path), "wb") as f:
+            f.write(b"not an index at all")
+        with self.assertRaises(ValueError):
+            OffsetIndex(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,175 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers.collector_registry import Collector  # noqa: E402
+from helpers.pipeline import MemoryBudget, OutputPipeline, iter_json_records  # noqa: E402
+
+# Values whose text holds the characters the parser scans for
+RECORDS = [
+    {"id": "/subscriptions/a/providers/x/1", "properties": {"scope": "/", "note": "ends in ] and , and }"}},
+    {"id": "2", "name": "quote \" and backslash \\ and brace {", "tags": {"k": ["[", "]"]}},
+    {"id": "3", "displayName": "Zoë – 名前", "nested": {"deep": [{"a": 1}, {"b": [1, 2, {"c": None}]}]}},
+    12345678901234567890,
+    "a top-level string, with a comma",
+    {"id": "4", "empty": {}, "list": [], "flag": False, "number": -1.5e-7},
+]
+
+
+class IterJsonRecordsTest(unittest.TestCase):
+    """iter_json_records on JSON arrays and JSON lines, with values split across read chunks."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+
+    def write(self, name, text):
+        path = os.path.join(self._tmp.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def assertRecords(self, path, expected):
+        # Chunk sizes of 1 and 7 split every value, including numbers, across reads
+        for chunk_size in (1, 7, 64, 2**20):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(list(iter_json_records(path, chunk_size=chunk_size)), expected)
+
+    def test_compact_array(self):
+        self.assertRecords(self.write("compact.json", json.dumps(RECORDS)), RECORDS)
+
+    def test_indented_array(self):
+        self.assertRecords(self.write("indented.json", json.dumps(RECORDS, indent=2)), RECORDS)
+
+    def test_json_lines(self):
+        text = "".join(json.dumps(record) + "\n" for record in RECORDS)
+        self.assertRecords(self.write("records.jsonl", text), RECORDS)
+
+    def test_json_lines_without_final_newline_and_with_blank_lines(self):
+        text = "\n".join(json.dumps(record) for record in RECORDS[:3]) + "\n\n" + json.dumps(RECORDS[3])
+        self.assertRecords(self.write("records.jsonl", text), RECORDS[:4])
+
+    def test_empty_inputs(self):
+        self.assertRecords(self.write("empty.json", "[]"), [])
+        self.assertRecords(self.write("spaced.json", " [ \n ] \n"), [])
+        self.assertRecords(self.write("empty.jsonl", ""), [])
+
+    def test_truncated_array_raises(self):
+        path = self.write("truncated.json", json.dumps(RECORDS)[:-1])
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_json_records(path, chunk_size=7))
+
+
+class MemoryBudgetTest(unittest.TestCase):
+    """MemoryBudget blocking and accounting."""
+
+    def test_acquire_blocks_until_release(self):
+        budget = MemoryBudget(100)
+        budget.acquire(80)
+        acquired = threading.Event()
+        thread = threading.Thread(target=lambda: (budget.acquire(50), acquired.set()))
+        thread.start()
+        self.assertFalse(acquired.wait(0.05))
+        budget.release(80)
+        self.assertTrue(acquired.wait(5))
+        thread.join()
+        self.assertEqual(budget.used, 50)
+        self.assertEqual(budget.peak, 80)
+        self.assertGreater(budget.wait_seconds, 0)
+
+    def test_oversized_item_passes_when_empty(self):
+        budget = MemoryBudget(100)
+        budget.acquire(500)
+        self.assertEqual(budget.peak, 500)
+        self.assertEqual(budget.wait_seconds, 0)
+
+    def test_non_blocking_acquire_overshoots(self):
+        budget = MemoryBudget(100)
+        budget.acquire(80)
+        budget.acquire(50, block=False)
+        self.assertEqual(budget.used, 130)
+
+
+def _batches(records, size, fail_after=None):
+    for i in range(0, len(records), size):
+        if fail_after is not None and i >= fail_after:
+            raise RuntimeError("listing failed")
+        yield records[i:i + size]
+
+
+class OutputPipelineTest(unittest.TestCase):
+    """OutputPipeline publishing, aborting and backpressure."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.output_dir = self._tmp.name
+        self.collector = Collector("users", None, output="users.json", auth="graph", stream=True)
+        self.records = [{"id": f"user-{i}", "displayName": f"User {i}"} for i in range(100)]
+
+    def path(self, name):
+        return os.path.join(self.output_dir, name)
+
+    def test_stream_is_published_on_success(self):
+        with OutputPipeline(output_dir=self.output_dir) as pipeline:
+            self.assertEqual(pipeline.submit(self.collector, _batches(self.records, 10)), 100)
+        with open(self.path("users.json")) as f:
+            self.assertEqual(json.load(f), self.records)
+        self.assertEqual(pipeline.outputs["users.json"]["records"], 100)
+        self.assertEqual(os.listdir(self.output_dir), ["users.json"])
+
+    def test_failed_stream_keeps_previous_file(self):
+        previous = [{"id": "old"}]
+        with open(self.path("users.json"), "w") as f:
+            json.dump(previous, f)
+        with OutputPipeline(output_dir=self.output_dir) as pipeline:
+            with self.assertRaises(RuntimeError):
+                pipeline.submit(self.collector, _batches(self.records, 10, fail_after=50))
+        with open(self.path("users.json")) as f:
+            self.assertEqual(json.load(f), previous)
+        self.assertNotIn("users.json", pipeline.outputs)
+        self.assertEqual(os.listdir(self.output_dir), ["users.json"])
+
+    def test_failed_stream_publishes_nothing(self):
+        with OutputPipeline(output_dir=self.output_dir, json_lines=True) as pipeline:
+            with self.assertRaises(RuntimeError):
+                pipeline.submit(self.collector, _batches(self.records, 10, fail_after=50))
+        self.assertEqual(os.listdir(self.output_dir), [])
+
+    def test_failed_enricher_aborts_only_its_output(self):
+        calls = []
+
+        def enrich(record):
+            calls.append(record["id"])
+            if len(calls) > 30:
+                raise ValueError("cannot enrich")
+            return record
+
+        enrichers = {"users": [("users_enriched.json", enrich, None)]}
+        with OutputPipeline(output_dir=self.output_dir, enrichers=enrichers) as pipeline:
+            pipeline.submit(self.collector, _batches(self.records, 10))
+        self.assertEqual(os.listdir(self.output_dir), ["users.json"])
+        self.assertNotIn("users_enriched.json", pipeline.outputs)
+
+    def test_slow_consumer_applies_backpressure(self):
+        # Each batch serializes to about 90 bytes; a 200 byte budget holds two of them
+        def slow_echo(name, batch):
+            time.sleep(0.005)
+
+        with OutputPipeline(output_dir=self.output_dir, max_bytes=200, echo=slow_echo) as pipeline:
+            pipeline.submit(self.collector, _batches(self.records, 2))
+        stats = pipeline.stats()
+        self.assertLessEqual(stats["queue_peak_bytes"], 200)
+        self.assertGreater(stats["backpressure_wait_seconds"], 0)
+        with open(self.path("users.json")) as f:
+            self.assertEqual(json.load(f), self.records)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers.records import PrincipalRecord, ResourceRecord, RoleAssignmentRecord, compact  # noqa: E402
+
+ASSIGNMENT = {
+    "properties": {
+        "scope": "/subscriptions/sub",
+        "customField": {"nested": [1, 2]},
+        "roleDefinitionId": "/subscriptions/sub/providers/Microsoft.Authorization/roleDefinitions/role",
+        "principalId": "principal",
+        "principalType": "ServicePrincipal",
+        "condition": None,
+    },
+    "id": "/subscriptions/sub/providers/Microsoft.Authorization/roleAssignments/assignment",
+    "unknownTopLevel": True,
+    "type": "Microsoft.Authorization/roleAssignments",
+    "name": "assignment",
+}
+RESOURCE = {
+    "id": "/subscriptions/sub/resourceGroups/rg/providers/Microsoft.Storage/storageAccounts/account",
+    "name": "account",
+    "type": "Microsoft.Storage/storageAccounts",
+    "sku": {"name": "Standard_LRS", "tier": "Standard"},
+    "kind": "StorageV2",
+    "location": "westeurope",
+    "tags": {},
+    "properties": {"minimumTlsVersion": "TLS1_2"},
+    "extendedLocation": None,
+}
+PRINCIPAL = {
+    "@odata.type": "#microsoft.graph.servicePrincipal",
+    "id": "principal",
+    "appId": "app",
+    "displayName": "App – ünïcode",
+    "servicePrincipalNames": ["app", "api://app"],
+    "keyCredentials": [{"keyId": "key"}],
+    "accountEnabled": True,
+}
+
+
+class CompactRecordTest(unittest.TestCase):
+    """CompactRecord round-trips and accessors."""
+
+    def assertRoundTrip(self, record_type, data):
+        record = record_type.from_dict(data)
+        result = record.to_dict()
+        self.assertEqual(result, data)
+        # Key order is part of the output, at the top level and inside "properties"
+        self.assertEqual(list(result), list(data))
+        if isinstance(data.get("properties"), dict):
+            self.assertEqual(list(result["properties"]), list(data["properties"]))
+        return record
+
+    def test_round_trips(self):
+        self.assertRoundTrip(RoleAssignmentRecord, ASSIGNMENT)
+        self.assertRoundTrip(ResourceRecord, RESOURCE)
+        self.assertRoundTrip(PrincipalRecord, PRINCIPAL)
+        self.assertRoundTrip(RoleAssignmentRecord, {"id": "no-properties"})
+        self.assertRoundTrip(RoleAssignmentRecord, {"id": "null-properties", "properties": None})
+        self.assertRoundTrip(PrincipalRecord, {})
+
+    def test_attributes_and_accessors(self):
+        record = RoleAssignmentRecord.from_dict(ASSIGNMENT)
+        self.assertEqual(record.principal_id, "principal")
+        self.assertIsNone(record.created_on)
+        self.assertEqual(record.get("unknownTopLevel"), True)
+        self.assertEqual(record["properties"], ASSIGNMENT["properties"])
+        self.assertIsNone(record.get("missing"))
+        self.assertNotIn("missing", record)
+        with self.assertRaises(KeyError):
+            record["missing"]
+
+    def test_repeated_strings_are_shared(self):
+        first, second = compact([dict(ASSIGNMENT), dict(ASSIGNMENT)], RoleAssignmentRecord)
+        self.assertIs(first.role_definition_id, second.role_definition_id)
+        self.assertEqual(first, second)
+        self.assertEqual(first, ASSIGNMENT)
+
+    def test_set_property(self):
+        record = RoleAssignmentRecord.from_dict(ASSIGNMENT)
+        record.set_property("roleName", "Reader")
+        record.set_property("customField", "replaced")
+        expected = dict(ASSIGNMENT, properties=dict(ASSIGNMENT["properties"], customField="replaced", roleName="Reader"))
+        self.assertEqual(record.to_dict(), expected)
+        self.assertEqual(list(record.to_dict()["properties"])[-1], "roleName")
+        # The input is left as it was
+        self.assertNotIn("roleName", ASSIGNMENT["properties"])
+
+    def test_set_property_without_properties(self):
+        record = RoleAssignmentRecord.from_dict({"id": "assignment"})
+        record.set_property("roleName", "Reader")
+        record.set_property("note", "added")
+        self.assertEqual(record.to_dict(), {"id": "assignment", "properties": {"roleName": "Reader", "note": "added"}})
+
+
+if __name__ == "__main__":
+    unittest.main()
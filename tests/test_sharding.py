@@ -0,0 +1,112 @@
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers.offset_index import OffsetIndex  # noqa: E402
+from helpers.sharding import ShardPlan, merge_shards  # noqa: E402
+
+INHERITED = {
+    "id": "/providers/Microsoft.Management/managementGroups/root/providers/Microsoft.Authorization/roleAssignments/inherited",
+    "properties": {"principalId": "principal-0", "scope": "/providers/Microsoft.Management/managementGroups/root"},
+}
+
+
+def _assignment(subscription, i):
+    return {
+        "id": f"/subscriptions/{subscription}/providers/Microsoft.Authorization/roleAssignments/a-{i}",
+        "properties": {"principalId": f"principal-{i}", "scope": f"/subscriptions/{subscription}"},
+    }
+
+
+class MergeShardsTest(unittest.TestCase):
+    """merge_shards concatenation and de-duplication across shards."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.output_dir = os.path.join(self._tmp.name, "merged")
+
+    def write_shard(self, index, count, files, documents=None, json_lines=False):
+        """Write one shard's output files and its manifest; `files` maps file names to records."""
+        directory = os.path.join(self._tmp.name, f"shard-{index}")
+        os.makedirs(directory)
+        outputs = {}
+        for name, records in files.items():
+            with open(os.path.join(directory, name), "w") as f:
+                if json_lines:
+                    f.writelines(json.dumps(record) + "\n" for record in records)
+                else:
+                    json.dump(records, f)
+            outputs[name] = {"records": len(records), "indent": None}
+        for name, document in (documents or {}).items():
+            with open(os.path.join(directory, name), "w") as f:
+                json.dump(document, f)
+            outputs[name] = {"document": True}
+        ShardPlan(index, count).write_manifest(directory, [], ["role_assignments"], [], outputs, time.time())
+        return directory
+
+    def read(self, name):
+        with open(os.path.join(self.output_dir, name)) as f:
+            return json.load(f)
+
+    def test_duplicates_across_shards_are_dropped(self):
+        first = [INHERITED, _assignment("sub-a", 1), _assignment("sub-a", 2)]
+        # The inherited assignment is listed again, with its id in another case
+        inherited_again = dict(INHERITED, id=INHERITED["id"].upper())
+        second = [_assignment("sub-b", 3), inherited_again, _assignment("sub-b", 4)]
+        tree = {"name": "root", "children": []}
+        directories = [
+            self.write_shard(0, 2, {"role_assignments.json": first}, {"management_group_tree.json": tree}),
+            self.write_shard(1, 2, {"role_assignments.json": second}),
+        ]
+        self.assertEqual(merge_shards(directories, self.output_dir), {"role_assignments.json": 5})
+        self.assertEqual(self.read("role_assignments.json"), first + [second[0], second[2]])
+        self.assertEqual(self.read("management_group_tree.json"), tree)
+
+    def test_shard_order_does_not_depend_on_arguments(self):
+        directories = [
+            self.write_shard(0, 2, {"users.json": [{"id": "u1"}, {"id": "u2"}]}),
+            self.write_shard(1, 2, {"users.json": [{"id": "u2", "later": True}, {"id": "u3"}]}),
+        ]
+        merge_shards(list(reversed(directories)), self.output_dir)
+        self.assertEqual(self.read("users.json"), [{"id": "u1"}, {"id": "u2"}, {"id": "u3"}])
+
+    def test_records_without_id_are_kept(self):
+        directories = [
+            self.write_shard(0, 2, {"classic_admins.json": [{"name": "a"}, {"id": ""}]}),
+            self.write_shard(1, 2, {"classic_admins.json": [{"name": "a"}]}),
+        ]
+        self.assertEqual(merge_shards(directories, self.output_dir), {"classic_admins.json": 3})
+
+    def test_json_lines_are_merged_and_indexed(self):
+        directories = [
+            self.write_shard(0, 2, {"role_assignments.jsonl": [INHERITED, _assignment("sub-a", 1)]}, json_lines=True),
+            self.write_shard(1, 2, {"role_assignments.jsonl": [INHERITED, _assignment("sub-b", 2)]}, json_lines=True),
+        ]
+        self.assertEqual(merge_shards(directories, self.output_dir), {"role_assignments.jsonl": 3})
+        with OffsetIndex(os.path.join(self.output_dir, "role_assignments.jsonl")) as index:
+            self.assertEqual(index.lookup("principalId", "principal-0"), [INHERITED])
+            self.assertEqual(index.get(_assignment("sub-b", 2)["id"]), _assignment("sub-b", 2))
+
+    def test_incomplete_shard_set(self):
+        directories = [self.write_shard(0, 3, {"users.json": []}), self.write_shard(2, 3, {"users.json": []})]
+        with self.assertRaises(ValueError):
+            merge_shards(directories, self.output_dir)
+        self.assertFalse(os.path.exists(self.output_dir))
+
+    def test_document_from_several_shards(self):
+        directories = [
+            self.write_shard(0, 2, {}, {"management_group_tree.json": {}}),
+            self.write_shard(1, 2, {}, {"management_group_tree.json": {}}),
+        ]
+        with self.assertRaises(ValueError):
+            merge_shards(directories, self.output_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
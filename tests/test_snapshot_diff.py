@@ -0,0 +1,115 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers.snapshot_diff import diff_files, diff_snapshots, record_digest  # noqa: E402
+
+
+def _user(i, **changes):
+    return dict({"id": f"User-{i:03d}", "displayName": f"User {i}", "accountEnabled": True}, **changes)
+
+
+OLD = [_user(i) for i in range(20)]
+# Users 0-4 removed, 5-7 changed, 20-22 added, the rest unchanged and reordered
+NEW = (
+    [_user(i, accountEnabled=False) for i in range(5, 8)]
+    + [_user(i) for i in reversed(range(8, 20))]
+    + [_user(i) for i in range(20, 23)]
+)
+EXPECTED_IDS = {
+    "added": [f"user-{i:03d}" for i in range(20, 23)],
+    "removed": [f"user-{i:03d}" for i in range(5)],
+    "changed": [f"user-{i:03d}" for i in range(5, 8)],
+}
+
+
+class SnapshotDiffTest(unittest.TestCase):
+    """diff_files and diff_snapshots change reports."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.spill_dir = os.path.join(self._tmp.name, "spill")
+        os.makedirs(self.spill_dir)
+
+    def write(self, directory, name, records, json_lines=False):
+        directory = os.path.join(self._tmp.name, directory)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, name)
+        with open(path, "w") as f:
+            if json_lines:
+                f.writelines(json.dumps(record) + "\n" for record in records)
+            else:
+                json.dump(records, f, indent=2)
+        return path
+
+    def assertReport(self, report, ids):
+        self.assertEqual(report["ids"], ids)
+        for change, changed in ids.items():
+            self.assertEqual(report[change], len(changed))
+
+    def test_added_removed_changed(self):
+        old, new = self.write("old", "users.json", OLD), self.write("new", "users.json", NEW)
+        # Small runs force several spills per file; the result must not depend on them
+        for max_entries in (1_000_000, 4, 1):
+            with self.subTest(max_entries=max_entries):
+                report = diff_files(old, new, max_entries=max_entries, spill_dir=self.spill_dir)
+                self.assertReport(report, EXPECTED_IDS)
+                self.assertEqual(report["unchanged"], 12)
+                self.assertEqual(os.listdir(self.spill_dir), [])
+
+    def test_identical_files(self):
+        path = self.write("old", "users.json", OLD)
+        report = diff_files(path, path, max_entries=3, spill_dir=self.spill_dir)
+        self.assertReport(report, {"added": [], "removed": [], "changed": []})
+        self.assertEqual(report["unchanged"], 20)
+
+    def test_key_order_and_id_case_are_not_changes(self):
+        old = self.write("old", "users.json", [{"id": "ABC", "a": 1, "b": 2}])
+        new = self.write("new", "users.json", [{"b": 2, "a": 1, "id": "ABC"}])
+        self.assertEqual(diff_files(old, new)["unchanged"], 1)
+        # The digest covers the id as written, so a recased id is a changed record under one key
+        new = self.write("new", "users.json", [{"id": "abc", "a": 1, "b": 2}])
+        self.assertReport(diff_files(old, new), {"added": [], "removed": [], "changed": ["abc"]})
+
+    def test_repeated_and_id_less_records(self):
+        old = self.write("old", "role_assignments.json", OLD[:3] + OLD[:3] + [{"name": "no id"}])
+        new = self.write("new", "role_assignments.json", OLD[:3] + [{"name": "other"}])
+        report = diff_files(old, new, max_entries=2, spill_dir=self.spill_dir)
+        self.assertReport(report, {"added": [], "removed": [], "changed": []})
+        self.assertEqual(report["unchanged"], 3)
+
+    def test_json_lines_against_array(self):
+        old = self.write("old", "users.json", OLD)
+        new = self.write("new", "users.jsonl", NEW, json_lines=True)
+        self.assertReport(diff_files(old, new), EXPECTED_IDS)
+
+    def test_snapshots(self):
+        self.write("old", "users.json", OLD)
+        self.write("new", "users.jsonl", NEW, json_lines=True)
+        self.write("new", "groups.json", [{"id": "group"}])
+        report = diff_snapshots(
+            os.path.join(self._tmp.name, "old"),
+            os.path.join(self._tmp.name, "new"),
+            files=("users.json", "groups.json", "applications.json"),
+            max_entries=5,
+            spill_dir=self.spill_dir,
+        )
+        self.assertEqual(sorted(report["files"]), ["groups.json", "users.json"])
+        self.assertReport(report["files"]["users.json"], EXPECTED_IDS)
+        groups = report["files"]["groups.json"]
+        self.assertTrue(groups["missing_in_old"])
+        self.assertNotIn("missing_in_new", groups)
+        self.assertReport(groups, {"added": ["group"], "removed": [], "changed": []})
+
+    def test_record_digest_is_canonical(self):
+        self.assertEqual(record_digest({"a": 1, "b": [1, 2]}), record_digest({"b": [1, 2], "a": 1}))
+        self.assertNotEqual(record_digest({"a": 1}), record_digest({"a": "1"}))
+
+
+if __name__ == "__main__":
+    unittest.main()